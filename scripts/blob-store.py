@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Verify and resolve content-addressed payload blobs.
+
+`validate-sessions.py --blob-dir` moves tool input/output and encrypted
+reasoning payloads above a size threshold out of produced records into a
+blob store keyed by SHA-256. The record keeps a digest reference:
+
+  {"vac-blob": "sha-256:<hex>", "size": 1234, "media-type": "text/plain; charset=utf-8"}
+
+input/output hold the reference inline; encrypted payloads move to the
+`encrypted-blob` extension key (the schema types `encrypted` as tstr). Both
+are allowed by the `* tstr => any` extension slots, so signed records stay
+small while every blob remains verifiable against its digest.
+
+Usage:
+  # Re-hash every blob in the store (or only those a record references)
+  python3 scripts/blob-store.py verify --blob-dir /tmp/vac-blobs
+  python3 scripts/blob-store.py verify --blob-dir /tmp/vac-blobs \\
+    --record /tmp/vac-produced/claude-opus-4-6.spec.json
+
+  # Re-inline blobs into a full record
+  python3 scripts/blob-store.py inline --blob-dir /tmp/vac-blobs \\
+    --record /tmp/vac-produced/claude-opus-4-6.spec.json \\
+    --out /tmp/vac-produced/claude-opus-4-6.full.json
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+from vac import BLOB_REF_KEY, get_blob, inline_blobs, is_blob_ref
+
+
+def _iter_refs(entries):
+    """Yield every blob reference in entries (and their children)."""
+    for entry in entries:
+        for field in ("input", "output", "encrypted-blob"):
+            value = entry.get(field)
+            if is_blob_ref(value):
+                yield value
+        yield from _iter_refs(entry.get("children", []))
+
+
+# ---------------------------------------------------------------------------
+# Subcommands
+# ---------------------------------------------------------------------------
+
+
+def cmd_verify(args):
+    """Check blobs against their digests."""
+    store = Path(args.blob_dir)
+    failures = []
+    checked = 0
+
+    if args.record:
+        record = json.loads(Path(args.record).read_text(encoding="utf-8"))
+        # is_blob_ref admits only sha-256 digests
+        digests = {
+            ref[BLOB_REF_KEY].partition(":")[2] for ref in _iter_refs(record.get("session", {}).get("entries", []))
+        }
+        for digest in sorted(digests):
+            checked += 1
+            try:
+                get_blob(store, digest)
+            except (OSError, ValueError) as e:
+                failures.append(f"{digest}: {e}")
+    else:
+        for path in sorted((store / "sha-256").glob("*/*")):
+            if ".tmp" in path.name:
+                continue
+            checked += 1
+            actual = hashlib.sha256(path.read_bytes()).hexdigest()
+            if actual != path.name:
+                failures.append(f"{path.name}: content hashes to {actual}")
+
+    for failure in failures:
+        print(f"  [FAIL] {failure}")
+    print(f"RESULTS: {checked - len(failures)} ok, {len(failures)} fail")
+    sys.exit(1 if failures else 0)
+
+
+def cmd_inline(args):
+    """Write a copy of a record with all blob references resolved."""
+    record = json.loads(Path(args.record).read_text(encoding="utf-8"))
+    count = inline_blobs(record.get("session", {}).get("entries", []), args.blob_dir)
+    out_path = Path(args.out)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    print(f"Inlined {count} blobs: {out_path}")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    vf = sub.add_parser("verify", help="Verify blobs against their SHA-256 digests")
+    vf.add_argument("--blob-dir", required=True, help="Blob store directory")
+    vf.add_argument("--record", help="Only verify blobs referenced by this JSON record")
+
+    il = sub.add_parser("inline", help="Resolve blob references back into a record")
+    il.add_argument("--blob-dir", required=True, help="Blob store directory")
+    il.add_argument("--record", required=True, help="Path to JSON record with blob references")
+    il.add_argument("--out", required=True, help="Output path for the inlined record")
+
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        cmd_verify(args)
+    elif args.command == "inline":
+        cmd_inline(args)
+
+
+if __name__ == "__main__":
+    main()
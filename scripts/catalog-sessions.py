@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Catalog session files from their metadata alone.
+
+Each file is read with the metadata-only scanner for its format (see
+vac.scan): session-id, cli name/version, model set, provider, start time,
+cwd, branch and entry-type counts, without building entries or decoding
+content. The agent comes from the `<agent>-` name prefix or, failing that,
+content sniffing.
+
+Usage:
+  # Table of the samples
+  python3 scripts/catalog-sessions.py
+
+  # JSONL catalog of an archive, metadata only (no entry counts)
+  python3 scripts/catalog-sessions.py --sessions-dir /archive --recursive \\
+    --no-counts --out /tmp/catalog.jsonl
+
+  # Cross-check every scan against a full parse
+  python3 scripts/catalog-sessions.py --check
+
+Options:
+  --sessions-dir PATH  Directory of session files (default: examples/sessions/)
+  --recursive          Include subdirectories
+  --no-counts          Skip entry-type counts; scans stop once the meta is final
+  --out PATH           Write the catalog as JSONL here ("-" for stdout) instead of a table
+  --check              Also run the full parser and report any meta/count mismatch
+"""
+
+import argparse
+import contextlib
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from vac import PARSERS, SCANNERS, resolve_agent
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SESSIONS = REPO_ROOT / "examples" / "sessions"
+
+
+def _catalog_row(path, agent, meta, counts):
+    """One catalog record; field names follow the verifiable-agent-record keys."""
+    return {
+        "path": str(path),
+        "agent": agent,
+        "size": path.stat().st_size,
+        "session-id": meta["session_id"],
+        "cli-name": meta["cli"],
+        "cli-version": meta["cli_version"],
+        "model-id": meta["model_id"],
+        "models": sorted(meta["models"]),
+        "model-provider": meta["provider"],
+        "session-start": meta["start"],
+        "working-dir": meta["cwd"],
+        "branch": meta["branch"],
+        "entry-counts": dict(sorted(counts.items())),
+    }
+
+
+def _check(path, agent, meta, counts):
+    """Compare a scan with the full parser; returns a list of mismatch notes."""
+    entries, full_meta = PARSERS[agent](path)
+    full_meta.pop("dedup", None)
+    full_counts = Counter()
+    for entry in entries:
+        full_counts[entry["type"]] += 1
+        for child in entry.get("children", ()):
+            full_counts[child["type"]] += 1
+    notes = [f"{k}: scan {meta.get(k)!r} != parse {v!r}" for k, v in full_meta.items() if meta.get(k) != v]
+    if counts and counts != full_counts:
+        notes.append(f"counts: scan {dict(counts)} != parse {dict(full_counts)}")
+    return notes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--sessions-dir",
+        type=Path,
+        default=DEFAULT_SESSIONS,
+        help=f"Directory of session files (default: {DEFAULT_SESSIONS.relative_to(REPO_ROOT)})",
+    )
+    parser.add_argument("--recursive", action="store_true", help="Include subdirectories")
+    parser.add_argument("--no-counts", action="store_true", help="Skip entry-type counts (stop once meta is final)")
+    parser.add_argument("--out", default=None, help="Write the catalog as JSONL ('-' for stdout)")
+    parser.add_argument("--check", action="store_true", help="Compare every scan with a full parse")
+    args = parser.parse_args()
+
+    if not args.sessions_dir.is_dir():
+        print(f"Sessions dir not found: {args.sessions_dir}", file=sys.stderr)
+        sys.exit(1)
+    pattern = "**/*" if args.recursive else "*"
+    paths = sorted(p for p in args.sessions_dir.glob(pattern) if p.is_file() and p.name.endswith((".jsonl", ".json")))
+
+    if args.out == "-":
+        stream = contextlib.nullcontext(sys.stdout)
+    elif args.out:
+        stream = None
+    else:
+        stream = contextlib.nullcontext(None)
+
+    t0 = time.perf_counter()
+    total_bytes = 0
+    rows = 0
+    mismatches = 0
+    with stream or open(args.out, "w", encoding="utf-8") as out:
+        for path in paths:
+            agent, confidence, _ = resolve_agent(path)
+            if agent is None:
+                print(f"  [SKIP] {path.name}: format not recognized (confidence {confidence:.2f})", file=sys.stderr)
+                continue
+            try:
+                meta, counts = SCANNERS[agent](path, counts=not args.no_counts)
+            except (OSError, ValueError) as e:
+                print(f"  [FAIL] {path.name}: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            row = _catalog_row(path, agent, meta, counts)
+            rows += 1
+            total_bytes += row["size"]
+            if out is not None:
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+            else:
+                models = ",".join(row["models"]) or row["model-id"]
+                entries = sum(counts.values()) if counts else "-"
+                print(
+                    f"  {path.name:<40} {agent:<9} {str(row['session-id'])[:36]:<36} "
+                    f"{str(row['session-start'])[:24]:<24} {models:<28} {entries:>7}"
+                )
+            if args.check:
+                notes = _check(path, agent, meta, counts)
+                mismatches += bool(notes)
+                for note in notes:
+                    print(f"  [MISMATCH] {path.name}: {note}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - t0
+    summary = f"{rows} sessions, {total_bytes / 1024 / 1024:.1f} MB cataloged in {elapsed:.2f} s"
+    if args.check:
+        summary += f" (checked against full parse: {mismatches} mismatched)"
+    print(summary, file=sys.stderr)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic native session files for load and scale testing.
+
+Learns each format's record kinds, their order (a Markov chain) and record
+templates from the sample sessions, then streams new sessions of any size
+in the same native format (see vac.synth). Output is deterministic for a
+given seed, samples and options, so parsers, validators and signers can be
+benchmarked at 100 MB - 10 GB without shipping the data.
+
+Output files are named `<agent>-synth-<seed>.jsonl`, so the other scripts
+route them by name prefix as for the samples.
+
+Usage:
+  # 1 GB Codex session
+  python3 scripts/gen-sessions.py --agent codex --size 1G --seed 7 --out-dir /tmp/synth
+
+  # Every format, 100 MB each, tool-heavy, switching model every 500 records
+  python3 scripts/gen-sessions.py --size 100M --tool-weight 3 \\
+    --models claude-opus-4-6,claude-sonnet-4-5 --switch-every 500 --out-dir /tmp/synth
+
+  # Fixed record count to stdout
+  python3 scripts/gen-sessions.py --agent opencode --records 200 --out -
+
+Options:
+  --agent NAME           Format to generate (default: all five)
+  --size BYTES           Stop after this many bytes (suffix K, M or G)
+  --records N            Stop after N native records (JSONL lines, Gemini
+                         messages, OpenCode objects)
+  --seed N               Random seed (default: 0)
+  --samples DIR          Sample sessions to learn from (default: examples/sessions/)
+  --out-dir DIR          Directory for generated files (default: current directory)
+  --out PATH             Output file for a single --agent ("-" for stdout)
+  --tool-weight W        Scale transitions into tool call/result records (default: 1.0)
+  --reasoning-weight W   Scale transitions into reasoning records (default: 1.0)
+  --text-scale F         Scale synthetic text lengths (default: 1.0)
+  --reasoning-scale F    Extra scale for reasoning text (default: 1.0)
+  --models A,B,...       Models to cycle through (default: the samples' most common)
+  --switch-every N       Records per model before switching (default: 0, never)
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+from pathlib import Path
+
+from vac import PARSERS, resolve_agent, synth
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SAMPLES_DIR = REPO_ROOT / "examples" / "sessions"
+
+_SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def _parse_size(text):
+    text = text.strip().upper().removesuffix("B")
+    if text and text[-1] in _SIZE_SUFFIXES:
+        return int(float(text[:-1]) * _SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def _samples(samples_dir, agent):
+    """Sample files of one format: name prefix, else sniffed content."""
+    paths = []
+    for path in sorted(samples_dir.iterdir()):
+        if path.is_file() and path.name.endswith((".jsonl", ".json")) and resolve_agent(path)[0] == agent:
+            paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--agent", choices=sorted(PARSERS), default=None, help="Format to generate (default: all)")
+    parser.add_argument("--size", type=_parse_size, default=None, help="Stop after this many bytes (K/M/G suffix)")
+    parser.add_argument("--records", type=int, default=None, help="Stop after N native records")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument(
+        "--samples",
+        type=Path,
+        default=SAMPLES_DIR,
+        help=f"Sample sessions to learn from (default: {SAMPLES_DIR.relative_to(REPO_ROOT)})",
+    )
+    parser.add_argument("--out-dir", type=Path, default=Path("."), help="Directory for generated files")
+    parser.add_argument("--out", default=None, help="Output file for a single --agent ('-' for stdout)")
+    parser.add_argument("--tool-weight", type=float, default=1.0, help="Scale transitions into tool records")
+    parser.add_argument("--reasoning-weight", type=float, default=1.0, help="Scale transitions into reasoning records")
+    parser.add_argument("--text-scale", type=float, default=1.0, help="Scale synthetic text lengths")
+    parser.add_argument("--reasoning-scale", type=float, default=1.0, help="Extra scale for reasoning text")
+    parser.add_argument("--models", default=None, help="Comma-separated models to cycle through")
+    parser.add_argument("--switch-every", type=int, default=0, help="Records per model before switching")
+    args = parser.parse_args()
+
+    if args.size is None and args.records is None:
+        parser.error("one of --size or --records is required")
+    if args.out and not args.agent:
+        parser.error("--out needs --agent")
+    agents = [args.agent] if args.agent else sorted(PARSERS)
+    models = [m.strip() for m in args.models.split(",") if m.strip()] if args.models else None
+
+    if not args.out:
+        args.out_dir.mkdir(parents=True, exist_ok=True)
+    for agent in agents:
+        samples = _samples(args.samples, agent)
+        if not samples:
+            print(f"No {agent} samples in {args.samples}", file=sys.stderr)
+            sys.exit(1)
+        t0 = time.perf_counter()
+        model = synth.learn(agent, samples)
+        t_learn = time.perf_counter() - t0
+
+        if args.out == "-":
+            out, stream = "<stdout>", contextlib.nullcontext(sys.stdout.buffer)
+        else:
+            out = Path(args.out) if args.out else args.out_dir / f"{agent}-synth-{args.seed}.jsonl"
+            stream = None
+        t0 = time.perf_counter()
+        with stream or open(out, "wb") as f:
+            stats = synth.generate(
+                model,
+                f,
+                seed=args.seed,
+                size=args.size,
+                records=args.records,
+                text_scale=args.text_scale,
+                reasoning_scale=args.reasoning_scale,
+                tool_weight=args.tool_weight,
+                reasoning_weight=args.reasoning_weight,
+                models=models,
+                switch_every=args.switch_every,
+            )
+        elapsed = time.perf_counter() - t0
+        mb = stats["bytes"] / 1024 / 1024
+        print(
+            f"[GEN] {out}: {stats['records']} records, {mb:.1f} MB in {elapsed:.1f} s "
+            f"({mb / elapsed if elapsed else 0:.1f} MB/s; learned {len(model.kinds())} kinds "
+            f"from {model.samples} samples in {t_learn:.1f} s; models: {', '.join(stats['models']) or 'none'})",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Long-running ingest daemon: watch a spool directory and turn each session
+file dropped there into a validated, signed verifiable-agent-record.
+
+Parsers, the schema path and the signing key are loaded once at start-up,
+so per-file latency is the work itself (parse -> wrap_record -> cddl ->
+COSE_Sign1) rather than interpreter start, imports and key parsing.
+
+Spool protocol:
+  - Writers drop session files (`<agent>-*.jsonl` / `.json`) into SPOOL.
+    Files without a known agent prefix are routed by content sniffing
+    (vac.detect); undetectable ones go to failed/.
+    Files are picked up once their size and mtime have not changed for
+    --settle seconds, so slow writers are not read half-written.
+  - Outputs go to OUT as `<stem>.spec.json` and `<stem>.sig.cbor`, each
+    written to a temporary name and renamed into place.
+  - The source then moves to SPOOL/done/ (or SPOOL/failed/ with a
+    `<name>.error` note). A file dropped again under the same name is
+    processed again.
+
+The daemon keeps an LRU of recent per-session state (source size/mtime,
+content hash, output paths). Re-submissions whose bytes are unchanged, and
+whose record and signature are still in --out, are recognized from it and
+retired to done/ without re-signing; missing outputs are produced again.
+
+SIGINT/SIGTERM finish the current file and exit.
+
+Usage:
+  python3 scripts/ingest-daemon.py --spool /var/spool/vac --out /var/lib/vac \\
+    --key /etc/vac/signing-key.pem
+
+  # Drain the spool once and exit (cron, tests)
+  python3 scripts/ingest-daemon.py --spool /tmp/spool --out /tmp/out --once
+
+Options:
+  --spool DIR          Directory to watch for session files
+  --out DIR            Directory for produced records and signatures
+  --key PATH           Ed25519 private key PEM (default: records are not signed)
+  --schema PATH        CDDL schema (default: agent-conversation.cddl)
+  --no-validate        Skip CDDL validation
+  --interval SECONDS   Poll interval (default: 1.0)
+  --settle SECONDS     Quiet time before a file is picked up (default: 2.0)
+  --lru N              Sessions kept in the per-session state cache (default: 1024)
+  --once               Process what is in the spool now, then exit
+  --dedup, --blob-dir, --blob-threshold, --parse-workers
+                       As for validate-sessions.py
+  --hash-alg NAME      content-hash-alg of signatures (default: sha-256; see
+                       sign-record.py --hash-alg)
+  --profile [PATH]     Per-stage wall/CPU time and memory peak (see vac.profiling)
+  --metrics PATH       Rewrite run metrics after every batch (see vac.metrics)
+  --shard I/N          Take only the spool files of shard I of N, so N daemons
+                       (on any machines) can share one spool; see vac.shard
+  --shard-key KEY      path (file name, default) or session-id
+
+Requires: pycose, cbor2 (when signing), cddl gem (when validating)
+"""
+
+import argparse
+import hashlib
+import signal
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from vac import (
+    CONTENT_HASH_ALGS,
+    DEFAULT_BLOB_THRESHOLD,
+    DEFAULT_CONTENT_HASH_ALG,
+    PARSERS,
+    Pipeline,
+    in_shard,
+    resolve_agent,
+)
+from vac import metrics as vac_metrics
+from vac import profiling as vac_profile
+from vac import shard as vac_shard
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCHEMA = REPO_ROOT / "agent-conversation.cddl"
+
+_stop = False
+
+
+def _request_stop(signum, frame):
+    global _stop
+    _stop = True
+
+
+# ---------------------------------------------------------------------------
+# Per-session state
+# ---------------------------------------------------------------------------
+
+
+class SessionLRU:
+    """Bounded map of recent per-session state, least recently used evicted first.
+
+    Keyed by source file name; values hold size, mtime_ns, source sha-256,
+    session id, output paths and the time processed.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def get(self, key):
+        state = self._items.get(key)
+        if state is not None:
+            self._items.move_to_end(key)
+        return state
+
+    def put(self, key, state):
+        self._items[key] = state
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Spool handling
+# ---------------------------------------------------------------------------
+
+
+def _scan(spool, settle, seen, owns=None):
+    """Return spool files that are ready: unchanged for `settle` seconds.
+
+    seen maps name -> (size, mtime_ns, first time observed with that stat).
+    owns(path), if given, filters ready files (--shard).
+    """
+    now = time.monotonic()
+    ready = []
+    current = set()
+    for path in sorted(spool.iterdir()):
+        if not path.is_file() or path.name.startswith(".") or not path.name.endswith((".jsonl", ".json")):
+            continue
+        current.add(path.name)
+        st = path.stat()
+        sig = (st.st_size, st.st_mtime_ns)
+        prev = seen.get(path.name)
+        if prev is None or prev[:2] != sig:
+            seen[path.name] = (*sig, now)
+            if settle > 0:
+                continue
+            prev = seen[path.name]
+        if now - prev[2] >= settle and (owns is None or owns(path)):
+            ready.append(path)
+    for name in set(seen) - current:
+        del seen[name]
+    return ready
+
+
+def _retire(path, spool, ok, error=None):
+    """Move a processed source to done/ or failed/ (with an .error note)."""
+    dest_dir = spool / ("done" if ok else "failed")
+    dest_dir.mkdir(exist_ok=True)
+    dest = dest_dir / path.name
+    path.replace(dest)
+    if not ok:
+        (dest_dir / f"{path.name}.error").write_text((error or "unknown error") + "\n", encoding="utf-8")
+
+
+def _ingest(pipeline, path, spool, lru):
+    """Process one ready spool file; returns the status string printed."""
+    agent, confidence, detected = resolve_agent(path)
+    detected = f", detected {agent} {confidence:.2f}" if detected and agent else ""
+    if agent is None:
+        agent = path.name.split("-")[0]
+    st = path.stat()
+    source_hash = _sha256_file(path)
+    state = lru.get(path.name)
+    if (
+        state is not None
+        and state["sha256"] == source_hash
+        and all(Path(out).exists() for out in (state["record"], state["sig"]) if out)
+    ):
+        _retire(path, spool, True)
+        vac_metrics.file_done(agent, "skip", st.st_size)
+        return f"[SAME] {path.name}: unchanged since {time.strftime('%H:%M:%S', time.localtime(state['at']))}"
+
+    t0 = time.perf_counter()
+    try:
+        result = pipeline.process(path, agent)
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}", "entries": 0}
+    ms = (time.perf_counter() - t0) * 1000
+
+    _retire(path, spool, result["ok"], result["error"])
+    vac_metrics.file_done(agent, "pass" if result["ok"] else "fail", st.st_size, result["entries"])
+    if not result["ok"]:
+        return f"[FAIL] {path.name}: {result['error'][:200]}"
+
+    update = state is not None
+    lru.put(
+        path.name,
+        {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": source_hash,
+            "session_id": result["session_id"],
+            "record": result["record"],
+            "sig": result["sig"],
+            "at": time.time(),
+        },
+    )
+    signed = ", signed" if result["sig"] else ""
+    return f"[{'UPDATE' if update else 'OK'}] {path.name} ({result['entries']} entries{signed}{detected}, {ms:.0f} ms)"
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--spool", type=Path, required=True, help="Directory to watch for session files")
+    parser.add_argument("--out", type=Path, required=True, help="Directory for produced records and signatures")
+    parser.add_argument("--key", type=Path, default=None, help="Ed25519 private key PEM (default: do not sign)")
+    parser.add_argument(
+        "--schema",
+        type=Path,
+        default=SCHEMA,
+        help=f"Path to CDDL schema file (default: {SCHEMA.relative_to(REPO_ROOT)})",
+    )
+    parser.add_argument("--no-validate", action="store_true", help="Skip CDDL validation")
+    parser.add_argument("--interval", type=float, default=1.0, help="Poll interval in seconds (default: 1.0)")
+    parser.add_argument(
+        "--settle", type=float, default=2.0, help="Seconds a file must be unchanged before pickup (default: 2.0)"
+    )
+    parser.add_argument("--lru", type=int, default=1024, help="Per-session state cache size (default: 1024)")
+    parser.add_argument("--once", action="store_true", help="Process the current spool contents and exit")
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Collapse Codex event_msg entries that duplicate a response_item entry",
+    )
+    parser.add_argument(
+        "--parse-workers", type=int, default=1, help="Parse large JSONL sessions in N processes (default: 1)"
+    )
+    parser.add_argument("--blob-dir", type=Path, default=None, help="Externalize large payloads into this blob store")
+    parser.add_argument(
+        "--blob-threshold",
+        type=int,
+        default=DEFAULT_BLOB_THRESHOLD,
+        help=f"Externalize payloads larger than this many bytes (default: {DEFAULT_BLOB_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--hash-alg",
+        choices=list(CONTENT_HASH_ALGS),
+        default=DEFAULT_CONTENT_HASH_ALG,
+        help=f"content-hash-alg of signatures (default: {DEFAULT_CONTENT_HASH_ALG})",
+    )
+    vac_shard.add_arguments(parser)
+    vac_profile.add_argument(parser)
+    vac_metrics.add_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.spool.is_dir():
+        print(f"Spool dir not found: {args.spool}", file=sys.stderr)
+        sys.exit(1)
+
+    # Warm state: everything expensive happens once, here
+    t0 = time.perf_counter()
+    profiler = vac_profile.enable(args.profile) if args.profile else None
+    metrics = None
+    if args.metrics or args.progress:
+        metrics = vac_metrics.enable("ingest-daemon", progress_interval=args.progress)
+    try:
+        pipeline = Pipeline(
+            args.out,
+            schema=None if args.no_validate else args.schema,
+            key_pem=args.key.read_text(encoding="utf-8") if args.key else None,
+            blob_dir=args.blob_dir,
+            blob_threshold=args.blob_threshold,
+            dedup=args.dedup,
+            parse_workers=args.parse_workers,
+            hash_alg=args.hash_alg,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Start-up failed: {e}", file=sys.stderr)
+        sys.exit(1)
+    lru = SessionLRU(args.lru)
+    print(
+        f"Watching {args.spool} -> {args.out} (agents: {', '.join(sorted(PARSERS))}; "
+        f"validate: {'no' if args.no_validate else 'yes'}; sign: {'yes' if args.key else 'no'}; "
+        f"{f'shard: {args.shard[0]}/{args.shard[1]} by {args.shard_key}; ' if args.shard else ''}"
+        f"ready in {(time.perf_counter() - t0) * 1000:.0f} ms)",
+        flush=True,
+    )
+
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
+
+    # --shard: daemons sharing a spool each take only their files; a file's
+    # owner is decided once per (size, mtime). owned maps name -> (size,
+    # mtime_ns, owner) and is pruned with seen, so files other daemons
+    # retire do not accumulate
+    owns = None
+    owned = {}
+    if args.shard:
+
+        def owns(path):
+            st = path.stat()
+            sig = (st.st_size, st.st_mtime_ns)
+            prev = owned.get(path.name)
+            if prev is None or prev[:2] != sig:
+                agent = resolve_agent(path)[0] if args.shard_key == "session-id" else None
+                prev = owned[path.name] = (*sig, in_shard(args.shard, path, args.spool, agent, args.shard_key))
+            return prev[2]
+
+    seen = {}
+    processed = failed = 0
+    while not _stop:
+        ready = _scan(args.spool, 0 if args.once else args.settle, seen, owns)
+        for name in set(owned) - set(seen):
+            del owned[name]
+        for path in ready:
+            if _stop:
+                break
+            line = _ingest(pipeline, path, args.spool, lru)
+            failed += line.startswith("[FAIL]")
+            processed += 1
+            print(f"  {line}", flush=True)
+        if ready and args.metrics:
+            metrics.write(args.metrics)
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+    print(f"Stopped: {processed} processed, {failed} failed, {len(lru)} sessions cached")
+    if profiler:
+        profiler.summary()
+    if args.metrics:
+        metrics.write(args.metrics)
+    sys.exit(1 if args.once and failed else 0)
+
+
+if __name__ == "__main__":
+    main()
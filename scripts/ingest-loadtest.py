@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Load-test client for scripts/ingest-server.py.
+
+Uploads session files with N concurrent connections and reports throughput
+and latency percentiles per status. Stdlib only (asyncio). Each request
+sends `Expect: 100-continue`, so uploads rejected with 503 cost no body
+transfer. With --retry, 503 responses are retried after their Retry-After
+delay; otherwise they are counted as shed load.
+
+Usage:
+  python3 scripts/ingest-loadtest.py --requests 200 --concurrency 16
+  python3 scripts/ingest-loadtest.py --duration 30 --concurrency 64 --retry --json
+
+Options:
+  --url URL            Service base URL (default: http://127.0.0.1:8765)
+  --sessions-dir PATH  Session files to upload, cycled round-robin
+                       (default: examples/sessions/; agent from the filename prefix)
+  --concurrency N      Parallel connections (default: 8)
+  --requests N         Total uploads (default: 100; ignored with --duration)
+  --duration SECONDS   Run for this long instead of a fixed request count
+  --retry              Retry 503 responses after Retry-After
+  --json               Print the summary as JSON
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SESSIONS = REPO_ROOT / "examples" / "sessions"
+
+
+async def _upload(host, port, agent, name, body):
+    """POST one file. Returns (status, retry_after or None)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        head = (
+            f"POST /v1/sessions/{agent} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"X-Session-Name: {name}\r\n"
+            "Expect: 100-continue\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1"))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        if status == 100:
+            await reader.readline()  # blank line after 100 Continue
+            writer.write(body)
+            await writer.drain()
+            status_line = await reader.readline()
+            status = int(status_line.split()[1])
+
+        retry_after = None
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name_, _, value = line.decode("latin-1").partition(":")
+            if name_.strip().lower() == "retry-after":
+                retry_after = float(value.strip())
+        await reader.read()  # drain body until close
+        return status, retry_after
+    finally:
+        writer.close()
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def _run(args, files):
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    latencies = {}  # status -> [seconds]
+    sent_bytes = 0
+    retries = 0
+    next_index = 0
+    deadline = time.perf_counter() + args.duration if args.duration else None
+
+    def take():
+        nonlocal next_index
+        if deadline is not None:
+            if time.perf_counter() >= deadline:
+                return None
+        elif next_index >= args.requests:
+            return None
+        item = files[next_index % len(files)]
+        next_index += 1
+        return item
+
+    async def worker():
+        nonlocal sent_bytes, retries
+        while (item := take()) is not None:
+            agent, name, body = item
+            t0 = time.perf_counter()
+            while True:
+                try:
+                    status, retry_after = await _upload(host, port, agent, name, body)
+                except (ConnectionError, OSError, ValueError, IndexError):
+                    status, retry_after = 0, None
+                if status == 503 and args.retry:
+                    retries += 1
+                    await asyncio.sleep(retry_after or 1.0)
+                    continue
+                break
+            latencies.setdefault(status, []).append(time.perf_counter() - t0)
+            if status == 200:
+                sent_bytes += len(body)
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - t_start
+
+    ok = sorted(latencies.get(200, []))
+    summary = {
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": sum(len(v) for v in latencies.values()),
+        "status": {str(k): len(v) for k, v in sorted(latencies.items())},
+        "retries": retries,
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "throughput_mb_s": round(sent_bytes / 1024 / 1024 / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            name: round(_percentile(ok, p) * 1000, 1)
+            for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))
+        },
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Service base URL")
+    parser.add_argument(
+        "--sessions-dir",
+        type=Path,
+        default=DEFAULT_SESSIONS,
+        help=f"Session files to upload (default: {DEFAULT_SESSIONS.relative_to(REPO_ROOT)})",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel connections (default: 8)")
+    parser.add_argument("--requests", type=int, default=100, help="Total uploads (default: 100)")
+    parser.add_argument("--duration", type=float, default=None, help="Run for SECONDS instead of --requests")
+    parser.add_argument("--retry", action="store_true", help="Retry 503 responses after Retry-After")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    files = [
+        (p.name.split("-")[0], p.stem, p.read_bytes())
+        for p in sorted(args.sessions_dir.iterdir())
+        if p.name.endswith((".jsonl", ".json"))
+    ]
+    if not files:
+        print(f"No session files in {args.sessions_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    summary = asyncio.run(_run(args, files))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(
+        f"{summary['requests']} requests in {summary['elapsed_seconds']:.1f} s "
+        f"({args.concurrency} connections, {summary['retries']} retries after 503)"
+    )
+    print("Status: " + ", ".join(f"{k}: {v}" for k, v in summary["status"].items()))
+    print(f"Throughput: {summary['throughput_rps']} uploads/s, {summary['throughput_mb_s']} MB/s")
+    lat = summary["latency_ms"]
+    print(f"Latency (200): p50 {lat['p50']} ms, p90 {lat['p90']} ms, p99 {lat['p99']} ms, max {lat['max']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Local HTTP ingest service: agents upload raw session files, the service
+returns the verifiable-agent-record and its detached COSE_Sign1 signature.
+
+Stdlib only (asyncio). Binds to 127.0.0.1 by default. Uploads are streamed
+to disk in 64 KiB chunks, written off the event loop, and never held in
+memory. Parse -> wrap_record -> cddl -> sign runs in a bounded process pool
+whose workers each keep a warm vac.pipeline.Pipeline (parsers, crypto
+imports, parsed key). An upload's file is removed once its pipeline run ends.
+
+API:
+  POST /v1/sessions/<agent>     body: raw native session file (any PARSERS agent)
+       Content-Length or Transfer-Encoding: chunked
+       optional X-Session-Name: used in output file names
+    200  {"ok": true, "agent", "session-id", "entries", "content-hash",
+          "record-sha256" (of the record bytes as written),
+          "record": <verifiable-agent-record>, "sig": "<base64 .sig.cbor>"}
+    422  {"ok": false, "error": ...}      parse or CDDL validation failed
+    503  Retry-After: N                  all workers busy and the queue is full
+    400 / 404 / 405 / 411 / 413 / 431 for malformed requests
+  GET  /v1/health                       {"workers", "queue", "in-flight", "served"}
+
+Backpressure: at most --workers + --queue uploads are admitted at once.
+Further requests get 503 before their body is read, so a saturated service
+sheds load without buffering it. Clients sending `Expect: 100-continue`
+(curl does for large bodies) learn this before uploading anything.
+
+Produced .spec.json / .sig.cbor files are also kept in --out.
+
+Usage:
+  python3 scripts/ingest-server.py --out /tmp/vac-ingest --key /tmp/vac-keys/signing-key.pem
+  curl --data-binary @examples/sessions/claude-opus-4-6.jsonl \\
+    http://127.0.0.1:8765/v1/sessions/claude
+
+  # Load test: see scripts/ingest-loadtest.py
+
+Options:
+  --host HOST          Bind address (default: 127.0.0.1)
+  --port N             Port (default: 8765)
+  --out DIR            Directory for produced records and signatures
+  --key PATH           Ed25519 private key PEM (default: records are not signed)
+  --schema PATH        CDDL schema (default: agent-conversation.cddl)
+  --no-validate        Skip CDDL validation
+  --workers N          Worker processes (default: CPU count)
+  --queue N            Uploads admitted beyond busy workers before 503 (default: --workers)
+  --max-bytes N        Largest accepted upload (default: 256 MiB)
+  --metrics PATH       Write request metrics at shutdown (see vac.metrics)
+
+Requires: pycose, cbor2 (when signing), cddl gem (when validating)
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import re
+import signal
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from vac import PARSERS, Pipeline
+from vac import metrics as vac_metrics
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCHEMA = REPO_ROOT / "agent-conversation.cddl"
+
+CHUNK = 64 * 1024
+MAX_HEADERS = 100
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    422: "Unprocessable Entity",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+_NAME_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+# ---------------------------------------------------------------------------
+# Worker process: one warm Pipeline per process
+# ---------------------------------------------------------------------------
+
+_pipeline = None
+
+
+def _worker_init(out_dir, schema, key_pem):
+    global _pipeline
+    _pipeline = Pipeline(out_dir, schema=schema, key_pem=key_pem)
+
+
+def _worker_process(path, agent):
+    """Run the pipeline on an uploaded file. Returns (result, record bytes, sig bytes)."""
+    blocks = []  # the record JSON as the pipeline encodes it, so it is not read back
+    try:
+        result = _pipeline.process(path, agent, consumers=(blocks.append,))
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}, None, None
+    if not result["ok"]:
+        return result, None, None
+    record_bytes = b"".join(blocks)
+    sig_bytes = Path(result["sig"]).read_bytes() if result["sig"] else None
+    return result, record_bytes, sig_bytes
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+async def _readline(reader, status, message):
+    """reader.readline(), raising HTTPError(status, message) for a line over the
+    stream limit (CHUNK). The stream is then mid-line, so the connection must
+    not be read further; every response closes it."""
+    try:
+        return await reader.readline()
+    except ValueError:  # readline re-raises LimitOverrunError as ValueError
+        raise HTTPError(status, message) from None
+
+
+async def _read_head(reader):
+    """Read request line and headers. Returns (method, target, headers) or None on EOF."""
+    line = await _readline(reader, 400, "request line too long")
+    if not line:
+        return None
+    try:
+        method, target, _version = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    for _ in range(MAX_HEADERS):
+        line = await _readline(reader, 431, "header line too long")
+        if line in (b"\r\n", b"\n", b""):
+            return method, target, headers
+        name, sep, value = line.decode("latin-1").partition(":")
+        if not sep:
+            raise HTTPError(400, "malformed header")
+        headers[name.strip().lower()] = value.strip()
+    raise HTTPError(400, "too many headers")
+
+
+def _body_length(headers, max_bytes):
+    """Check framing headers before admission. Returns Content-Length, or None if chunked."""
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        return None
+    if "content-length" not in headers:
+        raise HTTPError(411, "Content-Length or chunked Transfer-Encoding required")
+    try:
+        length = int(headers["content-length"])
+    except ValueError:
+        raise HTTPError(400, "malformed Content-Length")
+    if length > max_bytes:
+        raise HTTPError(413, f"upload exceeds {max_bytes} bytes")
+    return length
+
+
+async def _stream_body(reader, length, dest, max_bytes):
+    """Stream the request body to dest without buffering it. Returns bytes written.
+
+    length is the Content-Length, or None for chunked transfer encoding.
+    File I/O runs in the default thread pool, one chunk at a time: the write
+    of a chunk overlaps the read of the next, and a slow disk stalls only
+    this upload, not the event loop.
+    """
+    f = await asyncio.to_thread(open, dest, "wb")
+    pending = None  # write of the previous chunk
+
+    async def write(data):
+        nonlocal pending
+        if pending is not None:
+            await pending
+        pending = asyncio.ensure_future(asyncio.to_thread(f.write, data))
+
+    total = 0
+    try:
+        if length is not None:
+            while total < length:
+                data = await reader.read(min(CHUNK, length - total))
+                if not data:
+                    raise HTTPError(400, "truncated body")
+                await write(data)
+                total += len(data)
+            return total
+        while True:
+            size_line = await _readline(reader, 400, "chunk size line too long")
+            try:
+                size = int(size_line.split(b";")[0].strip(), 16)
+            except ValueError:
+                raise HTTPError(400, "malformed chunk size")
+            if size == 0:
+                while (await _readline(reader, 431, "trailer line too long")) not in (b"\r\n", b"\n", b""):
+                    pass  # trailers
+                return total
+            total += size
+            if total > max_bytes:
+                raise HTTPError(413, f"upload exceeds {max_bytes} bytes")
+            while size:
+                data = await reader.read(min(CHUNK, size))
+                if not data:
+                    raise HTTPError(400, "truncated chunk")
+                await write(data)
+                size -= len(data)
+            await _readline(reader, 400, "malformed chunk")  # CRLF after chunk
+    finally:
+        try:
+            if pending is not None:
+                await pending
+        finally:
+            await asyncio.to_thread(f.close)
+
+
+def _response(status, body, content_type="application/json", headers=None):
+    head = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+    ]
+    for name, value in (headers or {}).items():
+        head.append(f"{name}: {value}")
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _json_response(status, obj, headers=None):
+    return _response(status, json.dumps(obj).encode("utf-8"), headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# Service
+# ---------------------------------------------------------------------------
+
+
+class IngestService:
+    """Admission control, upload streaming and dispatch to the process pool."""
+
+    def __init__(self, pool, workers, queue, work_dir, max_bytes, metrics):
+        self.pool = pool
+        self.workers = workers
+        self.capacity = workers + queue
+        self.work_dir = Path(work_dir)
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.metrics = metrics
+        self.in_flight = 0
+        self.served = 0
+        self._avg_seconds = 1.0  # EWMA of pipeline time, for Retry-After
+
+    async def handle(self, reader, writer):
+        t0 = time.perf_counter()
+        status, agent, nbytes, entries = 500, "-", 0, 0
+        admitted = False
+        try:
+            try:
+                head = await _read_head(reader)
+                if head is None:
+                    return
+                method, target, headers = head
+                path = urlsplit(target).path.rstrip("/")
+
+                if path == "/v1/health":
+                    if method != "GET":
+                        raise HTTPError(405, "use GET", {"Allow": "GET"})
+                    status = 200
+                    payload = _json_response(
+                        200,
+                        {
+                            "workers": self.workers,
+                            "queue": self.capacity - self.workers,
+                            "in-flight": self.in_flight,
+                            "served": self.served,
+                        },
+                    )
+                    writer.write(payload)
+                    return
+
+                parts = path.split("/")
+                if len(parts) != 4 or parts[1:3] != ["v1", "sessions"]:
+                    raise HTTPError(404, "POST /v1/sessions/<agent>")
+                agent = parts[3]
+                if method != "POST":
+                    raise HTTPError(405, "use POST", {"Allow": "POST"})
+                if agent not in PARSERS:
+                    raise HTTPError(404, f"unknown agent {agent!r}; known: {', '.join(sorted(PARSERS))}")
+
+                length = _body_length(headers, self.max_bytes)
+
+                # Admission control before reading the body
+                if self.in_flight >= self.capacity:
+                    retry = max(1, round(self._avg_seconds * self.in_flight / self.workers))
+                    raise HTTPError(503, "ingest workers saturated", {"Retry-After": str(retry)})
+                self.in_flight += 1
+                admitted = True
+                if headers.get("expect", "").lower() == "100-continue":
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    await writer.drain()
+
+                name = _NAME_RE.sub("_", headers.get("x-session-name", ""))[:64].strip("._")
+                if name and not name.startswith(f"{agent}-"):
+                    name = f"{agent}-{name}"
+                stem = f"{name or agent}-{uuid.uuid4().hex[:12]}"
+                upload = self.work_dir / f"{stem}{'.json' if agent == 'gemini' else '.jsonl'}"
+                # The upload is removed however the pipeline ends: result, error,
+                # worker crash (BrokenProcessPool) or client disconnect
+                try:
+                    nbytes = await _stream_body(reader, length, upload, self.max_bytes)
+                    loop = asyncio.get_running_loop()
+                    t_work = time.perf_counter()
+                    result, record_bytes, sig_bytes = await loop.run_in_executor(
+                        self.pool, _worker_process, str(upload), agent
+                    )
+                finally:
+                    upload.unlink(missing_ok=True)
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - t_work)
+                entries = result.get("entries", 0)
+
+                if not result["ok"]:
+                    status = 422
+                    writer.write(_json_response(422, {"ok": False, "agent": agent, "error": result["error"]}))
+                    return
+
+                # Splice the record bytes in as-is rather than re-parsing them
+                head_obj = {
+                    "ok": True,
+                    "agent": agent,
+                    "session-id": result["session_id"],
+                    "entries": entries,
+                    "content-hash": result["content_hash"],
+                    "record-sha256": result["record_sha256"],
+                }
+                sig = json.dumps(base64.b64encode(sig_bytes).decode("ascii") if sig_bytes else None)
+                body = (
+                    json.dumps(head_obj)[:-1].encode("utf-8")
+                    + b', "record": '
+                    + record_bytes
+                    + b', "sig": '
+                    + sig.encode("ascii")
+                    + b"}"
+                )
+                status = 200
+                writer.write(_response(200, body))
+            except HTTPError as e:
+                status = e.status
+                writer.write(_json_response(e.status, {"ok": False, "error": str(e)}, e.headers))
+            except Exception as e:
+                status = 500
+                writer.write(_json_response(500, {"ok": False, "error": f"{type(e).__name__}: {e}"}))
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if admitted:
+                self.in_flight -= 1
+                self.served += 1
+            writer.close()
+            seconds = time.perf_counter() - t0
+            if self.metrics is not None and agent != "-":
+                self.metrics.observe_stage("request", None, seconds)
+                if status in (200, 422):
+                    self.metrics.file_done(agent, "pass" if status == 200 else "fail", nbytes, entries)
+            print(f"{status} {agent} {nbytes}B {seconds * 1000:.0f}ms in-flight={self.in_flight}", flush=True)
+
+
+async def _serve(args, pool, metrics):
+    service = IngestService(pool, args.workers, args.queue, args.out / ".incoming", args.max_bytes, metrics)
+    server = await asyncio.start_server(service.handle, args.host, args.port, limit=CHUNK)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    print(
+        f"Listening on http://{args.host}:{args.port}/v1/sessions/<agent> "
+        f"({args.workers} workers, queue {args.queue}, out {args.out})",
+        flush=True,
+    )
+    async with server:
+        await stop.wait()
+    print(f"Stopped: {service.served} uploads served")
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    parser.add_argument("--out", type=Path, required=True, help="Directory for produced records and signatures")
+    parser.add_argument("--key", type=Path, default=None, help="Ed25519 private key PEM (default: do not sign)")
+    parser.add_argument(
+        "--schema",
+        type=Path,
+        default=SCHEMA,
+        help=f"Path to CDDL schema file (default: {SCHEMA.relative_to(REPO_ROOT)})",
+    )
+    parser.add_argument("--no-validate", action="store_true", help="Skip CDDL validation")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--queue", type=int, default=None, help="Uploads admitted beyond busy workers before 503")
+    parser.add_argument("--max-bytes", type=int, default=256 * 1024 * 1024, help="Largest accepted upload")
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Write request metrics at shutdown: Prometheus textfile if PATH ends in .prom, JSON otherwise",
+    )
+    args = parser.parse_args()
+    if args.queue is None:
+        args.queue = args.workers
+
+    schema = None if args.no_validate else args.schema
+    if schema is not None and not schema.exists():
+        print(f"Schema not found: {schema}", file=sys.stderr)
+        sys.exit(1)
+    key_pem = args.key.read_text(encoding="utf-8") if args.key else None
+    args.out.mkdir(parents=True, exist_ok=True)
+    metrics = vac_metrics.enable("ingest-server") if args.metrics else None
+
+    # Workers start on demand, while connections are open. Forked from this
+    # process they would inherit the client sockets and hold them open after
+    # the service closes them, so clients would never see the response end.
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("forkserver"),
+        initializer=_worker_init,
+        initargs=(str(args.out), schema, key_pem),
+    )
+    try:
+        asyncio.run(_serve(args, pool, metrics))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    if metrics:
+        metrics.write(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
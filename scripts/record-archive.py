@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Pack produced records and signatures into an indexed archive, and read it back.
+
+One `<stem>.spec.json` and one `<stem>.sig.cbor` per session add up to
+millions of small files. An archive (see vac.archive) stores them as
+members of a few append-only segment files with a trailing index: session-id
+-> offset, length, digests and record meta. Members are compressed one by
+one and read through a memory map, so `list` reads only the indexes and
+`extract`/`verify` of one member touch only its bytes.
+
+Usage:
+  # Pack a directory of produced records (appends; re-packing a session shadows the old member)
+  python3 scripts/record-archive.py pack --archive /srv/vac/archive /tmp/vac-produced
+
+  # Same, removing the packed files once their batch is committed
+  python3 scripts/record-archive.py pack --archive /srv/vac/archive --remove /tmp/vac-produced
+
+  # Members with their meta
+  python3 scripts/record-archive.py list --archive /srv/vac/archive
+
+  # Members back to files (all members without session ids)
+  python3 scripts/record-archive.py extract --archive /srv/vac/archive --out /tmp/x SESSION-ID...
+
+  # Digests of every member; with --key also signatures (--cache as in sign-record.py verify)
+  python3 scripts/record-archive.py verify --archive /srv/vac/archive
+  python3 scripts/record-archive.py verify --archive /srv/vac/archive \\
+    --key /tmp/vac-keys/signing-key.pub.pem --cache ~/.cache/vac/verify.sqlite
+
+Members are addressed by session-id or by name (the file stem they were
+packed from). verify exits 1 if any member fails.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from vac import (
+    ARCHIVE_CODECS,
+    DEFAULT_ARCHIVE_CODEC,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_SEGMENT_BYTES,
+    RecordArchive,
+    VerifyCache,
+    extract_member,
+    verify_member,
+)
+from vac import profiling as vac_profile
+
+_RECORD_SUFFIX = ".spec.json"
+_SIG_SUFFIX = ".sig.cbor"
+
+
+def _record_files(inputs):
+    """Record files named by the inputs (files, or directories of *.spec.json), in order."""
+    for path in inputs:
+        if path.is_dir():
+            yield from sorted(path.glob(f"*{_RECORD_SUFFIX}"))
+        else:
+            yield path
+
+
+# ---------------------------------------------------------------------------
+# Subcommands
+# ---------------------------------------------------------------------------
+
+
+def cmd_pack(args):
+    """Append records (and their signatures) to an archive, one batch per --batch records."""
+    archive = RecordArchive(args.archive, create=True, segment_bytes=args.segment_bytes)
+    files = list(_record_files(args.inputs))
+    packed = raw = 0
+    t0 = time.perf_counter()
+    for start in range(0, len(files), args.batch):
+        batch = files[start : start + args.batch]
+        done = []
+        with archive.writer(args.codec, args.level) as writer:
+            for path in batch:
+                name = path.name[: -len(_RECORD_SUFFIX)] if path.name.endswith(_RECORD_SUFFIX) else path.stem
+                sig_path = path.with_name(name + _SIG_SUFFIX)
+                record_bytes = path.read_bytes()
+                sig_bytes = sig_path.read_bytes() if sig_path.exists() else None
+                writer.add(name, record_bytes, sig_bytes)
+                raw += len(record_bytes) + len(sig_bytes or b"")
+                done.append((path, sig_path if sig_bytes is not None else None))
+        packed += len(done)
+        # Only after the batch index is on disk
+        if args.remove:
+            for path, sig_path in done:
+                path.unlink()
+                if sig_path is not None:
+                    sig_path.unlink()
+    elapsed = time.perf_counter() - t0
+    size = sum(p.stat().st_size for p in Path(args.archive).glob("segment-*"))
+    print(
+        f"Packed {packed} records ({raw / 1e6:.1f} MB) in {elapsed:.2f} s; "
+        f"archive: {len(archive)} members, {archive.segments} segments, {size / 1e6:.1f} MB"
+    )
+    archive.close()
+
+
+def cmd_list(args):
+    """Print the members of an archive (from the indexes only)."""
+    with RecordArchive(args.archive) as archive:
+        for sid in archive:
+            member = archive.member(sid)
+            if args.json:
+                print(json.dumps(member, ensure_ascii=False))
+                continue
+            meta = member["meta"]
+            print(
+                f"  {sid:<40} {member['name']:<40} {meta['entries']:>7} entries  {member['size']:>10} B "
+                f"({member['codec']}, {member['length']} B)  {'signed' if member['sig-length'] else 'unsigned'}"
+            )
+        if not args.json:
+            print(f"{len(archive)} members in {archive.segments} segments", file=sys.stderr)
+
+
+def cmd_extract(args):
+    """Write members back out as .spec.json / .sig.cbor files."""
+    with RecordArchive(args.archive) as archive:
+        keys = args.members or list(archive)
+        for key in keys:
+            try:
+                paths = extract_member(archive, key, args.out)
+            except KeyError:
+                print(f"  [FAIL] {key}: not in archive", file=sys.stderr)
+                sys.exit(1)
+            print(" ".join(str(p) for p in paths))
+
+
+def cmd_verify(args):
+    """Check member digests and, with --key, signatures."""
+    key_pem = Path(args.key).read_text(encoding="utf-8") if args.key else None
+    cache = VerifyCache(args.cache, ttl=args.cache_ttl) if args.cache else None
+    failed = cached = 0
+    t0 = time.perf_counter()
+    with RecordArchive(args.archive) as archive:
+        keys = args.members or list(archive)
+        for key in keys:
+            if key not in archive:
+                print(f"  [FAIL] {key}: not in archive")
+                failed += 1
+                continue
+            ok, err, details = verify_member(archive, key, key_pem, cache)
+            if not ok:
+                print(f"  [FAIL] {key}: {err}")
+                failed += 1
+            elif details and details.get("cached"):
+                cached += 1
+    if cache:
+        cache.close()
+    what = "signatures" if key_pem else "digests"
+    print(
+        f"{len(keys) - failed}/{len(keys)} members verified ({what}, {cached} cached) "
+        f"in {time.perf_counter() - t0:.2f} s",
+        file=sys.stderr,
+    )
+    sys.exit(1 if failed else 0)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    # Options shared by all subcommands
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--archive", required=True, help="Archive directory")
+    vac_profile.add_argument(common)
+
+    # pack
+    pk = sub.add_parser("pack", parents=[common], help="Append records and signatures to an archive")
+    pk.add_argument("inputs", nargs="+", type=Path, help="Record files or directories of *.spec.json")
+    pk.add_argument(
+        "--codec",
+        choices=list(ARCHIVE_CODECS),
+        default=DEFAULT_ARCHIVE_CODEC,
+        help=f"Record compression (default: {DEFAULT_ARCHIVE_CODEC})",
+    )
+    pk.add_argument("--level", type=int, default=None, help="Compression level (codec default if omitted)")
+    pk.add_argument("--batch", type=int, default=1000, help="Records per index batch (default: 1000)")
+    pk.add_argument(
+        "--segment-bytes",
+        type=int,
+        default=DEFAULT_SEGMENT_BYTES,
+        help=f"Start a new segment past this size (default: {DEFAULT_SEGMENT_BYTES})",
+    )
+    pk.add_argument("--remove", action="store_true", help="Delete packed files once their batch is committed")
+
+    # list
+    ls = sub.add_parser("list", parents=[common], help="List archive members")
+    ls.add_argument("--json", action="store_true", help="One JSON object per member")
+
+    # extract
+    ex = sub.add_parser("extract", parents=[common], help="Write members back out as files")
+    ex.add_argument("members", nargs="*", help="Session ids or names (default: all)")
+    ex.add_argument("--out", required=True, type=Path, help="Output directory")
+
+    # verify
+    vf = sub.add_parser("verify", parents=[common], help="Verify member digests and signatures")
+    vf.add_argument("members", nargs="*", help="Session ids or names (default: all)")
+    vf.add_argument("--key", help="Public key PEM: also verify signatures")
+    vf.add_argument("--cache", help="Verification cache (sqlite3) to consult and update")
+    vf.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        help=f"Re-verify cached results older than this many seconds (default: {DEFAULT_CACHE_TTL})",
+    )
+
+    args = parser.parse_args()
+    profiler = vac_profile.enable(args.profile) if args.profile else None
+
+    if args.command == "pack":
+        cmd_pack(args)
+    elif args.command == "list":
+        cmd_list(args)
+    elif args.command == "extract":
+        cmd_extract(args)
+    elif args.command == "verify":
+        cmd_verify(args)
+
+    if profiler:
+        profiler.summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+Full-text search over agent session traces via an on-disk inverted index.
+
+The index is built from the entries the vac.parsers parsers emit,
+not from the raw native files, so every agent format is searchable through
+the same canonical fields:
+
+  content   Flattened with _content_to_str (strings, block lists, nested parts)
+  output    Tool results, flattened the same way
+  input     Tool arguments. Codex stores these as JSON-encoded strings, which
+            are decoded once at index time so their values become searchable.
+
+Files are routed to a parser with vac.resolve_agent: their `<agent>-` name
+prefix, or the sniffed format for vendor-named files (--verbose prints
+each detection).
+
+Each entry (and each child entry) is one document. A hit is reported as
+session-id plus entry reference: the native entry `id` when the format has
+one, otherwise the positional reference `#<n>` (children: `#<n>/<m>`).
+
+Index layout (one directory):
+
+  manifest.json         Indexed files with mtime/size and owning segment,
+                        and the live segments
+  seg-NNNNNN.files      The segment's files: [file, session-id] per file
+  seg-NNNNNN.terms      Sorted term dictionary: term -> postings offset,
+                        length and document count
+  seg-NNNNNN.docs       Document table: document -> file, entry reference
+  seg-NNNNNN.post       zlib-compressed postings, one blob per term
+
+.terms and .docs are row tables (a row count, a little-endian u64 offset
+per row, the rows) read through a memory map. A query binary-searches the
+dictionary for its terms and reads only the postings and document rows it
+hits, so its cost does not grow with the size of the dictionary.
+
+Postings store document gaps and token-position gaps as varints, so phrase
+queries are answered from the index alone. Builds are incremental: only new
+or modified session files are parsed, into a fresh segment. Documents of
+files that were re-indexed or removed are masked by the manifest; a segment
+left without live files is deleted, and once a build leaves more than
+--max-segments segments they are merged into one without the masked
+documents.
+
+Usage:
+  # Build or update the index
+  python3 scripts/search-index.py build --index /tmp/vac-index \\
+    --sessions-dir examples/sessions/
+
+  # Term query (all terms must match) and phrase query
+  python3 scripts/search-index.py query --index /tmp/vac-index apply_patch
+  python3 scripts/search-index.py query --index /tmp/vac-index '"cargo test"' tokio
+
+Options:
+  --rebuild            Discard existing segments and index everything again
+  --max-segments N     Merge all segments once a build leaves more (default: 8)
+  --limit N            Max hits to print per query (default: 20)
+"""
+
+import argparse
+import json
+import mmap
+import re
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+
+from vac import PARSERS, resolve_agent
+from vac.parsers import _content_to_str
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_SESSIONS = REPO_ROOT / "examples" / "sessions"
+
+INDEX_VERSION = 2
+DEFAULT_MAX_SEGMENTS = 8
+_TOKEN_RE = re.compile(r"\w+")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+# ---------------------------------------------------------------------------
+# Text extraction and tokenization
+# ---------------------------------------------------------------------------
+
+
+def _input_to_str(value):
+    """Flatten tool input to searchable text.
+
+    JSON-encoded argument strings (Codex function_call) are decoded first;
+    dicts and lists contribute their scalar leaves, keys are not indexed.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return value
+    if isinstance(value, dict):
+        return "\n".join(_input_to_str(v) for v in value.values())
+    if isinstance(value, list):
+        return "\n".join(_input_to_str(v) for v in value)
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _entry_text(entry):
+    """Return the searchable text fields of one entry."""
+    fields = []
+    if "content" in entry:
+        fields.append(_content_to_str(entry["content"]))
+    if "output" in entry:
+        fields.append(_content_to_str(entry["output"]))
+    if "input" in entry:
+        fields.append(_input_to_str(entry["input"]))
+    return fields
+
+
+def _tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _iter_documents(entries):
+    """Yield (entry_ref, entry) for every entry and child entry."""
+    for i, entry in enumerate(entries):
+        ref = entry.get("id") or f"#{i}"
+        yield ref, entry
+        for j, child in enumerate(entry.get("children", [])):
+            yield child.get("id") or f"#{i}/{j}", child
+
+
+# ---------------------------------------------------------------------------
+# Postings encoding: varint gaps, zlib per term
+# ---------------------------------------------------------------------------
+
+
+def _put_varint(buf, n):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _get_varint(data, pos):
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _encode_postings(postings):
+    """Encode [(doc, [positions]), ...] (doc-ascending) as a compressed blob."""
+    buf = bytearray()
+    _put_varint(buf, len(postings))
+    prev_doc = 0
+    for doc, positions in postings:
+        _put_varint(buf, doc - prev_doc)
+        prev_doc = doc
+        _put_varint(buf, len(positions))
+        prev_pos = 0
+        for p in positions:
+            _put_varint(buf, p - prev_pos)
+            prev_pos = p
+    return zlib.compress(bytes(buf))
+
+
+def _decode_postings(blob):
+    """Inverse of _encode_postings. Returns {doc: [positions]}."""
+    data = zlib.decompress(blob)
+    count, pos = _get_varint(data, 0)
+    result = {}
+    doc = 0
+    for _ in range(count):
+        gap, pos = _get_varint(data, pos)
+        doc += gap
+        npos, pos = _get_varint(data, pos)
+        positions = []
+        p = 0
+        for _ in range(npos):
+            delta, pos = _get_varint(data, pos)
+            p += delta
+            positions.append(p)
+        result[doc] = positions
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Row tables: term dictionary and document table
+# ---------------------------------------------------------------------------
+
+_TABLE_HEAD = struct.Struct("<4sQ")  # magic, row count
+_TERMS_MAGIC = b"VACT"
+_DOCS_MAGIC = b"VACD"
+_SEGMENT_SUFFIXES = (".files", ".terms", ".docs", ".post")
+
+
+def _write_table(path, magic, rows):
+    """Write rows (bytes) as a seekable table: header, count + 1 row offsets, rows."""
+    offsets = [0]
+    for row in rows:
+        offsets.append(offsets[-1] + len(row))
+    with open(path, "wb") as f:
+        f.write(_TABLE_HEAD.pack(magic, len(rows)))
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        f.writelines(rows)
+
+
+class _Table:
+    """A row table written by _write_table, memory-mapped read-only."""
+
+    def __init__(self, path, magic):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        found, self.count = _TABLE_HEAD.unpack_from(self._mm)
+        if found != magic:
+            self._mm.close()
+            raise ValueError(f"{path}: not a {magic.decode()} table")
+        self._rows = _TABLE_HEAD.size + 8 * (self.count + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._mm.close()
+
+    def row(self, i):
+        start, end = struct.unpack_from("<QQ", self._mm, _TABLE_HEAD.size + 8 * i)
+        return self._mm[self._rows + start : self._rows + end]
+
+
+def _term_key(term):
+    # Code point order is UTF-8 byte order, so sorted(str) sorts the keys too
+    return term.encode("utf-8", "surrogatepass")
+
+
+def _term_row(term, offset, length, count):
+    key = _term_key(term)
+    buf = bytearray()
+    _put_varint(buf, len(key))
+    buf += key
+    _put_varint(buf, offset)
+    _put_varint(buf, length)
+    _put_varint(buf, count)
+    return bytes(buf)
+
+
+def _read_term_row(row):
+    """Inverse of _term_row: (term key, postings offset, length, document count)."""
+    n, pos = _get_varint(row, 0)
+    key = row[pos : pos + n]
+    offset, pos = _get_varint(row, pos + n)
+    length, pos = _get_varint(row, pos)
+    count, _ = _get_varint(row, pos)
+    return key, offset, length, count
+
+
+def _lookup(terms, token):
+    """(postings offset, length, document count) of token, or None: a binary search of the term table."""
+    key = _term_key(token)
+    lo, hi = 0, terms.count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        found, *info = _read_term_row(terms.row(mid))
+        if found < key:
+            lo = mid + 1
+        elif found > key:
+            hi = mid
+        else:
+            return info
+    return None
+
+
+def _doc_row(file_idx, ref):
+    buf = bytearray()
+    _put_varint(buf, file_idx)
+    return bytes(buf) + ref.encode("utf-8", "surrogatepass")
+
+
+def _read_doc_row(row):
+    """Inverse of _doc_row: (file index, entry reference)."""
+    file_idx, pos = _get_varint(row, 0)
+    return file_idx, row[pos:].decode("utf-8", "surrogatepass")
+
+
+# ---------------------------------------------------------------------------
+# Index storage
+# ---------------------------------------------------------------------------
+
+
+def _load_manifest(index_dir):
+    path = index_dir / "manifest.json"
+    if not path.exists():
+        return {"version": INDEX_VERSION, "next_segment": 1, "segments": [], "files": {}}
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    if manifest.get("version") != INDEX_VERSION:
+        raise ValueError(
+            f"Unsupported index version {manifest.get('version')} (expected {INDEX_VERSION}; build with --rebuild)"
+        )
+    return manifest
+
+
+def _save_manifest(index_dir, manifest):
+    tmp = index_dir / "manifest.json.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    tmp.replace(index_dir / "manifest.json")
+
+
+def _segment_name(seg_no):
+    return f"seg-{seg_no:06d}"
+
+
+def _write_segment(index_dir, seg_no, files, docs, postings):
+    """Write one segment: files, term dictionary, document table and postings blobs."""
+    name = _segment_name(seg_no)
+    rows = []
+    offset = 0
+    with open(index_dir / f"{name}.post", "wb") as f:
+        for term in sorted(postings):
+            blob = _encode_postings(postings[term])
+            f.write(blob)
+            rows.append(_term_row(term, offset, len(blob), len(postings[term])))
+            offset += len(blob)
+    _write_table(index_dir / f"{name}.terms", _TERMS_MAGIC, rows)
+    _write_table(index_dir / f"{name}.docs", _DOCS_MAGIC, [_doc_row(file_idx, ref) for file_idx, ref in docs])
+    (index_dir / f"{name}.files").write_text(json.dumps(files, separators=(",", ":")), encoding="utf-8")
+
+
+def _live_files(index_dir, manifest, seg_no):
+    """The segment's [file, session-id] list and the indexes of the files it still owns."""
+    files = json.loads((index_dir / f"{_segment_name(seg_no)}.files").read_text(encoding="utf-8"))
+    live = {i for i, (key, _) in enumerate(files) if manifest["files"].get(key, {}).get("segment") == seg_no}
+    return files, live
+
+
+def _merge_segments(index_dir, manifest, seg_nos, seg_no):
+    """Merge the live documents of seg_nos into the new segment seg_no. Returns its document count."""
+    files, docs, postings = [], [], {}
+    for old in seg_nos:
+        name = _segment_name(old)
+        old_files, live = _live_files(index_dir, manifest, old)
+        file_map = {}
+        for i in sorted(live):
+            file_map[i] = len(files)
+            files.append(old_files[i])
+        doc_map = {}
+        with (
+            _Table(index_dir / f"{name}.docs", _DOCS_MAGIC) as old_docs,
+            _Table(index_dir / f"{name}.terms", _TERMS_MAGIC) as old_terms,
+            open(index_dir / f"{name}.post", "rb") as post_file,
+        ):
+            for doc in range(old_docs.count):
+                file_idx, ref = _read_doc_row(old_docs.row(doc))
+                if file_idx in file_map:
+                    doc_map[doc] = len(docs)
+                    docs.append([file_map[file_idx], ref])
+            for i in range(old_terms.count):
+                key, offset, length, _ = _read_term_row(old_terms.row(i))
+                post_file.seek(offset)
+                # Documents are renumbered in segment order, so each list stays doc-ascending
+                kept = [(doc_map[d], p) for d, p in _decode_postings(post_file.read(length)).items() if d in doc_map]
+                if kept:
+                    postings.setdefault(key.decode("utf-8", "surrogatepass"), []).extend(kept)
+    _write_segment(index_dir, seg_no, files, docs, postings)
+    for key, _ in files:
+        manifest["files"][key]["segment"] = seg_no
+    return len(docs)
+
+
+def _compact(index_dir, manifest, max_segments):
+    """Drop segments without live files; merge all segments once there are more
+    than max_segments. Updates the manifest and returns the segments to delete
+    once it is saved."""
+    owning = {known["segment"] for known in manifest["files"].values()}
+    stale = [seg_no for seg_no in manifest["segments"] if seg_no not in owning]
+    manifest["segments"] = [seg_no for seg_no in manifest["segments"] if seg_no in owning]
+    if len(manifest["segments"]) > max_segments:
+        seg_no = manifest["next_segment"]
+        start = time.perf_counter()
+        ndocs = _merge_segments(index_dir, manifest, manifest["segments"], seg_no)
+        print(
+            f"Merged {len(manifest['segments'])} segments into {_segment_name(seg_no)} "
+            f"({ndocs} documents) in {time.perf_counter() - start:.2f}s"
+        )
+        stale += manifest["segments"]
+        manifest["segments"] = [seg_no]
+        manifest["next_segment"] = seg_no + 1
+    return stale
+
+
+def _delete_segments(index_dir, seg_nos):
+    for seg_no in seg_nos:
+        for suffix in _SEGMENT_SUFFIXES:
+            (index_dir / f"{_segment_name(seg_no)}{suffix}").unlink(missing_ok=True)
+
+
+def _index_file(path, agent, file_idx, docs, postings):
+    """Parse one session file and add its entries to the in-memory segment."""
+    entries, meta = PARSERS[agent](path)
+    session_id = meta["session_id"] or path.stem
+    for ref, entry in _iter_documents(entries):
+        doc = len(docs)
+        docs.append([file_idx, ref])
+        positions = {}
+        pos = 0
+        for text in _entry_text(entry):
+            for token in _tokenize(text):
+                positions.setdefault(token, []).append(pos)
+                pos += 1
+            pos += 1  # field gap: phrases never span two fields
+        for token, plist in positions.items():
+            postings.setdefault(token, []).append((doc, plist))
+    return session_id
+
+
+def cmd_build(args):
+    """Incrementally index new or modified session files into a new segment."""
+    index_dir = Path(args.index)
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.rebuild:
+        for stale in index_dir.glob("seg-*"):
+            stale.unlink()
+        (index_dir / "manifest.json").unlink(missing_ok=True)
+    manifest = _load_manifest(index_dir)
+
+    sessions = {}
+    for s in sorted(Path(args.sessions_dir).iterdir()):
+        if s.is_file() and s.name.endswith((".jsonl", ".json")):
+            sessions[str(s.resolve())] = s
+
+    removed = [p for p in manifest["files"] if p not in sessions]
+    for p in removed:
+        del manifest["files"][p]
+
+    # Only new or modified files are resolved: by name prefix, else sniffed
+    changed = []
+    for key, path in sessions.items():
+        st = path.stat()
+        known = manifest["files"].get(key)
+        if known and known["mtime_ns"] == st.st_mtime_ns and known["size"] == st.st_size:
+            continue
+        agent, confidence, detected = resolve_agent(path)
+        if agent is None:
+            if manifest["files"].pop(key, None):
+                removed.append(key)
+            if args.verbose:
+                print(f"  [SKIP] {path.name}: unknown format")
+            continue
+        if detected and args.verbose:
+            print(f"  [DETECT] {path.name}: {agent} (confidence {confidence:.2f})")
+        changed.append((key, path, agent, st))
+
+    if not changed:
+        stale = _compact(index_dir, manifest, args.max_segments)
+        _save_manifest(index_dir, manifest)
+        _delete_segments(index_dir, stale)
+        print(f"Index up to date: {len(manifest['files'])} files ({len(removed)} removed)")
+        return
+
+    seg_no = manifest["next_segment"]
+    files, docs, postings = [], [], {}
+    start = time.perf_counter()
+    for key, path, agent, st in changed:
+        try:
+            session_id = _index_file(path, agent, len(files), docs, postings)
+        except Exception as e:
+            print(f"  [ERROR] {path.name}: {e}", file=sys.stderr)
+            continue
+        files.append([key, session_id])
+        manifest["files"][key] = {
+            "agent": agent,
+            "session_id": session_id,
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "segment": seg_no,
+        }
+        if args.verbose:
+            print(f"  [INDEX] {path.name} ({session_id})")
+
+    _write_segment(index_dir, seg_no, files, docs, postings)
+    manifest["segments"].append(seg_no)
+    manifest["next_segment"] = seg_no + 1
+    elapsed = time.perf_counter() - start
+    print(
+        f"Indexed {len(files)} files, {len(docs)} documents, {len(postings)} terms "
+        f"into {_segment_name(seg_no)} in {elapsed:.2f}s ({len(removed)} removed)"
+    )
+
+    stale = _compact(index_dir, manifest, args.max_segments)
+    _save_manifest(index_dir, manifest)
+    _delete_segments(index_dir, stale)
+
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+
+def _parse_query(text):
+    """Split a query into clauses: each clause is a token list (phrase if >1)."""
+    clauses = []
+    for phrase, word in _QUERY_RE.findall(text):
+        tokens = _tokenize(phrase if phrase else word)
+        if tokens:
+            clauses.append(tokens)
+    return clauses
+
+
+def _match_clause(tokens, terms, post_file):
+    """Return {doc: [start positions]} for a term or phrase within one segment."""
+    lists = []
+    for token in tokens:
+        info = _lookup(terms, token)
+        if info is None:
+            return {}
+        lists.append((info[2], token, info))
+    # Decode rarest term first so intersection stays small
+    decoded = {}
+    for _, token, (offset, length, _) in sorted(lists):
+        if token in decoded:
+            continue
+        post_file.seek(offset)
+        decoded[token] = _decode_postings(post_file.read(length))
+
+    candidates = set(decoded[tokens[0]])
+    for token in tokens[1:]:
+        candidates &= decoded[token].keys()
+
+    result = {}
+    for doc in candidates:
+        starts = decoded[tokens[0]][doc]
+        for k, token in enumerate(tokens[1:], start=1):
+            following = set(decoded[token][doc])
+            starts = [p for p in starts if p + k in following]
+            if not starts:
+                break
+        if starts:
+            result[doc] = starts
+    return result
+
+
+def search(index_dir, query):
+    """Run a query against the index. Returns a list of hit dicts."""
+    index_dir = Path(index_dir)
+    manifest = _load_manifest(index_dir)
+    clauses = _parse_query(query)
+    if not clauses:
+        return []
+
+    hits = []
+    for seg_no in manifest["segments"]:
+        name = _segment_name(seg_no)
+        # Only files whose current owning segment is this one are live
+        files, live = _live_files(index_dir, manifest, seg_no)
+        if not live:
+            continue
+        with (
+            _Table(index_dir / f"{name}.terms", _TERMS_MAGIC) as terms,
+            _Table(index_dir / f"{name}.docs", _DOCS_MAGIC) as docs,
+            open(index_dir / f"{name}.post", "rb") as post_file,
+        ):
+            matched = None
+            for tokens in clauses:
+                found = _match_clause(tokens, terms, post_file)
+                matched = set(found) if matched is None else matched & found.keys()
+                if not matched:
+                    break
+            for doc in sorted(matched or ()):
+                file_idx, ref = _read_doc_row(docs.row(doc))
+                if file_idx not in live:
+                    continue
+                key, session_id = files[file_idx]
+                hits.append({"session-id": session_id, "entry": ref, "file": key})
+    return hits
+
+
+def cmd_query(args):
+    """Print hits for a term/phrase query."""
+    query = " ".join(args.terms)
+    start = time.perf_counter()
+    hits = search(args.index, query)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for hit in hits[: args.limit] if args.limit else hits:
+        if args.json:
+            print(json.dumps(hit))
+        else:
+            print(f"{hit['session-id']}  {hit['entry']}  ({Path(hit['file']).name})")
+    print(f"{len(hits)} hits in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    bd = sub.add_parser("build", help="Build or incrementally update the index")
+    bd.add_argument("--index", required=True, help="Index directory")
+    bd.add_argument(
+        "--sessions-dir",
+        type=Path,
+        default=DEFAULT_SESSIONS,
+        help=f"Directory containing session files (default: {DEFAULT_SESSIONS.relative_to(REPO_ROOT)})",
+    )
+    bd.add_argument("--rebuild", action="store_true", help="Discard existing segments and re-index everything")
+    bd.add_argument(
+        "--max-segments",
+        type=int,
+        default=DEFAULT_MAX_SEGMENTS,
+        help=f"Merge all segments once a build leaves more (default: {DEFAULT_MAX_SEGMENTS})",
+    )
+    bd.add_argument("--verbose", action="store_true", help="Print each indexed file")
+
+    qr = sub.add_parser("query", help="Search the index (terms are ANDed, quote phrases)")
+    qr.add_argument("--index", required=True, help="Index directory")
+    qr.add_argument("--limit", type=int, default=20, help="Max hits to print (default: 20, 0 = all)")
+    qr.add_argument("--json", action="store_true", help="Print hits as JSON lines")
+    qr.add_argument("terms", nargs="+", help="Query terms; quote for phrase match")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if not Path(args.sessions_dir).exists():
+            print(f"Sessions dir not found: {args.sessions_dir}", file=sys.stderr)
+            sys.exit(1)
+        cmd_build(args)
+    elif args.command == "query":
+        if not (Path(args.index) / "manifest.json").exists():
+            print(f"No index at {args.index} (run build first)", file=sys.stderr)
+            sys.exit(1)
+        cmd_query(args)
+
+
+if __name__ == "__main__":
+    main()
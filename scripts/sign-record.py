@@ -20,12 +20,33 @@ Usage:
     --record /tmp/vac-produced/claude-opus-4-6.spec.json \\
     --out /tmp/vac-produced/claude-opus-4-6.sig.cbor
 
+  # Large records: tree-mode content hash over all cores (recorded in
+  # content-hash-alg; verify picks the algorithm from the signature)
+  python3 scripts/sign-record.py sign --hash-alg sha-256-tree \\
+    --key /tmp/vac-keys/signing-key.pem \\
+    --record /tmp/vac-produced/claude-opus-4-6.spec.json \\
+    --out /tmp/vac-produced/claude-opus-4-6.sig.cbor
+
   # Verify a signature
   python3 scripts/sign-record.py verify \\
     --key /tmp/vac-keys/signing-key.pub.pem \\
     --sig /tmp/vac-produced/claude-opus-4-6.sig.cbor \\
     --record /tmp/vac-produced/claude-opus-4-6.spec.json
 
+  # Repeated audits: remember successful verifications (see vac.audit); an
+  # unchanged pair verified within --cache-ttl seconds is a stat check
+  python3 scripts/sign-record.py verify --cache ~/.cache/vac/verify.sqlite \\
+    --key /tmp/vac-keys/signing-key.pub.pem \\
+    --sig /tmp/vac-produced/claude-opus-4-6.sig.cbor \\
+    --record /tmp/vac-produced/claude-opus-4-6.spec.json
+
+  # Revoke a key: its cached results are dropped and later verifications fail
+  python3 scripts/sign-record.py revoke --cache ~/.cache/vac/verify.sqlite \\
+    --key /tmp/vac-keys/signing-key.pub.pem --reason "key compromise"
+
+  # Any subcommand accepts --profile [PATH] for per-stage wall/CPU time and
+  # memory peak (JSON lines to PATH or stderr, summary table on stdout)
+
 Requires: pycose, cbor2 (see requirements.txt)
 """
 
@@ -36,76 +57,23 @@ import json
 import sys
 from pathlib import Path
 
-import cbor2
-from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
-from cryptography.hazmat.primitives import serialization
-from pycose.algorithms import EdDSA
-from pycose.headers import Algorithm, ContentType
-from pycose.keys import OKPKey
-from pycose.messages import Sign1Message
-
-TRACE_METADATA_LABEL = 100  # Private-use label per CDDL Section 9
-CWT_CLAIMS_LABEL = 15  # COSE label for CWT_Claims in protected header
-CWT_ISS_LABEL = 1  # CWT issuer claim
-CWT_SUB_LABEL = 2  # CWT subject claim
-
-
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
-
-
-def _canonical_json(obj):
-    """Serialize to canonical JSON: compact, sorted keys, UTF-8."""
-    return json.dumps(obj, separators=(",", ":"), sort_keys=True, ensure_ascii=False).encode("utf-8")
-
-
-def _sha256_hex(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
-
-
-def _extract_cwt_claims(record, issuer_override=None, subject_override=None):
-    """Build CWT_Claims map for the protected header.
-
-    Defaults: iss = model-provider (e.g. "anthropic"), sub = session-id.
-    """
-    session = record.get("session", {})
-    agent_meta = session.get("agent-meta", {})
-
-    iss = issuer_override or agent_meta.get("model-provider", "unknown")
-    sub = subject_override or session.get("session-id", record.get("id", "unknown"))
-
-    return {CWT_ISS_LABEL: iss, CWT_SUB_LABEL: sub}
-
-
-def _extract_trace_metadata(record, json_bytes):
-    """Build trace-metadata map from a verifiable-agent-record JSON object."""
-    session = record.get("session", {})
-    agent_meta = session.get("agent-meta", {})
-
-    meta = {
-        "session-id": session.get("session-id", record.get("id", "unknown")),
-        "agent-vendor": agent_meta.get("model-provider", "unknown"),
-        "trace-format": "ietf-vac-v3.0",
-        "content-hash": _sha256_hex(json_bytes),
-        "content-hash-alg": "sha-256",
-    }
-
-    ts_start = session.get("session-start")
-    if ts_start is not None:
-        meta["timestamp-start"] = ts_start
-    else:
-        # Fallback to signing time — trace-metadata requires a valid abstract-timestamp
-        # (RFC 3339 or epoch number), and some agents (e.g. Cursor) lack timestamps entirely.
-        now_utc = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-        meta["timestamp-start"] = record.get("created", now_utc)
-
-    ts_end = session.get("session-end")
-    if ts_end is not None:
-        meta["timestamp-end"] = ts_end
-
-    return meta
-
+from vac import (
+    CONTENT_HASH_ALGS,
+    CWT_CLAIMS_LABEL,
+    CWT_ISS_LABEL,
+    CWT_SUB_LABEL,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_CONTENT_HASH_ALG,
+    TRACE_METADATA_LABEL,
+    VerifyCache,
+    canonical_json,
+    generate_keypair,
+    key_fingerprint,
+    sign_payload,
+    verify_payload,
+)
+from vac import profiling as vac_profile
+from vac.profiling import stage
 
 # ---------------------------------------------------------------------------
 # Subcommands
@@ -117,22 +85,14 @@ def cmd_keygen(args):
     out_dir = Path(args.out)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    private_key = Ed25519PrivateKey.generate()
+    with stage("keygen"):
+        priv_pem, pub_pem = generate_keypair()
 
     priv_path = out_dir / "signing-key.pem"
-    priv_pem = private_key.private_bytes(
-        serialization.Encoding.PEM,
-        serialization.PrivateFormat.PKCS8,
-        serialization.NoEncryption(),
-    )
-    priv_path.write_bytes(priv_pem)
+    priv_path.write_text(priv_pem, encoding="utf-8")
 
     pub_path = out_dir / "signing-key.pub.pem"
-    pub_pem = private_key.public_key().public_bytes(
-        serialization.Encoding.PEM,
-        serialization.PublicFormat.SubjectPublicKeyInfo,
-    )
-    pub_path.write_bytes(pub_pem)
+    pub_path.write_text(pub_pem, encoding="utf-8")
 
     print(f"Private key: {priv_path}")
     print(f"Public key:  {pub_path}")
@@ -143,106 +103,125 @@ def cmd_sign(args):
     """Sign a JSON record with COSE_Sign1 (detached payload)."""
     # Read and canonicalize the record
     record_path = Path(args.record)
-    record = json.loads(record_path.read_text(encoding="utf-8"))
-    json_bytes = _canonical_json(record)
-
-    # Build trace-metadata for unprotected header
-    trace_meta = _extract_trace_metadata(record, json_bytes)
-
-    # Load signing key
+    with stage("read", record_path.name):
+        text = record_path.read_text(encoding="utf-8")
+    with stage("json.loads", record_path.name):
+        record = json.loads(text)
+    with stage("canonicalize", record_path.name):
+        json_bytes = canonical_json(record)
+
+    # Sign; CWT_Claims go in the protected header (SCITT-required),
+    # trace-metadata in the unprotected header
     key_pem = Path(args.key).read_text(encoding="utf-8")
-    cose_key = OKPKey.from_pem_private_key(key_pem)
-
-    # Build CWT_Claims for protected header (SCITT-required)
-    cwt_claims = _extract_cwt_claims(record, args.issuer, args.subject)
-
-    # Build COSE_Sign1 message
-    msg = Sign1Message(
-        phdr={Algorithm: EdDSA, ContentType: "application/json", CWT_CLAIMS_LABEL: cwt_claims},
-        uhdr={TRACE_METADATA_LABEL: trace_meta},
-        payload=json_bytes,
-    )
-    msg.key = cose_key
-
-    # Encode (computes signature over the actual payload)
-    encoded = msg.encode()
-
-    # Manually replace payload with null for detached mode
-    # pycose doesn't properly null out the payload in CBOR output
-    raw = cbor2.loads(encoded)
-    detached_cose = cbor2.CBORTag(18, [raw.value[0], raw.value[1], None, raw.value[3]])
-    detached_bytes = cbor2.dumps(detached_cose)
+    with stage("sign", record_path.name):
+        detached_bytes, trace_meta = sign_payload(
+            record, json_bytes, key_pem, args.issuer, args.subject, hash_alg=args.hash_alg
+        )
 
     # Write output
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_bytes(detached_bytes)
+    with stage("write", record_path.name):
+        out_path.write_bytes(detached_bytes)
 
     print(f"Signature:    {out_path}")
-    print(f"Payload hash: {trace_meta['content-hash']}")
+    print(f"Payload hash: {trace_meta['content-hash']} ({trace_meta['content-hash-alg']})")
     print(f"Session ID:   {trace_meta['session-id']}")
     print(f"Agent vendor: {trace_meta['agent-vendor']}")
     print(f"Payload size: {len(json_bytes)} bytes (detached)")
 
 
+def _print_verified(details, cached_at=None):
+    if cached_at is None:
+        print("PASS: Signature verified")
+    else:
+        when = datetime.datetime.fromtimestamp(cached_at, datetime.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+        print(f"PASS: Signature verified (cached, verified {when})")
+    expected_hash = details["content-hash"]
+    alg = details.get("content-hash-alg", DEFAULT_CONTENT_HASH_ALG)
+    print(f"  CWT Issuer:   {details['issuer']}")
+    print(f"  CWT Subject:  {details['subject']}")
+    print(f"  Session ID:   {details['session-id']}")
+    print(f"  Agent vendor: {details['agent-vendor']}")
+    print(f"  Trace format: {details['trace-format']}")
+    print(f"  Timestamp:    {details['timestamp-start']}")
+    print(f"  Content hash: {expected_hash or 'not present'} {f'({alg}, verified)' if expected_hash else ''}")
+
+
 def cmd_verify(args):
     """Verify a COSE_Sign1 signature against a JSON record."""
     # Read the signature file
     sig_path = Path(args.sig)
     sig_bytes = sig_path.read_bytes()
-
-    # Read and canonicalize the record (detached payload)
+    key_pem = Path(args.key).read_text(encoding="utf-8")
     record_path = Path(args.record)
-    record = json.loads(record_path.read_text(encoding="utf-8"))
-    json_bytes = _canonical_json(record)
 
-    # Load public key
-    key_pem = Path(args.key).read_text(encoding="utf-8")
-    cose_key = OKPKey.from_pem_public_key(key_pem)
-
-    # Decode COSE_Sign1 and attach the detached payload
-    decoded = Sign1Message.decode(sig_bytes)
-    decoded.key = cose_key
-    decoded.payload = json_bytes
-
-    # Verify signature
-    try:
-        valid = decoded.verify_signature()
-    except Exception as e:
-        print(f"FAIL: Signature verification error: {e}")
-        sys.exit(1)
+    # With --cache: a live result for (signature, record file, key) skips
+    # parsing, canonicalization and the signature check
+    cache = None
+    data = None
+    if args.cache:
+        cache = VerifyCache(args.cache, ttl=args.cache_ttl)
+        key_fp = key_fingerprint(key_pem)
+        revoked = cache.revoked(key_fp)
+        if revoked:
+            when = datetime.datetime.fromtimestamp(revoked[0], datetime.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+            print(f"FAIL: Key {key_fp[:16]} revoked {when}{': ' + revoked[1] if revoked[1] else ''}")
+            sys.exit(1)
+        sig_digest = hashlib.sha256(sig_bytes).hexdigest()
+        with stage("cache", record_path.name):
+            record_digest, data = cache.record_digest(record_path)
+            hit = cache.lookup(sig_digest, record_digest, key_fp)
+            if not hit and data is None:
+                # The digest came from the stat cache; the result is stored
+                # under it, so it must be the digest of the bytes verified
+                record_digest, data = cache.record_digest(record_path, read=True)
+        if hit:
+            cache.close()
+            _print_verified(hit, hit.pop("verified-at"))
+            return
 
-    if not valid:
-        print("FAIL: Signature is invalid")
+    # Read and canonicalize the record (detached payload)
+    with stage("read", record_path.name):
+        text = record_path.read_text(encoding="utf-8") if data is None else data.decode("utf-8")
+    with stage("json.loads", record_path.name):
+        record = json.loads(text)
+    with stage("canonicalize", record_path.name):
+        json_bytes = canonical_json(record)
+
+    # Verify signature and content hash
+    with stage("verify", record_path.name):
+        ok, err, decoded = verify_payload(sig_bytes, json_bytes, key_pem)
+    if not ok:
+        print(f"FAIL: {err}")
         sys.exit(1)
 
-    # Extract and display trace-metadata
+    # Extract trace-metadata and CWT_Claims for display
     trace_meta = decoded.uhdr.get(TRACE_METADATA_LABEL, {})
+    cwt_claims = decoded.phdr.get(CWT_CLAIMS_LABEL, {})
+    details = {
+        "issuer": cwt_claims.get(CWT_ISS_LABEL, "N/A"),
+        "subject": cwt_claims.get(CWT_SUB_LABEL, "N/A"),
+        "session-id": trace_meta.get("session-id", "N/A"),
+        "agent-vendor": trace_meta.get("agent-vendor", "N/A"),
+        "trace-format": trace_meta.get("trace-format", "N/A"),
+        "timestamp-start": trace_meta.get("timestamp-start", "N/A"),
+        "content-hash": trace_meta.get("content-hash"),
+        "content-hash-alg": trace_meta.get("content-hash-alg", DEFAULT_CONTENT_HASH_ALG),
+    }
+    if cache:
+        cache.store(sig_digest, record_digest, key_fp, details)
+        cache.close()
+    _print_verified(details)
 
-    # Verify content hash if present
-    hash_ok = True
-    expected_hash = trace_meta.get("content-hash")
-    if expected_hash:
-        actual_hash = _sha256_hex(json_bytes)
-        hash_ok = actual_hash == expected_hash
-        if not hash_ok:
-            print("FAIL: Content hash mismatch")
-            print(f"  Expected: {expected_hash}")
-            print(f"  Actual:   {actual_hash}")
-            sys.exit(1)
-
-    # Extract CWT_Claims from protected header
-    phdr = decoded.phdr
-    cwt_claims = phdr.get(CWT_CLAIMS_LABEL, {})
 
-    print("PASS: Signature verified")
-    print(f"  CWT Issuer:   {cwt_claims.get(CWT_ISS_LABEL, 'N/A')}")
-    print(f"  CWT Subject:  {cwt_claims.get(CWT_SUB_LABEL, 'N/A')}")
-    print(f"  Session ID:   {trace_meta.get('session-id', 'N/A')}")
-    print(f"  Agent vendor: {trace_meta.get('agent-vendor', 'N/A')}")
-    print(f"  Trace format: {trace_meta.get('trace-format', 'N/A')}")
-    print(f"  Timestamp:    {trace_meta.get('timestamp-start', 'N/A')}")
-    print(f"  Content hash: {expected_hash or 'not present'} {'(verified)' if expected_hash and hash_ok else ''}")
+def cmd_revoke(args):
+    """Revoke a public key in a verification cache."""
+    key_fp = key_fingerprint(Path(args.key).read_text(encoding="utf-8"))
+    with VerifyCache(args.cache) as cache:
+        dropped = cache.revoke(key_fp, args.reason)
+    print(f"Revoked key:  {key_fp}")
+    print(f"Dropped:      {dropped} cached verification(s)")
 
 
 # ---------------------------------------------------------------------------
@@ -257,25 +236,49 @@ def main():
     )
     sub = parser.add_subparsers(dest="command", required=True)
 
+    # Options shared by all subcommands
+    common = argparse.ArgumentParser(add_help=False)
+    vac_profile.add_argument(common)
+
     # keygen
-    kg = sub.add_parser("keygen", help="Generate Ed25519 keypair")
+    kg = sub.add_parser("keygen", parents=[common], help="Generate Ed25519 keypair")
     kg.add_argument("--out", required=True, help="Output directory for PEM files")
 
     # sign
-    sg = sub.add_parser("sign", help="Sign a record with COSE_Sign1 (detached payload)")
+    sg = sub.add_parser("sign", parents=[common], help="Sign a record with COSE_Sign1 (detached payload)")
     sg.add_argument("--key", required=True, help="Path to private key PEM")
     sg.add_argument("--record", required=True, help="Path to JSON record file")
     sg.add_argument("--out", required=True, help="Output path for .sig.cbor file")
     sg.add_argument("--issuer", help="CWT issuer (defaults to model-provider)")
     sg.add_argument("--subject", help="CWT subject (defaults to session-id)")
+    sg.add_argument(
+        "--hash-alg",
+        choices=list(CONTENT_HASH_ALGS),
+        default=DEFAULT_CONTENT_HASH_ALG,
+        help=f"content-hash-alg (default: {DEFAULT_CONTENT_HASH_ALG}; sha-256-tree hashes 1 MiB leaves on all cores)",
+    )
 
     # verify
-    vf = sub.add_parser("verify", help="Verify a COSE_Sign1 signature")
+    vf = sub.add_parser("verify", parents=[common], help="Verify a COSE_Sign1 signature")
     vf.add_argument("--key", required=True, help="Path to public key PEM")
     vf.add_argument("--sig", required=True, help="Path to .sig.cbor signature file")
     vf.add_argument("--record", required=True, help="Path to JSON record file")
+    vf.add_argument("--cache", help="Verification cache (sqlite3) to consult and update")
+    vf.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL,
+        help=f"Re-verify cached results older than this many seconds (default: {DEFAULT_CACHE_TTL})",
+    )
+
+    # revoke
+    rv = sub.add_parser("revoke", parents=[common], help="Revoke a public key in a verification cache")
+    rv.add_argument("--cache", required=True, help="Verification cache (sqlite3)")
+    rv.add_argument("--key", required=True, help="Path to public key PEM")
+    rv.add_argument("--reason", help="Revocation reason, shown when verification fails")
 
     args = parser.parse_args()
+    profiler = vac_profile.enable(args.profile) if args.profile else None
 
     if args.command == "keygen":
         cmd_keygen(args)
@@ -283,6 +286,11 @@ def main():
         cmd_sign(args)
     elif args.command == "verify":
         cmd_verify(args)
+    elif args.command == "revoke":
+        cmd_revoke(args)
+
+    if profiler:
+        profiler.summary()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Extract an entry range or a time window of a session as a sub-record.
+
+Uses the session's `.idx` sidecar (see vac.offsets) to seek straight to the
+source objects that hold the requested entries, decodes only those, and
+writes a verifiable-agent-record of the same session containing just them.
+The sidecar is built (one full parse) when it is missing or stale and
+written next to the session, or into --index-dir; when that is not
+writable (a read-only archive) the slice is cut from the in-memory index
+and the next run parses again. It can also be written while validating
+with `validate-sessions.py --index`.
+
+Entry numbers are those of a full parse without --dedup, starting at 0.
+Time bounds are inclusive and apply to each source object's first entry
+timestamp. JSONL sessions (Claude, Codex, Cursor) and OpenCode are
+supported; Gemini sessions are not indexed.
+
+Usage:
+  # Entries 40000..40099
+  python3 scripts/slice-session.py --session /archive/codex-run.jsonl --entries 40000:40100
+
+  # The hour before an incident, into a file
+  python3 scripts/slice-session.py --session examples/sessions/claude-opus-4-6.jsonl \\
+    --since 2026-02-10T17:00:00Z --until 2026-02-10T18:00:00Z --out /tmp/window.json
+
+Options:
+  --session PATH     Session file
+  --agent NAME       Session format (default: `<agent>-` name prefix, else sniffed)
+  --entries A:B      Entry range, half-open; either side may be omitted
+  --since TS         Window start: RFC 3339 or epoch milliseconds
+  --until TS         Window end: RFC 3339 or epoch milliseconds
+  --out PATH         Output JSON record (default: stdout)
+  --index-dir DIR    Keep sidecars in DIR as `<name>.idx` instead of next to sessions
+  --rebuild-index    Rebuild the sidecar even if it is current
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from vac import (
+    INDEXED_AGENTS,
+    build_index,
+    extract_entries,
+    extract_window,
+    index_path,
+    load_index,
+    resolve_agent,
+    wrap_record,
+    write_index,
+    write_record_json,
+)
+from vac.parsers import _ts_seconds
+
+
+def _parse_range(text):
+    start, sep, stop = text.partition(":")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected A:B, got {text!r}")
+    try:
+        return (int(start) if start else None, int(stop) if stop else None)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected integers in A:B, got {text!r}") from None
+
+
+def _parse_time(text):
+    seconds = _ts_seconds(int(text) if text.isdigit() else text)
+    if seconds is None:
+        raise argparse.ArgumentTypeError(f"expected RFC 3339 or epoch milliseconds, got {text!r}")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--session", type=Path, required=True, help="Session file")
+    parser.add_argument("--agent", choices=INDEXED_AGENTS, default=None, help="Session format (default: detected)")
+    parser.add_argument("--entries", type=_parse_range, default=None, help="Entry range A:B (half-open)")
+    parser.add_argument("--since", type=_parse_time, default=None, help="Window start (RFC 3339 or epoch ms)")
+    parser.add_argument("--until", type=_parse_time, default=None, help="Window end (RFC 3339 or epoch ms)")
+    parser.add_argument("--out", type=Path, default=None, help="Output JSON record (default: stdout)")
+    parser.add_argument(
+        "--index-dir", type=Path, default=None, help="Directory for sidecars (default: next to sessions)"
+    )
+    parser.add_argument("--rebuild-index", action="store_true", help="Rebuild the sidecar even if it is current")
+    args = parser.parse_args()
+
+    windowed = args.since is not None or args.until is not None
+    if (args.entries is None) == (not windowed):
+        parser.error("give either --entries or --since/--until")
+    if not args.session.is_file():
+        print(f"Session not found: {args.session}", file=sys.stderr)
+        sys.exit(1)
+    agent = args.agent or resolve_agent(args.session)[0]
+    if agent not in INDEXED_AGENTS:
+        print(f"{args.session.name}: {agent or 'unrecognized'} sessions cannot be indexed", file=sys.stderr)
+        sys.exit(1)
+
+    index = None
+    if not args.rebuild_index:
+        try:
+            index = load_index(args.session, args.index_dir)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            print(f"[INDEX] {e}; rebuilding", file=sys.stderr)
+    if index is None or index["agent"] != agent:
+        t0 = time.perf_counter()
+        index = build_index(agent, args.session)
+        try:
+            if args.index_dir:
+                args.index_dir.mkdir(parents=True, exist_ok=True)
+            sidecar = write_index(index, args.session, args.index_dir)
+        except OSError as e:
+            sidecar = f"{index_path(args.session, args.index_dir)} not written ({e.strerror}), in memory"
+        print(
+            f"[INDEX] {sidecar}: {len(index['objects'])} objects, "
+            f"{index['entries']} entries in {time.perf_counter() - t0:.2f} s",
+            file=sys.stderr,
+        )
+
+    t0 = time.perf_counter()
+    if windowed:
+        entries, meta = extract_window(args.session, index, args.since, args.until)
+    else:
+        entries, meta = extract_entries(args.session, index, *args.entries)
+    if not entries:
+        print(f"{args.session.name}: no entries in range ({index['entries']} in session)", file=sys.stderr)
+        sys.exit(1)
+
+    record = wrap_record(entries, meta)
+    if args.out:
+        with open(args.out, "wb") as f:
+            size = write_record_json(record, f)
+    else:
+        size = write_record_json(record, sys.stdout.buffer)
+    print(
+        f"[SLICE] {len(entries)} of {index['entries']} entries, {size / 1024:.1f} KB "
+        f"in {(time.perf_counter() - t0) * 1000:.1f} ms",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
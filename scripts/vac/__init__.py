@@ -0,0 +1,269 @@
+"""
+Verifiable agent conversation tooling: parsers, record wrapper, blob store
+and COSE_Sign1 signing, importable from the scripts in this directory:
+
+  from vac import PARSERS, wrap_record, sign_record
+
+Names are resolved lazily (PEP 562): `import vac` loads nothing, and each
+name imports only its own submodule on first access. pycose, cbor2 and
+cryptography are imported inside the vac.signing functions that need them,
+so parse-only callers, `--help` and worker start-up never pay for them.
+
+Submodules:
+  entries    Entry model (slotted, dict-compatible) and serialization hooks
+  parsers    Native session-format parsers and PARSERS
+  specs      Declarative per-agent mapping specs (SPECS)
+  mapping    Compiles a mapping spec into a per-object extractor
+  detect     Content-sniffing format detection for unprefixed files
+  scan       Metadata-only scans (meta + entry-type counts) for catalogs
+  offsets    Sidecar offset index (.idx) and entry-range / time-window extraction
+  attribution  File attribution (line ranges, hashes) from tool calls; verification
+  record     wrap_record, serialization and CDDL validation
+  blobs      Content-addressed blob store
+  archive    Indexed multi-record archive (segments, mmap random access)
+  signing    COSE_Sign1 sign/verify helpers
+  audit      Persistent verification cache (TTL, key revocation)
+  pipeline   parse -> wrap_record -> validate -> sign with warm state
+  shard      Deterministic --shard i/N file assignment and shard result merging
+  profiling  Per-stage profiling (--profile)
+  metrics    Run metrics export (--metrics, --progress)
+  synth      Synthetic session generator learned from the samples
+"""
+
+import importlib
+
+_EXPORTS = {
+    # entries
+    "Entry": "entries",
+    "ENTRY_CLASSES": "entries",
+    "json_default": "entries",
+    "cbor_default": "entries",
+    # parsers
+    "PARSERS": "parsers",
+    "DEDUP_WINDOW_SECONDS": "parsers",
+    "PARSE_CHUNK_BYTES": "parsers",
+    "parse_claude": "parsers",
+    "parse_gemini": "parsers",
+    "iter_gemini": "parsers",
+    "parse_codex": "parsers",
+    "parse_opencode": "parsers",
+    "parse_cursor": "parsers",
+    # specs / mapping
+    "SPECS": "specs",
+    "compile_spec": "mapping",
+    # detect
+    "DETECT_HEAD_BYTES": "detect",
+    "DETECT_MIN_CONFIDENCE": "detect",
+    "detect_format": "detect",
+    "detect_text": "detect",
+    "resolve_agent": "detect",
+    # scan
+    "SCANNERS": "scan",
+    "scan_claude": "scan",
+    "scan_gemini": "scan",
+    "scan_codex": "scan",
+    "scan_opencode": "scan",
+    "scan_cursor": "scan",
+    # offsets
+    "INDEX_SUFFIX": "offsets",
+    "INDEXED_AGENTS": "offsets",
+    "index_path": "offsets",
+    "parse_indexed": "offsets",
+    "write_index": "offsets",
+    "build_index": "offsets",
+    "load_index": "offsets",
+    "extract_entries": "offsets",
+    "extract_window": "offsets",
+    # attribution
+    "build_attribution": "attribution",
+    "verify_attribution": "attribution",
+    "LineIndexCache": "attribution",
+    # record
+    "wrap_record": "record",
+    "encode_record_json": "record",
+    "write_record_json": "record",
+    "write_record_cbor": "record",
+    "validate": "record",
+    # blobs
+    "BLOB_FIELDS": "blobs",
+    "BLOB_REF_KEY": "blobs",
+    "DEFAULT_BLOB_THRESHOLD": "blobs",
+    "put_blob": "blobs",
+    "get_blob": "blobs",
+    "externalize_blobs": "blobs",
+    "resolve_blob_ref": "blobs",
+    "is_blob_ref": "blobs",
+    "inline_blobs": "blobs",
+    # archive
+    "ARCHIVE_CODECS": "archive",
+    "DEFAULT_ARCHIVE_CODEC": "archive",
+    "DEFAULT_SEGMENT_BYTES": "archive",
+    "RecordArchive": "archive",
+    "extract_member": "archive",
+    "verify_member": "archive",
+    # signing
+    "TRACE_METADATA_LABEL": "signing",
+    "CWT_CLAIMS_LABEL": "signing",
+    "CWT_ISS_LABEL": "signing",
+    "CWT_SUB_LABEL": "signing",
+    "canonical_json": "signing",
+    "sha256_hex": "signing",
+    "sha256_tree_hex": "signing",
+    "CONTENT_HASH_ALGS": "signing",
+    "DEFAULT_CONTENT_HASH_ALG": "signing",
+    "content_hash": "signing",
+    "extract_cwt_claims": "signing",
+    "extract_trace_metadata": "signing",
+    "generate_keypair": "signing",
+    "load_signing_key": "signing",
+    "sign_payload": "signing",
+    "sign_record": "signing",
+    "verify_payload": "signing",
+    "verify_signature": "signing",
+    "validate_cbor": "signing",
+    # audit
+    "DEFAULT_CACHE_TTL": "audit",
+    "VerifyCache": "audit",
+    "key_fingerprint": "audit",
+    # pipeline
+    "Pipeline": "pipeline",
+    # shard
+    "RESULTS_VERSION": "shard",
+    "SHARD_KEYS": "shard",
+    "parse_shard": "shard",
+    "shard_of": "shard",
+    "shard_key": "shard",
+    "in_shard": "shard",
+    "write_results": "shard",
+    "load_results": "shard",
+    "merge_results": "shard",
+}
+
+_SUBMODULES = (
+    "entries",
+    "parsers",
+    "specs",
+    "mapping",
+    "detect",
+    "scan",
+    "offsets",
+    "attribution",
+    "record",
+    "blobs",
+    "archive",
+    "signing",
+    "audit",
+    "pipeline",
+    "shard",
+    "profiling",
+    "metrics",
+    "synth",
+)
+
+__all__ = [
+    "ARCHIVE_CODECS",
+    "BLOB_FIELDS",
+    "BLOB_REF_KEY",
+    "CONTENT_HASH_ALGS",
+    "CWT_CLAIMS_LABEL",
+    "CWT_ISS_LABEL",
+    "CWT_SUB_LABEL",
+    "DEDUP_WINDOW_SECONDS",
+    "DEFAULT_ARCHIVE_CODEC",
+    "DEFAULT_BLOB_THRESHOLD",
+    "DEFAULT_CACHE_TTL",
+    "DEFAULT_CONTENT_HASH_ALG",
+    "DEFAULT_SEGMENT_BYTES",
+    "DETECT_HEAD_BYTES",
+    "DETECT_MIN_CONFIDENCE",
+    "ENTRY_CLASSES",
+    "INDEXED_AGENTS",
+    "INDEX_SUFFIX",
+    "PARSERS",
+    "PARSE_CHUNK_BYTES",
+    "RESULTS_VERSION",
+    "SCANNERS",
+    "SHARD_KEYS",
+    "SPECS",
+    "TRACE_METADATA_LABEL",
+    "Entry",
+    "LineIndexCache",
+    "Pipeline",
+    "RecordArchive",
+    "VerifyCache",
+    "build_attribution",
+    "build_index",
+    "canonical_json",
+    "cbor_default",
+    "compile_spec",
+    "content_hash",
+    "detect_format",
+    "detect_text",
+    "encode_record_json",
+    "externalize_blobs",
+    "extract_cwt_claims",
+    "extract_entries",
+    "extract_member",
+    "extract_trace_metadata",
+    "extract_window",
+    "generate_keypair",
+    "get_blob",
+    "in_shard",
+    "index_path",
+    "inline_blobs",
+    "is_blob_ref",
+    "iter_gemini",
+    "json_default",
+    "key_fingerprint",
+    "load_index",
+    "load_results",
+    "load_signing_key",
+    "merge_results",
+    "parse_claude",
+    "parse_codex",
+    "parse_cursor",
+    "parse_gemini",
+    "parse_indexed",
+    "parse_opencode",
+    "parse_shard",
+    "put_blob",
+    "resolve_agent",
+    "resolve_blob_ref",
+    "scan_claude",
+    "scan_codex",
+    "scan_cursor",
+    "scan_gemini",
+    "scan_opencode",
+    "sha256_hex",
+    "sha256_tree_hex",
+    "shard_key",
+    "shard_of",
+    "sign_payload",
+    "sign_record",
+    "validate",
+    "validate_cbor",
+    "verify_attribution",
+    "verify_member",
+    "verify_payload",
+    "verify_signature",
+    "wrap_record",
+    "write_index",
+    "write_record_cbor",
+    "write_record_json",
+    "write_results",
+]
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
@@ -0,0 +1,456 @@
+"""
+Indexed record archive: many records and their signatures in a few files.
+
+Produced records (`<stem>.spec.json`) and detached signatures
+(`<stem>.sig.cbor`) are two small files per session. A RecordArchive packs
+them into append-only segment files in one directory:
+
+  <archive>/segment-00000.vac, segment-00001.vac, ...
+
+  header    b"VACARC1\\n"
+  batch     member bytes: each record compressed on its own, then its
+            signature as is
+            index: zlib-compressed JSON
+              {"vac-archive": 1, "prev": <previous footer offset, 0 for none>, "members": [row, ...]}
+            footer: b"VACIDX1\\n", index offset, index length (u64 LE), SHA-256 of the index
+  batch     ...
+
+  row       [session-id, name, offset, length, size, codec, sha256,
+             sig offset, sig length, sig sha256, meta]
+
+sha256 is the digest of the uncompressed record bytes, i.e. of the
+`.spec.json` file, so vac.audit cache entries are shared between files
+and members. meta holds the model-id, session-start and entry count, so
+listing an archive reads only its indexes.
+
+Readers memory-map each segment and walk the footer chain back from the
+end; members are sliced and decompressed straight from the map. A later
+member with the same session-id shadows an earlier one. Appending (see
+RecordArchive.writer) writes new bytes only, under an exclusive lock. A
+torn tail from an interrupted append is ignored by readers, which use the
+last footer whose index digest checks out, and truncated by the next
+append.
+"""
+
+import fcntl
+import hashlib
+import json
+import lzma
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+
+from .pipeline import atomic_write
+from .profiling import stage
+
+ARCHIVE_VERSION = 1
+SEGMENT_SUFFIX = ".vac"
+DEFAULT_SEGMENT_BYTES = 1 << 30  # a batch that crosses this starts the next segment
+DEFAULT_ARCHIVE_CODEC = "zlib"
+
+# name -> (compress(data, level), decompress(buffer))
+ARCHIVE_CODECS = {
+    "none": (lambda data, level: data, bytes),
+    "zlib": (lambda data, level: zlib.compress(data, 6 if level is None else level), zlib.decompress),
+    "lzma": (lambda data, level: lzma.compress(data, preset=6 if level is None else level), lzma.decompress),
+}
+
+_MAGIC = b"VACARC1\n"
+_FOOTER = struct.Struct("<8sQQ32s")
+_FOOTER_MAGIC = b"VACIDX1\n"
+
+# Row positions
+_SID, _NAME, _OFFSET, _LENGTH, _SIZE, _CODEC, _SHA256, _SIG_OFFSET, _SIG_LENGTH, _SIG_SHA256, _META = range(11)
+
+
+# ---------------------------------------------------------------------------
+# Segments
+# ---------------------------------------------------------------------------
+
+
+def _segment_name(number):
+    return f"segment-{number:05d}{SEGMENT_SUFFIX}"
+
+
+def _footer_index(mm, pos):
+    """The index whose footer starts at pos, or None if that is not a valid footer."""
+    if pos < len(_MAGIC) or pos + _FOOTER.size > len(mm):
+        return None
+    magic, offset, length, digest = _FOOTER.unpack_from(mm, pos)
+    if magic != _FOOTER_MAGIC or offset + length != pos:
+        return None
+    blob = mm[offset:pos]
+    if hashlib.sha256(blob).digest() != digest:
+        return None
+    try:
+        index = json.loads(zlib.decompress(blob))
+    except (zlib.error, ValueError):
+        return None
+    return index if index.get("vac-archive") == ARCHIVE_VERSION else None
+
+
+def _last_footer(mm):
+    """(footer offset, index) of the newest intact batch, (0, None) if there is none.
+
+    The footer normally ends the file; after a torn append the newest
+    valid one is searched backwards.
+    """
+    pos = len(mm) - _FOOTER.size
+    index = _footer_index(mm, pos)
+    while index is None:
+        pos = mm.rfind(_FOOTER_MAGIC, 0, max(pos, 0))
+        if pos < 0:
+            return 0, None
+        index = _footer_index(mm, pos)
+    return pos, index
+
+
+def _open_segment(path):
+    """The segment at path opened for update; the writer keeps it until the segment is sealed."""
+    return open(path, "r+b")
+
+
+def _read_segment(path):
+    """Map a segment read-only. Returns (mmap, rows oldest first, end of the intact data)."""
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mm[: len(_MAGIC)] != _MAGIC:
+        mm.close()
+        raise ValueError(f"{path}: not a record archive segment")
+    pos, index = _last_footer(mm)
+    end = pos + _FOOTER.size if index is not None else len(_MAGIC)
+    batches = []
+    while index is not None:
+        batches.append(index["members"])
+        prev = index["prev"]
+        index = _footer_index(mm, prev) if prev else None
+        if prev and index is None:
+            mm.close()
+            raise ValueError(f"{path}: broken index chain at offset {prev}")
+    rows = [row for batch in reversed(batches) for row in batch]
+    return mm, rows, end
+
+
+def _record_meta(record):
+    session = record.get("session", {})
+    return {
+        "model-id": session.get("agent-meta", {}).get("model-id"),
+        "session-start": session.get("session-start"),
+        "entries": len(session.get("entries", ())),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Archive
+# ---------------------------------------------------------------------------
+
+
+class RecordArchive:
+    """A directory of record segments, read through memory maps; see module docstring.
+
+    path           archive directory (created with create=True)
+    segment_bytes  size after which appends start a new segment
+    """
+
+    def __init__(self, path, create=False, segment_bytes=DEFAULT_SEGMENT_BYTES):
+        self.path = Path(path)
+        if create:
+            self.path.mkdir(parents=True, exist_ok=True)
+        elif not self.path.is_dir():
+            raise FileNotFoundError(f"Archive not found: {self.path}")
+        self.segment_bytes = segment_bytes
+        self._maps = {}  # segment number -> mmap
+        self._members = {}  # session-id -> (segment number, row)
+        self._names = {}  # name -> session-id
+        for seg in sorted(self.path.glob(f"segment-*{SEGMENT_SUFFIX}")):
+            self._load(int(seg.stem.split("-")[1]))
+
+    def _load(self, number, rows=None):
+        """Map a segment and register its members; rows of a batch just written skip the index chain."""
+        path = self.path / _segment_name(number)
+        if rows is None:
+            mm, rows, _ = _read_segment(path)
+        else:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        old = self._maps.pop(number, None)
+        if old is not None:
+            old.close()
+        self._maps[number] = mm
+        for row in rows:
+            self._members[row[_SID]] = (number, row)
+            self._names[row[_NAME]] = row[_SID]
+
+    def close(self):
+        for mm in self._maps.values():
+            mm.close()
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, key):
+        return key in self._members or key in self._names
+
+    def __iter__(self):
+        return iter(self._members)
+
+    @property
+    def segments(self):
+        return len(self._maps)
+
+    def _lookup(self, key):
+        hit = self._members.get(key)
+        if hit is None and key in self._names:
+            hit = self._members[self._names[key]]
+        if hit is None:
+            raise KeyError(key)
+        return hit
+
+    def member(self, key):
+        """Index entry of a member by session-id or name (KeyError if absent)."""
+        number, row = self._lookup(key)
+        return {
+            "session-id": row[_SID],
+            "name": row[_NAME],
+            "segment": number,
+            "offset": row[_OFFSET],
+            "length": row[_LENGTH],
+            "size": row[_SIZE],
+            "codec": row[_CODEC],
+            "sha256": row[_SHA256],
+            "sig-length": row[_SIG_LENGTH],
+            "sig-sha256": row[_SIG_SHA256],
+            "meta": row[_META],
+        }
+
+    def record_bytes(self, key, check=True):
+        """The record's JSON bytes; with check, ValueError unless they match the indexed SHA-256."""
+        number, row = self._lookup(key)
+        mm = self._maps[number]
+        try:
+            data = ARCHIVE_CODECS[row[_CODEC]][1](memoryview(mm)[row[_OFFSET] : row[_OFFSET] + row[_LENGTH]])
+        except (zlib.error, lzma.LZMAError) as e:
+            raise ValueError(f"Member {row[_NAME]} is corrupt ({e})") from None
+        if len(data) != row[_SIZE] or (check and hashlib.sha256(data).hexdigest() != row[_SHA256]):
+            raise ValueError(f"Member {row[_NAME]} is corrupt (record does not match its index digest)")
+        return data
+
+    def sig_bytes(self, key, check=True):
+        """The detached COSE_Sign1 signature bytes, or None if the member has none."""
+        number, row = self._lookup(key)
+        if row[_SIG_LENGTH] is None:
+            return None
+        data = self._maps[number][row[_SIG_OFFSET] : row[_SIG_OFFSET] + row[_SIG_LENGTH]]
+        if check and hashlib.sha256(data).hexdigest() != row[_SIG_SHA256]:
+            raise ValueError(f"Member {row[_NAME]} is corrupt (signature does not match its index digest)")
+        return data
+
+    def writer(self, codec=DEFAULT_ARCHIVE_CODEC, level=None):
+        """Context manager that appends members as one or more batches (see ArchiveWriter)."""
+        if codec not in ARCHIVE_CODECS:
+            raise ValueError(f"Unknown codec {codec!r} (one of: {', '.join(ARCHIVE_CODECS)})")
+        return ArchiveWriter(self, codec, level)
+
+
+class ArchiveWriter:
+    """Appends members to an archive under its lock.
+
+    Member bytes are written as they are added; leaving the context writes
+    the batch index and footer and makes the members visible. On an
+    exception the segment is truncated back to where the batch started.
+    """
+
+    def __init__(self, archive, codec, level):
+        self.archive = archive
+        self.codec = codec
+        self.level = level
+        self.added = 0
+        self._lock = None
+        self._file = None
+
+    def __enter__(self):
+        self._lock = open(self.archive.path / ".lock", "a+b")
+        fcntl.flock(self._lock, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self._file is not None:
+                if exc_type is None:
+                    self._seal()
+                else:
+                    self._file.truncate(self._start)
+                    self._file.close()
+        finally:
+            self._lock.close()  # releases the lock
+
+    def _open(self):
+        """Open the newest segment (or start one) positioned at the end of its intact data."""
+        numbers = sorted(int(p.stem.split("-")[1]) for p in self.archive.path.glob(f"segment-*{SEGMENT_SUFFIX}"))
+        number = numbers[-1] if numbers else 0
+        path = self.archive.path / _segment_name(number)
+        if numbers and path.stat().st_size >= self.archive.segment_bytes:
+            number += 1
+            path = self.archive.path / _segment_name(number)
+        if not path.exists():
+            with open(path, "xb") as f:
+                f.write(_MAGIC)
+        mm, _, end = _read_segment(path)
+        mm.close()
+        self._file = _open_segment(path)
+        self._file.truncate(end)  # drop a torn tail
+        self._file.seek(end)
+        self._number = number
+        self._start = end
+        self._prev = end - _FOOTER.size if end > len(_MAGIC) else 0
+        self._rows = []
+
+    def _seal(self):
+        f = self._file
+        blob = zlib.compress(
+            json.dumps(
+                {"vac-archive": ARCHIVE_VERSION, "prev": self._prev, "members": self._rows},
+                ensure_ascii=False,
+                separators=(",", ":"),
+            ).encode("utf-8")
+        )
+        offset = f.tell()
+        f.write(blob)
+        f.write(_FOOTER.pack(_FOOTER_MAGIC, offset, len(blob), hashlib.sha256(blob).digest()))
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+        self._file = None
+        self.archive._load(self._number, self._rows)
+
+    def add(self, name, record_bytes, sig_bytes=None, record=None):
+        """Append one record (JSON bytes) and its optional signature; returns its session-id.
+
+        record is the parsed record if the caller has it (else it is
+        parsed for the session-id and index meta).
+        """
+        if self._file is None:
+            self._open()
+        elif self._file.tell() >= self.archive.segment_bytes:
+            self._seal()
+            self._open()
+        if record is None:
+            record = json.loads(record_bytes)
+        session_id = record.get("session", {}).get("session-id") or record.get("id") or name
+        with stage("compress", name):
+            packed = ARCHIVE_CODECS[self.codec][0](record_bytes, self.level)
+        f = self._file
+        offset = f.tell()
+        f.write(packed)
+        sig_offset = sig_length = sig_sha256 = None
+        if sig_bytes is not None:
+            sig_offset, sig_length = f.tell(), len(sig_bytes)
+            sig_sha256 = hashlib.sha256(sig_bytes).hexdigest()
+            f.write(sig_bytes)
+        self._rows.append(
+            [
+                session_id,
+                name,
+                offset,
+                len(packed),
+                len(record_bytes),
+                self.codec,
+                hashlib.sha256(record_bytes).hexdigest(),
+                sig_offset,
+                sig_length,
+                sig_sha256,
+                _record_meta(record),
+            ]
+        )
+        self.added += 1
+        return session_id
+
+
+# ---------------------------------------------------------------------------
+# Members: extract and verify
+# ---------------------------------------------------------------------------
+
+
+def extract_member(archive, key, out_dir):
+    """Write a member back out as `<name>.spec.json` (+ `<name>.sig.cbor`). Returns the paths written."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    name = archive.member(key)["name"]
+    paths = [out_dir / f"{name}.spec.json"]
+    atomic_write(paths[0], archive.record_bytes(key))
+    sig = archive.sig_bytes(key)
+    if sig is not None:
+        paths.append(out_dir / f"{name}.sig.cbor")
+        atomic_write(paths[1], sig)
+    return paths
+
+
+def verify_member(archive, key, pub_pem=None, cache=None):
+    """Check a member against its index digests and, with pub_pem, its signature.
+
+    cache is an open vac.audit.VerifyCache: a live result for the member's
+    (signature, record, key) digests skips canonicalization and Ed25519.
+    Returns (ok, error or None, details); details are the signature's
+    claims (see scripts/sign-record.py verify), plus "cached" on a hit.
+    """
+    try:
+        record_bytes = archive.record_bytes(key)
+        sig_bytes = archive.sig_bytes(key)
+    except ValueError as e:
+        return False, str(e), None
+    if pub_pem is None:
+        return True, None, None
+    if sig_bytes is None:
+        return False, "No signature", None
+
+    # Lazy: the integrity check above must not need pycose
+    from .audit import key_fingerprint
+    from .signing import (
+        CWT_CLAIMS_LABEL,
+        CWT_ISS_LABEL,
+        CWT_SUB_LABEL,
+        DEFAULT_CONTENT_HASH_ALG,
+        TRACE_METADATA_LABEL,
+        canonical_json,
+        verify_payload,
+    )
+
+    row = archive.member(key)
+    if cache is not None:
+        key_fp = key_fingerprint(pub_pem)
+        if cache.revoked(key_fp):
+            return False, f"Key {key_fp[:16]} revoked", None
+        hit = cache.lookup(row["sig-sha256"], row["sha256"], key_fp)
+        if hit:
+            return True, None, dict(hit, cached=True)
+
+    with stage("canonicalize", row["name"]):
+        json_bytes = canonical_json(json.loads(record_bytes))
+    with stage("verify", row["name"]):
+        ok, err, decoded = verify_payload(sig_bytes, json_bytes, pub_pem)
+    if not ok:
+        return False, err, None
+    trace_meta = decoded.uhdr.get(TRACE_METADATA_LABEL, {})
+    cwt_claims = decoded.phdr.get(CWT_CLAIMS_LABEL, {})
+    details = {
+        "issuer": cwt_claims.get(CWT_ISS_LABEL, "N/A"),
+        "subject": cwt_claims.get(CWT_SUB_LABEL, "N/A"),
+        "session-id": trace_meta.get("session-id", "N/A"),
+        "agent-vendor": trace_meta.get("agent-vendor", "N/A"),
+        "trace-format": trace_meta.get("trace-format", "N/A"),
+        "timestamp-start": trace_meta.get("timestamp-start", "N/A"),
+        "content-hash": trace_meta.get("content-hash"),
+        "content-hash-alg": trace_meta.get("content-hash-alg", DEFAULT_CONTENT_HASH_ALG),
+    }
+    if cache is not None:
+        cache.store(row["sig-sha256"], row["sha256"], key_fp, details)
+    return True, None, details
@@ -0,0 +1,993 @@
+"""
+File attribution derived from a session's file-writing tool calls.
+
+build_attribution(entries, meta) returns the `file-attribution-record` of
+agent-conversation.cddl: every file the agent changed, with the line
+ranges that hold its lines at the end of the session, a SHA-256 of each
+range and the contributing model. wrap_record attaches it to every record.
+
+The tool calls are replayed in session order, each when its result
+arrives (failed calls are skipped; calls without a result are replayed at
+the end):
+
+  writes    Claude Write, Gemini write_file, OpenCode write, apply_patch
+            "*** Add File" (the whole file becomes known)
+  edits     Claude Edit / MultiEdit, Gemini replace, OpenCode edit: the old
+            string is located in the known text of the file
+  patches   apply_patch (Codex custom tool call, OpenCode): each hunk's
+            context and removed lines are located as a line block, after
+            the previous hunk and its `@@` anchor line
+  diffs     Claude structuredPatch (with originalFile) places an edit
+            exactly; OpenCode result diffs place the edits that could not
+            be located by text (their line text is display-dedented, so
+            those lines carry no content hash)
+  reads     Claude Read, OpenCode read, Gemini read_file and Codex
+            `sed -n 'A,Bp' F`, `nl -ba F | sed -n 'A,Bp'` and `cat F` make
+            the text they show known, so later edits can be located in it
+
+Files are never read from disk. Each file is a list of blocks of lines
+(a placeholder for lines not seen yet) with a parallel list of owners per
+block; edits search the blocks that hold a line of the old string. A
+replaced block is line-diffed against the old one, so context
+lines an edit repeats keep their owner. Edits that cannot be placed are
+counted (see build_attribution's stats) and otherwise ignored; lines
+changed outside tool calls (shell commands) are not tracked, except that
+a later read showing different text takes the line back from the agent.
+
+Paths are made relative to the project root: the session's working
+directory when the edited paths lie under it, else the roots implied by
+OpenCode's relativePath fields and by relative paths (Gemini reads, Codex
+patches) that end absolute ones. Files under no known root are left out
+(and counted as unplaced): a signed record carries only relative paths.
+
+verify_attribution(attribution, root) checks the range hashes of a
+file-attribution-record against a working tree, hashing every range of a
+file from one memory-mapped read.
+"""
+
+import hashlib
+import json
+import os
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from difflib import SequenceMatcher
+from itertools import chain, groupby
+
+from .entries import Entry
+from .scan import _mapped
+
+_UNKNOWN = "\x00"  # placeholder for a line whose text has not been seen
+_BLOCK_LINES = 512  # target lines per block of a file model
+
+# Tool name -> replay kind
+_TOOLS = {
+    "Write": "write",
+    "write_file": "write",
+    "write": "write",
+    "Edit": "edit",
+    "MultiEdit": "edit",
+    "replace": "edit",
+    "edit": "edit",
+    "apply_patch": "patch",
+    "Read": "read",
+    "read_file": "read",
+    "read": "read",
+    "exec_command": "shell",
+    "shell": "shell",
+}
+
+_HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_CLAUDE_READ_RE = re.compile(r"^ *(\d+)→(.*)$")
+_OPENCODE_READ_RE = re.compile(r"^(\d+)\| ?(.*)$")
+_OPENCODE_EOF_RE = re.compile(r"\(End of file - total (\d+) lines\)")
+_GEMINI_WINDOW_RE = re.compile(r"Showing lines (\d+)-(\d+) of (\d+) total lines")
+_GEMINI_CONTENT = "--- FILE CONTENT (truncated) ---\n"
+_CODEX_CD = r"(?:cd\s+(?P<cd>\S+)\s*&&\s*)?"
+_CODEX_SED_RE = re.compile(_CODEX_CD + r"sed -n ['\"]?(?P<a>\d+),(?P<b>\d+)p['\"]?\s+(?P<path>[^\s|;&]+)$")
+_CODEX_NL_RE = re.compile(_CODEX_CD + r"nl -ba\s+(?P<path>[^\s|;&]+)\s*\|\s*sed -n ['\"]?(?P<a>\d+),(?P<b>\d+)p['\"]?$")
+_CODEX_CAT_RE = re.compile(_CODEX_CD + r"cat\s+(?P<path>[^\s|;&<>]+)$")
+_CODEX_NL_LINE_RE = re.compile(r"^ *(\d+)\t(.*)$")
+
+
+def _split_lines(text):
+    """Lines of file text; a final newline does not start another line."""
+    if not text:
+        return []
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
+
+
+# ---------------------------------------------------------------------------
+# Per-file line model
+# ---------------------------------------------------------------------------
+
+
+class _Block:
+    """A run of consecutive lines of a file model. Blocks are never changed
+    in place: an edit replaces the blocks it touches, so the joined text and
+    the line set are each built at most once per block."""
+
+    __slots__ = ("_set", "_text", "lines", "owners")
+
+    def __init__(self, lines, owners):
+        self.lines = lines
+        self.owners = owners
+        self._text = None
+        self._set = None
+
+    def text(self):
+        if self._text is None:
+            self._text = "\n".join(self.lines)
+        return self._text
+
+    def lineset(self):
+        if self._set is None:
+            self._set = set(self.lines)
+        return self._set
+
+
+class _FileLines:
+    """Known text and owner of each line of one file.
+
+    Lines are held in blocks of about _BLOCK_LINES. A line's text is
+    _UNKNOWN until seen; its owner is the model id that wrote it, or None.
+    Lines past the end are unknown too, unless `complete` says the length
+    is known.
+
+    Text searches scan block texts (each match may run into the lines after
+    its block); a search for text spanning three or more lines first picks
+    the blocks whose line set holds one of its whole lines, so edits to a
+    large file touch a few blocks instead of the whole text.
+    """
+
+    __slots__ = ("_starts_cache", "blocks", "complete", "length")
+
+    def __init__(self):
+        self.blocks = []
+        self.length = 0
+        self.complete = False
+        self._starts_cache = None
+
+    def __len__(self):
+        return self.length
+
+    # -- line access -------------------------------------------------------
+
+    def _starts(self):
+        """First line of each block."""
+        if self._starts_cache is None:
+            starts, line = [], 0
+            for block in self.blocks:
+                starts.append(line)
+                line += len(block.lines)
+            self._starts_cache = starts
+        return self._starts_cache
+
+    def _span(self, start, stop):
+        """(i, j, base): blocks[i:j] cover lines [start, stop), at least one
+        block when there are any; base is the first line of blocks[i]."""
+        if not self.blocks:
+            return 0, 0, 0
+        starts = self._starts()
+        i = max(bisect_right(starts, start) - 1, 0)
+        return i, max(bisect_left(starts, stop), i + 1), starts[i]
+
+    def get(self, start, stop):
+        i, j, base = self._span(start, stop)
+        lines = list(chain.from_iterable(block.lines for block in self.blocks[i:j]))
+        return lines[start - base : stop - base]
+
+    def owners(self, start, stop):
+        i, j, base = self._span(start, stop)
+        owners = list(chain.from_iterable(block.owners for block in self.blocks[i:j]))
+        return owners[start - base : stop - base]
+
+    def replace(self, start, stop, new_lines, new_owners):
+        """Set lines [start, stop) (within the model) to new_lines / new_owners."""
+        i, j, base = self._span(start, stop)
+        size = sum(len(block.lines) for block in self.blocks[i:j]) + len(new_lines) - (stop - start)
+        if size < _BLOCK_LINES // 2 and j - i < len(self.blocks):
+            # Take in a neighbour so blocks do not shrink edit by edit
+            if j < len(self.blocks):
+                j += 1
+            else:
+                i -= 1
+                base -= len(self.blocks[i].lines)
+        lines = list(chain.from_iterable(block.lines for block in self.blocks[i:j]))
+        owners = list(chain.from_iterable(block.owners for block in self.blocks[i:j]))
+        lines[start - base : stop - base] = new_lines
+        owners[start - base : stop - base] = new_owners
+        step = -(-len(lines) // max(1, round(len(lines) / _BLOCK_LINES))) if lines else 1
+        self.blocks[i:j] = [_Block(lines[k : k + step], owners[k : k + step]) for k in range(0, len(lines), step)]
+        self.length += len(new_lines) - (stop - start)
+        self._starts_cache = None
+
+    def _pad(self, n):
+        if n > self.length:
+            self.replace(self.length, self.length, [_UNKNOWN] * (n - self.length), [None] * (n - self.length))
+
+    # -- updates -----------------------------------------------------------
+
+    def learn(self, start, lines, total=None):
+        """Record text seen at 0-based line start (a read, a pre-edit
+        snapshot); total is the file's line count when known. A line that
+        differs from the model loses its owner."""
+        stop = start + len(lines)
+        self._pad(stop)
+        known = self.get(start, stop)
+        if known != lines:
+            owners = [
+                owner if line == seen else None for owner, line, seen in zip(self.owners(start, stop), known, lines)
+            ]
+            self.replace(start, stop, lines, owners)
+        if total is not None:
+            self._pad(total)
+            if self.length > total:
+                self.replace(total, self.length, [], [])
+            self.complete = True
+
+    def splice(self, start, stop, new_lines, owner):
+        """Replace lines [start, stop) by new_lines. New lines belong to owner,
+        except those the line diff against the old block finds unchanged."""
+        self._pad(stop)
+        new_owners = [owner] * len(new_lines)
+        old = self.get(start, stop)
+        if new_lines and any(line != _UNKNOWN for line in old):
+            old_owners = self.owners(start, stop)
+            for tag, i1, i2, j1, j2 in SequenceMatcher(None, old, new_lines).get_opcodes():
+                if tag == "equal":
+                    new_owners[j1:j2] = old_owners[i1:i2]
+        self.replace(start, stop, new_lines, new_owners)
+
+    def write(self, lines, owner):
+        """The whole file is now lines (a write or an added file)."""
+        self.splice(0, self.length, lines, owner)
+        self.complete = True
+
+    # -- search ------------------------------------------------------------
+
+    def _holding(self, line, before):
+        """Indices of the blocks a match may start in if it has the whole
+        line `line` at most `before` lines after its start."""
+        starts = self._starts()
+        candidates = set()
+        for k, block in enumerate(self.blocks):
+            if line in block.lineset():
+                candidates.update(range(bisect_right(starts, max(starts[k] - before, 0)) - 1, k + 1))
+        return sorted(candidates)
+
+    def _matches(self, needle, from_line=0, candidates=None):
+        """(line, column) of the occurrences of needle that start at or
+        after from_line, in file order, searching the given block indices
+        (default: all)."""
+        blocks = self.blocks
+        if not needle or not blocks:
+            return
+        extra = needle.count("\n")  # lines a match runs past its first one
+        starts = self._starts()
+        first_piece = needle.split("\n", 1)[0]
+        for k in range(len(blocks)) if candidates is None else candidates:
+            block = blocks[k]
+            if starts[k] + len(block.lines) <= from_line:
+                continue
+            window = block.text()
+            limit = len(window)  # a match must start in this block
+            if first_piece not in window:
+                continue
+            if extra:
+                tail = []
+                for following in blocks[k + 1 :]:
+                    tail.extend(following.lines[: extra - len(tail)])
+                    if len(tail) >= extra:
+                        break
+                if tail:
+                    window += "\n" + "\n".join(tail)
+            pos = window.find(needle)
+            while 0 <= pos <= limit:
+                line = starts[k] + window.count("\n", 0, pos)
+                if line >= from_line:
+                    yield line, pos - window.rfind("\n", 0, pos) - 1
+                pos = window.find(needle, pos + 1)
+
+    def _find(self, needle, from_line=0):
+        """First (line, column) of needle at or after from_line, or None.
+
+        Only blocks holding one of the needle's lines whole are searched
+        first: a middle line of a needle spanning three or more lines, else
+        its first line in case the needle starts a line. Failing that, the
+        shorter needles are searched everywhere."""
+        pieces = needle.split("\n")
+        if len(pieces) >= 3:
+            whole = max(pieces[1:-1], key=len)
+            return next(self._matches(needle, from_line, self._holding(whole, pieces.index(whole))), None)
+        found = next(self._matches(needle, from_line, self._holding(pieces[0], 0)), None)
+        return found if found is not None else next(self._matches(needle, from_line), None)
+
+    def replace_text(self, old, new, owner, replace_all=False):
+        """Apply an old-string/new-string edit to the known text; False when
+        old is not in it. The tools refuse an edit whose old string is not
+        unique in the file, so the first match in known text is the edit's."""
+        if not old:
+            return False
+        if replace_all:
+            matches = list(self._matches(old))
+        else:
+            found = self._find(old)
+            matches = [found] if found is not None else []
+        if not matches:
+            return False
+        extra = old.count("\n")
+        # Last first: a replacement never moves the text before it
+        for line, column in reversed(matches):
+            text = "\n".join(self.get(line, line + extra + 1))
+            text = text[:column] + new + text[column + len(old) :]
+            self.splice(line, line + extra + 1, text.split("\n"), owner)
+        return True
+
+    def locate(self, old_lines, from_line=0, anchor=""):
+        """0-based line where the block old_lines starts, at or after
+        from_line and the first line containing anchor; None if absent.
+        Like apply_patch, a block that does not match exactly may match
+        with surrounding whitespace ignored."""
+        if anchor:
+            found = next(self._matches(anchor, from_line), None)
+            if found is None:
+                return None
+            from_line = found[0]
+        if not old_lines:
+            return self.length if self.complete else None
+        longest = max(old_lines, key=len)
+        candidates = self._holding(longest, old_lines.index(longest))
+        for line, column in self._matches("\n".join(old_lines), from_line, candidates):
+            stop = line + len(old_lines)
+            if column == 0 and self.get(stop - 1, stop) == old_lines[-1:]:
+                return line
+        want = [line.strip() for line in old_lines]
+        have = [line.strip() for line in self.get(0, self.length)]
+        first, n = want[0], len(want)
+        for i in range(from_line, len(have) - n + 1):
+            if have[i] == first and have[i : i + n] == want:
+                return i
+        return None
+
+    def apply_hunks(self, hunks, owner, exact):
+        """Apply unified-diff hunks [(old_start, lines)] of one change,
+        positions relative to the file before it. exact: the hunk text is
+        the file text (else it is only trusted for positions; added lines
+        stay unknown and context lines keep the model's text)."""
+        for old_start, lines in reversed(hunks):
+            start = old_start - 1 if old_start else 0
+            old_count = sum(1 for line in lines if line[:1] != "+")
+            self._pad(start + old_count)
+            current = self.get(start, start + old_count)
+            old, new = [], []
+            for line in lines:
+                tag, body = line[:1], line[1:]
+                if tag == "+":
+                    new.append(body if exact else _UNKNOWN)
+                    continue
+                if tag != "-":
+                    new.append(body if exact else current[len(old)])
+                old.append(body)
+            if exact:
+                self.learn(start, old)
+            self.splice(start, start + len(old), new, owner)
+
+    def ranges(self, default):
+        """CDDL `range`s of the owned lines; a range whose owner differs
+        from default carries its own contributor."""
+        ranges = []
+        lines = self.get(0, self.length)
+        line = 0
+        for owner, run in groupby(chain.from_iterable(block.owners for block in self.blocks)):
+            count = sum(1 for _ in run)
+            if owner is not None:
+                item = {"start-line": line + 1, "end-line": line + count}
+                text = lines[line : line + count]
+                if _UNKNOWN not in text:
+                    item["content-hash"] = hashlib.sha256("".join(t + "\n" for t in text).encode("utf-8")).hexdigest()
+                if owner != default:
+                    item["contributor"] = _contributor(owner)
+                ranges.append(item)
+            line += count
+        return ranges
+
+
+def _contributor(model_id):
+    return {"type": "ai", "model-id": model_id} if model_id else {"type": "ai"}
+
+
+# ---------------------------------------------------------------------------
+# Tool call and result payloads
+# ---------------------------------------------------------------------------
+
+
+def _arg(inp, *keys):
+    for key in keys:
+        value = inp.get(key)
+        if isinstance(value, str):
+            return value
+    return None
+
+
+def _result_text(result):
+    """Text of a tool result: plain output, or Gemini functionResponse parts."""
+    output = result.get("output")
+    if isinstance(output, str):
+        return output
+    if isinstance(output, list):
+        parts = []
+        for part in output:
+            if isinstance(part, dict):
+                response = (part.get("functionResponse") or {}).get("response") or {}
+                text = response.get("output", part.get("text"))
+                if isinstance(text, str):
+                    parts.append(text)
+        return "\n".join(parts)
+    return ""
+
+
+def _failed(result):
+    if result.get("status") in ("error", "failed", "incomplete"):
+        return True
+    output = result.get("output")
+    return isinstance(output, str) and output.lstrip().lower().startswith(("error", "apply_patch verification failed"))
+
+
+def _patch_text(inp):
+    """apply_patch text: the Codex custom tool call input, or OpenCode's patchText."""
+    if isinstance(inp, dict):
+        inp = _arg(inp, "patchText", "patch", "input")
+    return inp if isinstance(inp, str) else ""
+
+
+def _parse_patch(text):
+    """apply_patch text -> [(op, path, move_to, body)]: body is the content
+    lines for "add" and [(anchor, old_lines, new_lines)] hunks for "update"."""
+    ops = []
+    current = hunk = None
+    for line in text.splitlines():
+        if line.startswith("*** "):
+            head, _, path = line[4:].partition(": ")
+            if head in ("Add File", "Delete File", "Update File"):
+                current = [head.split()[0].lower(), path.strip(), None, []]
+                ops.append(current)
+                hunk = None
+            elif head == "Move to" and current is not None:
+                current[2] = path.strip()
+            continue
+        if current is None or current[0] == "delete":
+            continue
+        if current[0] == "add":
+            if line.startswith("+"):
+                current[3].append(line[1:])
+            continue
+        if line.startswith("@@"):
+            hunk = (line[2:].strip(), [], [])
+            current[3].append(hunk)
+            continue
+        if hunk is None:
+            hunk = ("", [], [])
+            current[3].append(hunk)
+        tag, body = line[:1], line[1:]
+        if tag != "+":
+            hunk[1].append(body)
+        if tag != "-":
+            hunk[2].append(body)
+    return [tuple(op) for op in ops]
+
+
+def _unified_hunks(diff):
+    """Unified diff text -> [(old_start, prefixed lines)], lines bounded by
+    the hunk header counts."""
+    hunks = []
+    lines = diff.split("\n")
+    i = 0
+    while i < len(lines):
+        m = _HUNK_HEADER_RE.match(lines[i])
+        i += 1
+        if not m:
+            continue
+        old_left = int(m.group(2) or 1)
+        new_left = int(m.group(4) or 1)
+        body = []
+        while (old_left > 0 or new_left > 0) and i < len(lines):
+            line = lines[i]
+            i += 1
+            if line.startswith("\\"):
+                continue
+            tag = line[:1]
+            if tag not in "+-":  # context, including display-stripped blank lines
+                line = " " + line[1:] if tag == " " else " " + line
+            body.append(line)
+            old_left -= tag != "+"
+            new_left -= tag != "-"
+        hunks.append((int(m.group(1)), body))
+    return hunks
+
+
+def _read_window(kind_hint, result, extra):
+    """(start, lines, total) shown by a read tool result, else None."""
+    file_view = extra.get("file") if isinstance(extra, dict) else None
+    if isinstance(file_view, dict) and isinstance(file_view.get("content"), str):
+        lines = _split_lines(file_view["content"])
+        start = max(int(file_view.get("startLine") or 1) - 1, 0)
+        total = file_view.get("totalLines")
+        return start, lines, total if isinstance(total, int) else None
+    text = _result_text(result)
+    if not text:
+        return None
+    if kind_hint == "Read":
+        return _numbered(text.split("\n"), _CLAUDE_READ_RE)
+    if kind_hint == "read":
+        window = _numbered(text.split("\n"), _OPENCODE_READ_RE)
+        if window:
+            m = _OPENCODE_EOF_RE.search(text)
+            return window[0], window[1], int(m.group(1)) if m else None
+        return None
+    # Gemini read_file: whole file, or a window announced in a header
+    if _GEMINI_CONTENT in text:
+        m = _GEMINI_WINDOW_RE.search(text)
+        if not m:
+            return None
+        return int(m.group(1)) - 1, _split_lines(text.split(_GEMINI_CONTENT, 1)[1]), int(m.group(3))
+    lines = _split_lines(text)
+    return 0, lines, len(lines)
+
+
+def _numbered(lines, pattern):
+    """(start, lines, None) for a run of consecutively numbered lines."""
+    start = None
+    out = []
+    for line in lines:
+        m = pattern.match(line)
+        if not m:
+            if out:
+                break
+            continue
+        number = int(m.group(1))
+        if start is None:
+            start = number - 1
+        elif number != start + len(out) + 1:
+            break
+        out.append(m.group(2))
+    return (start, out, None) if out else None
+
+
+def _shell_read(inp, result):
+    """(directory, path, start, lines, total) of a Codex file-viewing
+    command (sed -n, nl -ba | sed -n, cat), else None."""
+    if isinstance(inp, str) and not any(tool in inp for tool in ("sed -n", "cat ")):
+        return None
+    try:
+        args = json.loads(inp) if isinstance(inp, str) else inp
+    except ValueError:
+        return None
+    if not isinstance(args, dict):
+        return None
+    cmd = args.get("cmd", args.get("command"))
+    if isinstance(cmd, list):
+        cmd = cmd[-1] if cmd else None
+    if not isinstance(cmd, str):
+        return None
+    cmd = cmd.strip()
+    m = _CODEX_SED_RE.match(cmd) or _CODEX_NL_RE.match(cmd) or _CODEX_CAT_RE.match(cmd)
+    if not m:
+        return None
+    text = _result_text(result)
+    _, sep, body = text.partition("Output:\n")
+    if not sep:
+        body = text
+    lines = []
+    for line in _split_lines(body):
+        if "tokens truncated" in line:
+            return None
+        lines.append(line)
+    directory = m.group("cd") or args.get("workdir")
+    if "a" not in m.groupdict():
+        return directory, m.group("path"), 0, lines, len(lines)
+    first, last = int(m.group("a")), int(m.group("b"))
+    if m.re is _CODEX_NL_RE:
+        window = _numbered(lines, _CODEX_NL_LINE_RE)
+        if not window or window[0] != first - 1:
+            return None
+        lines = window[1]
+    total = first - 1 + len(lines) if len(lines) < last - first + 1 else None
+    return directory, m.group("path"), first - 1, lines, total
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+
+
+def _events(entries, meta):
+    """Tool calls and results in session order: ("call", call, model) and
+    ("result", result, extra), extra being Claude's toolUseResult."""
+    default_model = meta.get("model_id")
+
+    def visit(entry, parent):
+        # Entry slots are read directly: this walk touches every entry
+        if isinstance(entry, Entry):
+            kind, children = entry.type, getattr(entry, "children", None)
+        else:
+            kind, children = entry.get("type"), entry.get("children")
+        if kind == "tool-call":
+            model = entry.get("model-id") or (parent.get("model-id") if parent is not None else None) or default_model
+            yield "call", entry, model
+        elif kind == "tool-result":
+            extra = parent.get("toolUseResult") if parent is not None else None
+            yield "result", entry, extra if extra is not None else entry.get("toolUseResult")
+        if children:
+            for child in children:
+                yield from visit(child, entry)
+
+    for entry in entries:
+        yield from visit(entry, None)
+
+
+def _project_roots(cwd, absolute, relative, pairs):
+    """Directories the attributed paths are relative to (see module docstring)."""
+    cwd = cwd.rstrip("/") if cwd else None
+    if cwd and any(path.startswith(cwd + "/") for path in absolute):
+        return [cwd]
+    roots = {path[: -len(rel) - 1] for path, rel in pairs if path.endswith("/" + rel)}
+    for rel in relative:
+        roots.update(path[: -len(rel) - 1] for path in absolute if path.endswith("/" + rel))
+    return sorted(roots, key=len, reverse=True) or ([cwd] if cwd else [])
+
+
+def build_attribution(entries, meta, stats=None):
+    """file-attribution-record for a parsed session, or None when none of
+    its file-writing tool calls could be placed.
+
+    stats (a dict or Counter, optional) receives counts of "edits"
+    (file-writing tool calls replayed), "unplaced" (of those, the ones
+    that could not be located, plus each file left out because its path
+    lies under no project root) and "reads".
+    """
+    counts = Counter()
+    calls, order = [], []
+    pending = {}
+    absolute, relative, pairs = set(), set(), set()
+
+    def note(path):
+        if path:
+            (absolute if path.startswith("/") else relative).add(path)
+
+    # First pass: pair calls with results, collect path hints for the root
+    for kind, item, info in _events(entries, meta):
+        if kind == "call":
+            tool = _TOOLS.get(item.get("name"))
+            if tool is None:
+                continue
+            inp = item.get("input")
+            if isinstance(inp, dict):
+                note(_arg(inp, "file_path", "filePath", "path"))
+            if tool == "patch":
+                for op in _parse_patch(_patch_text(inp)):
+                    note(op[1])
+            call = [item, info, None, None]
+            calls.append(call)
+            if item.get("call-id") is not None:
+                pending[item["call-id"]] = call
+        else:
+            call = pending.pop(item.get("call-id"), None)
+            if call is None:
+                continue
+            call[2], call[3] = item, info
+            order.append(call)
+            if _TOOLS[call[0]["name"]] != "patch":
+                continue
+            metadata = item.get("metadata")
+            for changed in metadata.get("files") or () if isinstance(metadata, dict) else ():
+                if isinstance(changed, dict) and changed.get("filePath") and changed.get("relativePath"):
+                    pairs.add((changed["filePath"], changed["relativePath"]))
+    order.extend(call for call in calls if call[2] is None)
+    roots = _project_roots(meta.get("cwd"), absolute, relative, pairs)
+
+    files = {}
+
+    def resolve(path, base=None):
+        if not path:
+            return None
+        path = os.path.normpath(os.path.join(base or (roots[-1] if roots else ""), path))
+        for root in roots:
+            if path.startswith(root + "/"):
+                return path[len(root) + 1 :]
+        return path
+
+    def model_of(path):
+        model = files.get(path)
+        if model is None:
+            model = files[path] = _FileLines()
+        return model
+
+    for call in order:
+        item, owner, result, extra = call
+        if result is None:
+            result = {}
+        elif _failed(result):
+            continue
+        name = item.get("name")
+        tool = _TOOLS[name]
+        inp = item.get("input")
+        if tool == "shell":
+            seen = _shell_read(inp, result)
+            if seen:
+                directory, path, start, lines, total = seen
+                model_of(resolve(path, resolve(directory) if directory else None)).learn(start, lines, total)
+                counts["reads"] += 1
+            continue
+        if tool == "patch":
+            _replay_patch(_patch_text(inp), result, owner, resolve, model_of, files, counts)
+            continue
+        if not isinstance(inp, dict):
+            continue
+        path = resolve(_arg(inp, "file_path", "filePath", "path"))
+        if path is None:
+            continue
+        if tool == "read":
+            window = _read_window(name, result, extra)
+            if window:
+                model_of(path).learn(*window)
+                counts["reads"] += 1
+            continue
+        counts["edits"] += 1
+        model = model_of(path)
+        extra = extra if isinstance(extra, dict) else {}
+        if isinstance(extra.get("originalFile"), str):
+            original = _split_lines(extra["originalFile"])
+            model.learn(0, original, len(original))
+        patch = extra.get("structuredPatch")
+        if patch and isinstance(patch, list):
+            model.apply_hunks([(h["oldStart"], h["lines"]) for h in patch if isinstance(h, dict)], owner, exact=True)
+            continue
+        if tool == "write":
+            content = _arg(inp, "content")
+            if content is None:
+                counts["unplaced"] += 1
+                continue
+            lines = _split_lines(content)
+            model.write(lines, owner)
+            continue
+        edits = inp.get("edits") if isinstance(inp.get("edits"), list) else [inp]
+        for edit in edits:
+            old = _arg(edit, "old_string", "oldString")
+            new = _arg(edit, "new_string", "newString")
+            replace_all = bool(edit.get("replace_all") or edit.get("replaceAll")) or (
+                (edit.get("expected_replacements") or 1) > 1
+            )
+            if old is None or new is None or not model.replace_text(old, new, owner, replace_all):
+                metadata = result.get("metadata")
+                diff = metadata.get("diff") if isinstance(metadata, dict) else None
+                if isinstance(diff, str) and _unified_hunks(diff):
+                    model.apply_hunks(_unified_hunks(diff), owner, exact=False)
+                else:
+                    counts["unplaced"] += 1
+                break
+
+    default = meta.get("model_id")
+    out = []
+    for path in sorted(files):
+        ranges = files[path].ranges(default)
+        if not ranges:
+            continue
+        if path.startswith(("/", "../")) or path == "..":
+            # Under no known root: there is no tree it could be verified against
+            counts["unplaced"] += 1
+            continue
+        out.append({"path": path, "conversations": [{"contributor": _contributor(default), "ranges": ranges}]})
+    if stats is not None:
+        stats.update(counts)
+    return {"files": out} if out else None
+
+
+def _replay_patch(text, result, owner, resolve, model_of, files, counts):
+    """Replay one apply_patch call (see module docstring)."""
+    metadata = result.get("metadata") if isinstance(result.get("metadata"), dict) else {}
+    diffs = {}
+    for changed in metadata.get("files") or ():
+        if isinstance(changed, dict) and isinstance(changed.get("diff"), str):
+            diffs[resolve(changed.get("relativePath") or changed.get("filePath"))] = changed["diff"]
+    for op, path, move_to, body in _parse_patch(text):
+        path = resolve(path)
+        counts["edits"] += 1
+        if op == "delete":
+            files.pop(path, None)
+            continue
+        model = model_of(path)
+        if op == "add":
+            model.write(body, owner)
+        else:
+            # Place every hunk before changing anything, so a hunk that
+            # cannot be located leaves the file as it was
+            placed = []
+            line = 0
+            for anchor, old, new in body:
+                at = model.locate(old, line, anchor)
+                if at is None:
+                    placed = None
+                    break
+                placed.append((at, old, new))
+                line = at + len(old)
+            if placed is not None:
+                for at, old, new in reversed(placed):
+                    model.splice(at, at + len(old), new, owner)
+            elif diffs.get(path):
+                model.apply_hunks(_unified_hunks(diffs[path]), owner, exact=False)
+            else:
+                counts["unplaced"] += 1
+        if move_to:
+            files[resolve(move_to)] = files.pop(path)
+
+
+# ---------------------------------------------------------------------------
+# Verification against a working tree
+# ---------------------------------------------------------------------------
+
+
+class LineIndexCache:
+    """Line-start offsets of files, shared across verify_attribution calls.
+
+    Offsets are keyed by the file's SHA-256, so identical files (copies,
+    the same checkout verified for many records) are indexed once. The
+    digest of a path is remembered with its size, mtime, ctime and inode,
+    and a range hash with its (file digest, lines, algorithm): a file
+    unchanged since an earlier record is neither re-read nor re-hashed.
+    """
+
+    def __init__(self):
+        self.offsets = {}  # file digest -> array of line-start offsets
+        self.digests = {}  # path -> (stat key, file digest, line count)
+        self.hashes = {}  # (file digest, start, end, alg) -> hex digest
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+def _line_starts(data):
+    """array of the offsets at which data's lines start, plus its length."""
+    starts = array("q", [0])
+    starts.extend(m.end() for m in re.finditer(b"\n", data))
+    if starts[-1] != len(data):
+        starts.append(len(data))
+    return starts
+
+
+def _contributor_label(contributor):
+    if not contributor:
+        return "unknown"
+    model_id = contributor.get("model-id")
+    return f"{contributor.get('type', 'unknown')}:{model_id}" if model_id else contributor.get("type", "unknown")
+
+
+def _check_file(path, checks, cache, hash_algs):
+    """[(check, status)] for the ranges of one file, from a single read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return [(check, "missing") for check in checks]
+    stat_key = (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+    known = cache.digests.get(path)
+    if known is not None and known[0] == stat_key:
+        # Unchanged file: every range hashed before is answered from the cache
+        digest, line_count = known[1], known[2]
+        keys = [(digest, c["start-line"], c["end-line"], c.get("content-hash-alg", "sha-256")) for c in checks]
+        if all(
+            key in cache.hashes
+            for check, key in zip(checks, keys)
+            if "content-hash" in check and key[3] in hash_algs and 1 <= key[1] <= key[2] <= line_count
+        ):
+            return [(check, _status(check, key, line_count, cache.hashes)) for check, key in zip(checks, keys)]
+    return _mapped(path, _hash_ranges, path, stat_key, checks, cache, hash_algs)
+
+
+def _hash_ranges(data, path, stat_key, checks, cache, hash_algs):
+    digest = hashlib.sha256(data).hexdigest()
+    starts = cache.offsets.get(digest)
+    if starts is None:
+        starts = cache.offsets[digest] = _line_starts(data)
+    line_count = len(starts) - 1
+    cache.digests[path] = (stat_key, digest, line_count)
+    view = memoryview(data)
+    try:
+        results = []
+        for check in checks:
+            start, end = check["start-line"], check["end-line"]
+            alg = check.get("content-hash-alg", "sha-256")
+            key = (digest, start, end, alg)
+            if "content-hash" in check and 1 <= start <= end <= line_count and key not in cache.hashes:
+                fn = hash_algs.get(alg)
+                if fn is not None:
+                    chunk = view[starts[start - 1] : starts[end]]
+                    # Range hashes cover each line with its "\n"; the last
+                    # line of a file may lack one
+                    if chunk[-1:] != b"\n":
+                        chunk = bytes(chunk) + b"\n"
+                    cache.hashes[key] = fn(chunk)
+            results.append((check, _status(check, key, line_count, cache.hashes)))
+        return results
+    finally:
+        view.release()
+
+
+def _status(check, key, line_count, hashes):
+    if not 1 <= key[1] <= key[2] <= line_count:
+        return "out-of-range"
+    if "content-hash" not in check:
+        return "unhashed"
+    actual = hashes.get(key)
+    if actual is None:
+        return "unsupported-alg"
+    return "ok" if actual == check["content-hash"] else "mismatch"
+
+
+def verify_attribution(attribution, root, cache=None, workers=None):
+    """Check the range content hashes of a file-attribution-record against
+    the files under root.
+
+    Ranges are grouped by path, and each file is memory-mapped and hashed
+    once, with all of its ranges hashed from that mapping through a
+    line-start index (see LineIndexCache; pass one cache to share work
+    across records). Files are checked in workers threads (default: all
+    CPUs); hashlib releases the GIL, so large trees are I/O-bound.
+
+    Returns {"ranges": n, "counts": Counter of status, "contributors":
+    {contributor label: Counter of status}, "failures": [...]}; status is
+    "ok", "mismatch", "unhashed" (no content-hash), "missing" (no such
+    file), "out-of-range" (beyond the end of the file), "outside-root"
+    (an absolute path, or one that resolves outside root; never read) or
+    "unsupported-alg". A failure is
+    {"path", "start-line", "end-line", "contributor", "status"}.
+    """
+    from .signing import CONTENT_HASH_ALGS
+
+    cache = cache if cache is not None else LineIndexCache()
+    root = os.path.realpath(root)
+    by_path, outside = {}, []
+    for file in attribution.get("files", []):
+        path = os.path.realpath(os.path.join(root, file["path"]))
+        inside = not os.path.isabs(file["path"]) and os.path.commonpath([root, path]) == root
+        for conversation in file.get("conversations", []):
+            default = conversation.get("contributor")
+            for item in conversation.get("ranges", []):
+                check = dict(item, path=file["path"], contributor=item.get("contributor", default))
+                if inside:
+                    by_path.setdefault(path, []).append(check)
+                else:
+                    outside.append((check, "outside-root"))
+
+    def check_file(item):
+        return _check_file(item[0], item[1], cache, CONTENT_HASH_ALGS)
+
+    workers = min(workers or os.cpu_count() or 1, len(by_path))
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(check_file, by_path.items()))
+    else:
+        results = list(map(check_file, by_path.items()))
+    results.append(outside)
+
+    counts, contributors, failures = Counter(), {}, []
+    for check, status in chain.from_iterable(results):
+        label = _contributor_label(check["contributor"])
+        counts[status] += 1
+        contributors.setdefault(label, Counter())[status] += 1
+        if status not in ("ok", "unhashed"):
+            failures.append(
+                {
+                    "path": check["path"],
+                    "start-line": check["start-line"],
+                    "end-line": check["end-line"],
+                    "contributor": label,
+                    "status": status,
+                }
+            )
+    return {"ranges": sum(counts.values()), "counts": counts, "contributors": contributors, "failures": failures}
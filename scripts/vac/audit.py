@@ -0,0 +1,140 @@
+"""
+Persistent verification cache for repeated audits.
+
+A VerifyCache (one sqlite3 file) remembers successful verifications of a
+signature/record pair under a public key, keyed by
+
+  (SHA-256 of the .sig.cbor bytes, SHA-256 of the record file bytes,
+   SHA-256 fingerprint of the public key's DER encoding)
+
+The record digest is itself cached per path with the file's size, mtime,
+ctime and inode, so an unchanged record is recognised by os.stat alone;
+a changed stat rehashes the file (no JSON parsing, canonicalization or
+Ed25519). A hit is served only while younger than the cache TTL, and
+never for a revoked key: revoke() drops the key's cached results and
+later verifications under it fail.
+
+The cache is stdlib only (sqlite3, hashlib), so a hit never imports pycose
+or cbor2.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_TTL = 7 * 24 * 3600  # seconds before a cached result is re-verified
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS verified (
+    sig_digest TEXT NOT NULL,
+    record_digest TEXT NOT NULL,
+    key_fp TEXT NOT NULL,
+    verified_at REAL NOT NULL,
+    details TEXT NOT NULL,
+    PRIMARY KEY (sig_digest, record_digest, key_fp)
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    ctime_ns INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revoked (
+    key_fp TEXT PRIMARY KEY,
+    revoked_at REAL NOT NULL,
+    reason TEXT
+);
+"""
+
+
+def key_fingerprint(pub_pem):
+    """SHA-256 hex of a PEM key's DER bytes (no cryptography import)."""
+    if isinstance(pub_pem, bytes):
+        pub_pem = pub_pem.decode("ascii")
+    body = "".join(line.strip() for line in pub_pem.splitlines() if line.strip() and not line.startswith("-----"))
+    return hashlib.sha256(base64.b64decode(body)).hexdigest()
+
+
+class VerifyCache:
+    """sqlite3-backed verification results; see module docstring.
+
+    path  cache database file (created with its parent directory)
+    ttl   seconds a successful verification is trusted (0: never)
+    """
+
+    def __init__(self, path, ttl=DEFAULT_CACHE_TTL):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record_digest(self, path, read=False):
+        """SHA-256 hex of a file, trusted from the cache while its stat is unchanged.
+
+        Returns (digest, data): data is the file's bytes when it had to be
+        read, else None. read=True always reads (and re-hashes) the file, so
+        the digest is that of the returned bytes.
+        """
+        path = Path(path).resolve()
+        st = os.stat(path)
+        stat_key = (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+        if not read:
+            row = self.db.execute(
+                "SELECT size, mtime_ns, ctime_ns, ino, digest FROM files WHERE path = ?", (str(path),)
+            ).fetchone()
+            if row is not None and tuple(row[:4]) == stat_key:
+                return row[4], None
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)", (str(path), *stat_key, digest))
+        return digest, data
+
+    def revoked(self, key_fp):
+        """(revoked_at, reason) for a revoked key, else None."""
+        return self.db.execute("SELECT revoked_at, reason FROM revoked WHERE key_fp = ?", (key_fp,)).fetchone()
+
+    def lookup(self, sig_digest, record_digest, key_fp):
+        """Details stored with a live successful verification (plus its
+        "verified-at" epoch time), else None."""
+        if self.revoked(key_fp):
+            return None
+        row = self.db.execute(
+            "SELECT verified_at, details FROM verified WHERE sig_digest = ? AND record_digest = ? AND key_fp = ?",
+            (sig_digest, record_digest, key_fp),
+        ).fetchone()
+        if row is None or time.time() - row[0] >= self.ttl:
+            return None
+        return dict(json.loads(row[1]), **{"verified-at": row[0]})
+
+    def store(self, sig_digest, record_digest, key_fp, details):
+        """Remember a successful verification (never for a revoked key)."""
+        if self.revoked(key_fp):
+            return
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO verified VALUES (?, ?, ?, ?, ?)",
+                (sig_digest, record_digest, key_fp, time.time(), json.dumps(details, sort_keys=True)),
+            )
+
+    def revoke(self, key_fp, reason=None):
+        """Revoke a key: drop its cached results. Returns the number dropped."""
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO revoked VALUES (?, ?, ?)", (key_fp, time.time(), reason))
+            return self.db.execute("DELETE FROM verified WHERE key_fp = ?", (key_fp,)).rowcount
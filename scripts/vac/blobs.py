@@ -0,0 +1,147 @@
+"""
+Content-addressed blob store for large payloads.
+
+Tool input/output and encrypted reasoning payloads above a size threshold
+are moved out of records into a store keyed by SHA-256; the record keeps a
+digest reference (see externalize_blobs).
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+# Payload fields eligible for externalization, and the reference key marking
+# an inline value as a blob reference.
+BLOB_FIELDS = ("input", "output", "encrypted")
+BLOB_REF_KEY = "vac-blob"
+DEFAULT_BLOB_THRESHOLD = 64 * 1024
+_REF_KEYS = frozenset((BLOB_REF_KEY, "size", "media-type"))
+_REF_DIGEST_RE = re.compile(r"sha-256:[0-9a-f]{64}")
+
+
+def _blob_bytes(value):
+    """Serialize a payload value. Returns (bytes, media type)."""
+    if isinstance(value, str):
+        return value.encode("utf-8"), "text/plain; charset=utf-8"
+    data = json.dumps(value, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+    return data.encode("utf-8"), "application/json"
+
+
+def _blob_path(store, digest):
+    return Path(store) / "sha-256" / digest[:2] / digest
+
+
+def put_blob(store, data):
+    """Store bytes under their SHA-256 digest. Returns (digest, newly_written).
+
+    Existing blobs are never rewritten, so identical payloads across sessions
+    share one file.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(store, digest)
+    if path.exists():
+        return digest, False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return digest, True
+
+
+def get_blob(store, digest):
+    """Read a blob and check it against its digest. Raises ValueError on mismatch."""
+    data = _blob_path(store, digest).read_bytes()
+    actual = hashlib.sha256(data).hexdigest()
+    if actual != digest:
+        raise ValueError(f"Blob {digest} is corrupt (content hashes to {actual})")
+    return data
+
+
+def is_blob_ref(value):
+    """Whether value has exactly the shape externalize_blobs writes:
+    {"vac-blob": "sha-256:<64 hex>", "size": int, "media-type": str (optional)}.
+
+    Native tool input/output passes through unchanged, so a payload that
+    merely has a "vac-blob" key is not a reference.
+    """
+    return (
+        isinstance(value, dict)
+        and value.keys() <= _REF_KEYS
+        and isinstance(value.get(BLOB_REF_KEY), str)
+        and _REF_DIGEST_RE.fullmatch(value[BLOB_REF_KEY]) is not None
+        and type(value.get("size")) is int
+        and isinstance(value.get("media-type", ""), str)
+    )
+
+
+def externalize_blobs(entries, store, threshold=DEFAULT_BLOB_THRESHOLD):
+    """Replace payloads larger than threshold bytes with blob references.
+
+    input/output are `any` in the schema, so the value itself becomes a
+    reference map: {"vac-blob": "sha-256:<hex>", "size": n, "media-type": ...}.
+    encrypted is a tstr, so it moves to the `encrypted-blob` extension key
+    instead. Children are processed too. Mutates entries in place.
+
+    Returns stats: {"externalized", "bytes", "written"}.
+    """
+    stats = {"externalized": 0, "bytes": 0, "written": 0}
+
+    def visit(entry):
+        for field in BLOB_FIELDS:
+            if field not in entry or is_blob_ref(entry[field]):
+                continue
+            data, media_type = _blob_bytes(entry[field])
+            if len(data) <= threshold:
+                continue
+            digest, written = put_blob(store, data)
+            ref = {BLOB_REF_KEY: f"sha-256:{digest}", "size": len(data), "media-type": media_type}
+            if field == "encrypted":
+                del entry["encrypted"]
+                entry["encrypted-blob"] = ref
+            else:
+                entry[field] = ref
+            stats["externalized"] += 1
+            stats["bytes"] += len(data)
+            stats["written"] += written
+        for child in entry.get("children", []):
+            visit(child)
+
+    for entry in entries:
+        visit(entry)
+    return stats
+
+
+def resolve_blob_ref(store, ref):
+    """Load and verify the payload a blob reference points to."""
+    alg, _, digest = ref[BLOB_REF_KEY].partition(":")
+    if alg != "sha-256":
+        raise ValueError(f"Unsupported blob digest algorithm: {alg}")
+    data = get_blob(store, digest)
+    if len(data) != ref.get("size", len(data)):
+        raise ValueError(f"Blob {digest} size mismatch: {len(data)} != {ref['size']}")
+    if ref.get("media-type") == "application/json":
+        return json.loads(data)
+    return data.decode("utf-8")
+
+
+def inline_blobs(entries, store):
+    """Inverse of externalize_blobs: restore payloads in place. Returns count."""
+    count = 0
+
+    def visit(entry):
+        nonlocal count
+        for field in ("input", "output"):
+            if field in entry and is_blob_ref(entry[field]):
+                entry[field] = resolve_blob_ref(store, entry[field])
+                count += 1
+        if "encrypted-blob" in entry and is_blob_ref(entry["encrypted-blob"]):
+            entry["encrypted"] = resolve_blob_ref(store, entry.pop("encrypted-blob"))
+            count += 1
+        for child in entry.get("children", []):
+            visit(child)
+
+    for entry in entries:
+        visit(entry)
+    return count
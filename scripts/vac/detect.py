@@ -0,0 +1,212 @@
+"""
+Content-sniffing session format detection.
+
+detect_format() reads only the first few KB of a file and fingerprints the
+native format from the top-level keys of the leading JSON objects, so files
+no longer need an `<agent>-` name prefix to be routed to a parser:
+
+  codex     JSONL envelopes {"timestamp", "type", "payload"}
+  claude    JSONL lines carrying sessionId plus uuid / parentUuid
+            (or the queue-operation / summary bookkeeping lines)
+  cursor    JSONL lines that are bare {"role", "message"}
+  gemini    one (pretty-printed) object with sessionId and messages
+  opencode  pretty-printed concatenated objects: project / share records and
+            parts or messages keyed by sessionID / messageID
+
+Lines are often longer than the sniffed head (Codex session_meta embeds
+the whole system prompt), so objects are not parsed: a regex tokenizer
+walks strings and structural characters and collects each leading object's
+depth-1 keys and string values, truncated or not.
+"""
+
+import re
+from pathlib import Path
+
+DETECT_HEAD_BYTES = 8192
+DETECT_MIN_CONFIDENCE = 0.5
+_MAX_OBJECTS = 8
+
+# Strings (escapes included) and structural characters; everything else is skipped
+_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"?|[{}\[\]:,]')
+
+_CODEX_TYPES = {"session_meta", "response_item", "event_msg", "turn_context", "compacted"}
+_CLAUDE_TYPES = {"user", "assistant", "system", "summary", "queue-operation", "file-history-snapshot"}
+_OPENCODE_KEYS = {"sessionID", "messageID", "worktree", "sandboxes", "providerID", "modelID"}
+_OPENCODE_ID_PREFIXES = ("ses_", "msg_", "prt_")
+
+
+class _Obj:
+    __slots__ = ("complete", "keys", "pretty", "values")
+
+    def __init__(self, pretty):
+        self.keys = []  # depth-1 keys in order
+        self.values = {}  # depth-1 key -> string value (unquoted, escapes kept)
+        self.pretty = pretty
+        self.complete = False
+
+
+def _scan_objects(text):
+    """Collect depth-1 keys/values of the leading top-level objects in text."""
+    objects = []
+    depth = 0
+    obj = None
+    pending_key = None  # depth-1 key whose value comes next
+    last_string = None
+    for m in _TOKEN_RE.finditer(text):
+        tok = m.group()
+        c = tok[0]
+        if c == '"':
+            last_string = tok[1:-1] if len(tok) > 1 and tok.endswith('"') else tok[1:]
+            if pending_key is not None and depth == 1:
+                obj.values[pending_key] = last_string
+                pending_key = None
+            continue
+        if c == ":":
+            if depth == 1 and obj is not None and last_string is not None:
+                obj.keys.append(last_string)
+                pending_key = last_string
+            last_string = None
+            continue
+        pending_key = None if c in "{[" else pending_key
+        last_string = None
+        if c in "{[":
+            if depth == 0:
+                if c != "{" or len(objects) >= _MAX_OBJECTS:
+                    break
+                obj = _Obj(pretty=text[m.end() : m.end() + 1] in ("\n", "\r"))
+                objects.append(obj)
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if depth == 0 and obj is not None:
+                obj.complete = True
+                obj = None
+            elif depth < 0:
+                break
+        elif c == ",":
+            pending_key = None
+    return objects
+
+
+# ---------------------------------------------------------------------------
+# Per-format scores: 0.0 (no evidence) .. 1.0
+# ---------------------------------------------------------------------------
+
+
+def _score_codex(objects):
+    first = objects[0]
+    if first.keys[:3] != ["timestamp", "type", "payload"]:
+        return 0.0
+    if first.values.get("type") in _CODEX_TYPES:
+        return 0.99
+    return 0.85
+
+
+def _score_claude(objects):
+    if any(o.pretty for o in objects):
+        return 0.0
+    best = 0.0
+    for o in objects:
+        keys = set(o.keys)
+        if "sessionId" in keys and ({"uuid", "parentUuid"} & keys):
+            best = max(best, 0.97)
+        elif ("sessionId" in keys and o.values.get("type") in _CLAUDE_TYPES) or (
+            o.values.get("type") == "summary" and "leafUuid" in keys
+        ):
+            best = max(best, 0.8)
+    return best
+
+
+def _score_cursor(objects):
+    if any(o.pretty for o in objects):
+        return 0.0
+    if not all(o.keys and set(o.keys) <= {"role", "message"} for o in objects):
+        return 0.0
+    if not all("role" in o.keys for o in objects):
+        return 0.6
+    if not all(o.values.get("role") in ("user", "assistant", "system") for o in objects):
+        return 0.7
+    return 0.92 if len(objects) > 1 or objects[0].complete else 0.85
+
+
+def _score_gemini(objects):
+    first = objects[0]
+    keys = set(first.keys)
+    if "sessionId" not in keys or len(objects) > 1:
+        return 0.0
+    if "messages" in keys:
+        return 0.97
+    if {"projectHash", "startTime", "lastUpdated"} & keys:
+        return 0.75  # messages array not reached within the head
+    return 0.0
+
+
+def _score_opencode(objects):
+    best, hits = 0.0, 0
+    for o in objects:
+        keys = set(o.keys)
+        keyed = bool(keys & _OPENCODE_KEYS)
+        prefixed = o.values.get("id", "").startswith(_OPENCODE_ID_PREFIXES)
+        if keyed and prefixed:
+            score = 0.9
+        elif keyed or prefixed:
+            score = 0.8
+        elif {"id", "secret", "url"} <= keys:
+            score = 0.6  # share record
+        else:
+            continue
+        best = max(best, score)
+        hits += 1
+    if not hits:
+        return 0.0
+    # More agreeing objects, and the pretty-printed layout, add confidence
+    return min(0.99, best + 0.03 * (hits - 1) + (0.04 if objects[0].pretty else 0.0))
+
+
+_SCORERS = {
+    "codex": _score_codex,
+    "claude": _score_claude,
+    "cursor": _score_cursor,
+    "gemini": _score_gemini,
+    "opencode": _score_opencode,
+}
+
+
+def detect_text(head):
+    """Fingerprint a decoded head of a session file. Returns (agent or None, confidence)."""
+    objects = [o for o in _scan_objects(head) if o.keys]
+    if not objects:
+        return None, 0.0
+    scores = {agent: fn(objects) for agent, fn in _SCORERS.items()}
+    agent = max(scores, key=scores.get)
+    if scores[agent] == 0.0:
+        return None, 0.0
+    # Competing evidence lowers confidence
+    runner_up = max(v for k, v in scores.items() if k != agent)
+    return agent, round(scores[agent] - runner_up / 2, 2)
+
+
+def detect_format(path, head_bytes=DETECT_HEAD_BYTES):
+    """Read the first head_bytes of path and fingerprint its format.
+
+    Returns (agent, confidence) with agent a PARSERS key, or (None, 0.0).
+    """
+    with open(path, "rb") as f:
+        head = f.read(head_bytes)
+    return detect_text(head.decode("utf-8", errors="ignore"))
+
+
+def resolve_agent(path, min_confidence=DETECT_MIN_CONFIDENCE):
+    """Agent for a session file: its `<agent>-` name prefix when that names a
+    known format, otherwise the sniffed format if confident enough.
+
+    Returns (agent or None, confidence, detected) where detected is False
+    for a name-prefix match (confidence 1.0).
+    """
+    prefix = Path(path).name.split("-")[0]
+    if prefix in _SCORERS:
+        return prefix, 1.0, False
+    agent, confidence = detect_format(path)
+    if agent is None or confidence < min_confidence:
+        return None, confidence, True
+    return agent, confidence, True
@@ -0,0 +1,277 @@
+"""
+Entry model for parsed session entries.
+
+Parsers build Entry objects (one subclass per CDDL entry type) instead of
+plain dicts; they behave like dicts for consumers and are materialized only
+at serialization time via json_default / cbor_default.
+"""
+
+import sys
+
+# ---------------------------------------------------------------------------
+# Entry model: slotted canonical fields + separate passthrough map
+# ---------------------------------------------------------------------------
+
+
+class Entry:
+    """Compact entry for the parser pipeline.
+
+    Canonical CDDL fields live in __slots__ (declared per entry type by the
+    subclasses below). Native passthrough fields are split into a key layout
+    and a values tuple: layouts are interned tuples of interned keys, so the
+    thousands of entries sharing the same native keys share one key tuple and
+    each pays only for its values. Entries support the dict operations the
+    parsers and report code use, and become plain dicts only at serialization
+    time (to_dict, json_default, cbor_default).
+
+    Materialized key order is type, canonical fields in CDDL order, then
+    passthrough fields. A passthrough key equal to a canonical key overrides
+    the canonical value, as dict.update() did.
+    """
+
+    __slots__ = ("_xkeys", "_xvals", "type")
+    FIELDS = ()  # canonical keys in output order; slot name = key with "_" for "-"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._SLOTS = {"type": "type", **{k: k.replace("-", "_") for k in cls.FIELDS}}
+
+    def __init__(self, type_val):
+        self.type = type_val
+        self._xkeys = ()
+        self._xvals = ()
+
+    def _set_extra(self, extra):
+        keys = _layout(tuple(extra))
+        self._xkeys = keys
+        self._xvals = tuple(extra.values())
+
+    def __getitem__(self, key):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        idx = _LAYOUT_INDEX[self._xkeys].get(key)
+        if idx is None:
+            raise KeyError(key)
+        return self._xvals[idx]
+
+    def __setitem__(self, key, value):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+            return
+        idx = _LAYOUT_INDEX[self._xkeys].get(key)
+        if idx is None:
+            self._xkeys = _layout(self._xkeys + (key,))
+            self._xvals = self._xvals + (value,)
+        else:
+            self._xvals = self._xvals[:idx] + (value,) + self._xvals[idx + 1 :]
+
+    def __delitem__(self, key):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            try:
+                delattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        if key not in _LAYOUT_INDEX[self._xkeys]:
+            raise KeyError(key)
+        extra = dict(zip(self._xkeys, self._xvals))
+        del extra[key]
+        self._set_extra(extra)
+
+    def __contains__(self, key):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            return hasattr(self, slot)
+        return key in _LAYOUT_INDEX[self._xkeys]
+
+    def __iter__(self):
+        yield "type"
+        for key in self.FIELDS:
+            if hasattr(self, self._SLOTS[key]):
+                yield key
+        yield from self._xkeys
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __eq__(self, other):
+        if isinstance(other, (Entry, dict)):
+            return self.to_dict() == (other.to_dict() if isinstance(other, Entry) else other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict(deep=False)!r})"
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def update(self, other=(), **kwargs):
+        """dict.update() semantics; passthrough keys are merged in one step."""
+        slots = self._SLOTS
+        if not self._xkeys and not kwargs and type(other) is dict:
+            # Fast path: first passthrough merge into a fresh entry
+            extra = {}
+            for k, v in other.items():
+                slot = slots.get(k)
+                if slot is None:
+                    extra[k] = v
+                else:
+                    setattr(self, slot, v)
+            if extra:
+                self._xkeys = _layout(tuple(extra))
+                self._xvals = tuple(extra.values())
+            return
+        extra = None
+        for items in (other.items() if hasattr(other, "items") else other, kwargs.items()):
+            for k, v in items:
+                slot = slots.get(k)
+                if slot is not None:
+                    setattr(self, slot, v)
+                else:
+                    if extra is None:
+                        extra = dict(zip(self._xkeys, self._xvals))
+                    extra[k] = v
+        if extra is not None:
+            self._set_extra(extra)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(k, self[k]) for k in self]
+
+    def values(self):
+        return [self[k] for k in self]
+
+    def __reduce__(self):
+        # Layouts are interned per process: re-intern on unpickle (parse workers)
+        fields = {slot: getattr(self, slot) for slot in self._SLOTS.values() if slot != "type" and hasattr(self, slot)}
+        return _restore_entry, (type(self), self.type, fields, self._xkeys, self._xvals)
+
+    def to_dict(self, deep=True):
+        """Materialize as a plain dict (children too, unless deep=False)."""
+        d = {"type": self.type}
+        for key in self.FIELDS:
+            value = getattr(self, self._SLOTS[key], _MISSING)
+            if value is not _MISSING:
+                d[key] = value
+        if self._xkeys:
+            d.update(zip(self._xkeys, self._xvals))
+        if deep and isinstance(d.get("children"), list):
+            d["children"] = [c.to_dict() if isinstance(c, Entry) else c for c in d["children"]]
+        return d
+
+
+# key -> slot name; subclasses build theirs in __init_subclass__
+Entry._SLOTS = {"type": "type"}
+
+_MISSING = object()
+
+# Interned passthrough key layouts: keys tuple -> {key: position}
+_LAYOUT_INDEX = {(): {}}
+_LAYOUTS = {(): ()}
+
+
+def _layout(keys):
+    """Return the shared, interned instance of a passthrough key layout."""
+    shared = _LAYOUTS.get(keys)
+    if shared is None:
+        shared = tuple(sys.intern(k) for k in keys)
+        _LAYOUTS[shared] = shared
+        _LAYOUT_INDEX[shared] = {k: i for i, k in enumerate(shared)}
+    return shared
+
+
+def _restore_entry(cls, type_val, fields, xkeys, xvals):
+    entry = cls(type_val)
+    for slot, value in fields.items():
+        setattr(entry, slot, value)
+    entry._xkeys = _layout(xkeys)
+    entry._xvals = xvals
+    return entry
+
+
+class MessageEntry(Entry):
+    FIELDS = ("content", "timestamp", "id", "model-id", "parent-id", "token-usage", "children")
+    __slots__ = tuple(k.replace("-", "_") for k in FIELDS)
+
+
+class ToolCallEntry(Entry):
+    FIELDS = ("name", "input", "call-id", "timestamp", "id", "children")
+    __slots__ = tuple(k.replace("-", "_") for k in FIELDS)
+
+
+class ToolResultEntry(Entry):
+    FIELDS = ("output", "call-id", "status", "is-error", "timestamp", "id", "children")
+    __slots__ = tuple(k.replace("-", "_") for k in FIELDS)
+
+
+class ReasoningEntry(Entry):
+    FIELDS = ("content", "encrypted", "subject", "timestamp", "id", "children")
+    __slots__ = tuple(k.replace("-", "_") for k in FIELDS)
+
+
+class EventEntry(Entry):
+    FIELDS = ("event-type", "data", "timestamp", "id", "children")
+    __slots__ = tuple(k.replace("-", "_") for k in FIELDS)
+
+
+ENTRY_CLASSES = {
+    "user": MessageEntry,
+    "assistant": MessageEntry,
+    "tool-call": ToolCallEntry,
+    "tool-result": ToolResultEntry,
+    "reasoning": ReasoningEntry,
+    "system-event": EventEntry,
+}
+
+
+def json_default(obj):
+    """json.dumps default= hook: materialize entries one at a time."""
+    if isinstance(obj, Entry):
+        return obj.to_dict(deep=False)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def cbor_default(encoder, obj):
+    """cbor2 default= hook: materialize entries one at a time."""
+    if isinstance(obj, Entry):
+        encoder.encode(obj.to_dict(deep=False))
+        return
+    raise TypeError(f"Object of type {type(obj).__name__} is not CBOR serializable")
+
+
+def _make_entry(type_val, **kwargs):
+    """Build an entry, only including keys with non-None values."""
+    cls = ENTRY_CLASSES.get(type_val, Entry)
+    entry = cls(type_val)
+    slots = cls._SLOTS
+    for k, v in kwargs.items():
+        if v is not None:
+            slot = slots.get(k)
+            if slot is None:
+                entry[k] = v
+            else:
+                setattr(entry, slot, v)
+    return entry
@@ -0,0 +1,519 @@
+"""
+Declarative session mapping: per-format specs compiled into extractors.
+
+A spec (see vac.specs) declares how the decoded objects of one native
+format (JSONL lines, Gemini messages, OpenCode objects) become entries:
+which field selects the rule, which native fields fill which entry
+fields, which native keys are consumed, where children come from, how
+token usage is normalized and what each object contributes to the
+session meta. compile_spec(spec) turns it, once, into Python source
+with the keys, consumed sets and dispatch tables as constants, and
+returns
+
+  map_objects(objects, meta, context=None) -> entries
+
+which maps objects in order, updates meta in place (only the keys the
+objects assign, as the chunk metas of vac.parsers expect) and passes
+context to rules that look values up in it.
+
+Spec:
+  "binds"   {name: value}, evaluated on every object; "$name" refers to it
+  "steps"   tried in order for every (dict) object:
+              {"meta": [update...], "when": cond}     applied, then go on
+              {"has": [key...], "lacks": [key...], "rule": node}
+              {"on": value, "rules": {str: node}, "default": node}
+            a "has" or "on" step that matches maps the object and ends it;
+            "on" looks the value up in a dict of compiled handlers
+
+A node is a rule, a list of rules (one entry each, in order) or a nested
+dispatch {"on": value, "rules": ..., "default": ..., "source": path}.
+Rule keys (all optional):
+  "source"       path the rule's paths are relative to (default: the object)
+  "meta"         [update...]
+  "when"         cond; the rule is skipped when false
+  "entry"        entry type, or {"path"|"context": value, "map": {str: type},
+                 "default": type}; a rule without one only updates meta
+  "fields"       {entry key: value}; None values are left out
+  "token-usage"  {"path": value, "map": {native: canonical}, "extra":
+                 {canonical: value}}: mapped keys, then the other non-None
+                 native keys, then the extras; set when non-empty
+  "children"     [{"path": value, "on": key, "rules": {str: node}} or
+                 {"path": value, "rule": node}]: dict items of a list
+  "passthrough"  [(path, consumed keys[, keys consumed when dicts])]: the
+                 other non-None native keys, merged in order
+  "dedup"        {"origin": str, "texts": [field key or "*parts"], "time":
+                 value}: appends a Codex dedup candidate to meta["candidates"]
+
+Values: "a.b" (a path; None when absent), "$name", (path, default) with
+dict.get semantics (the default may be "$name"), {"const": v}, or
+{"path": p, "or": d, "transform": t} where "or" replaces None and t is
+"truthy" (None unless truthy), "error-status" ("error" if truthy, else
+"success") or "join-text" (a list of {"text"} parts joined by newlines;
+the parts are "*parts" for dedup). A path step through a missing or
+non-dict value yields the default.
+
+Meta updates: (key, value, mode[, blocker]) with mode "first" (set if
+truthy and the key, and blocker if given, is not set yet), "truthy",
+"set" (always; through a path, only when its parent is a non-empty
+dict), "model" (key and meta["models"]), "add" (to the set at key) or
+"if-unknown" (set if truthy while the key is "unknown").
+
+Conditions: {"truthy": value}, {"not-none": value}, {"any": [cond...]}.
+"""
+
+import keyword
+
+from .entries import ENTRY_CLASSES, Entry, _layout
+
+_EMPTY = {}  # stands in for a missing or non-dict path step; never written
+
+_TRANSFORMS = ("truthy", "error-status", "join-text")
+
+# Names the generated code uses for itself
+_RESERVED = {"objects", "obj", "src", "out", "meta", "context", "e", "x", "s", "k", "v", "dict", "list", "isinstance"}
+
+
+class _Writer:
+    """Indented source lines plus the path variables valid at this point."""
+
+    def __init__(self, depth=0, cache=None):
+        self.lines = []
+        self.depth = depth
+        self.cache = dict(cache or {})
+
+    def line(self, text):
+        self.lines.append("    " * self.depth + text)
+
+    def block(self):
+        return _Block(self)
+
+
+class _Block:
+    # Path variables assigned inside a block are not visible after it
+    def __init__(self, writer):
+        self.writer = writer
+
+    def __enter__(self):
+        self.saved = dict(self.writer.cache)
+        self.writer.depth += 1
+
+    def __exit__(self, *exc):
+        self.writer.depth -= 1
+        self.writer.cache = self.saved
+
+
+class _Compiler:
+    def __init__(self, spec):
+        self.spec = spec
+        self.binds = list(spec.get("binds", {}))
+        for name in self.binds:
+            if not name.isidentifier() or keyword.iskeyword(name) or name.startswith("_") or name in _RESERVED:
+                raise ValueError(f"bind name {name!r} is not a plain identifier")
+        self.ns = {"_EMPTY": _EMPTY, "_layout": _layout, "_new": object.__new__, "Entry": Entry}
+        self.functions = []
+        self.handlers = {}
+        self.tables = []
+        self.counter = 0
+
+    def fresh(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def const(self, value, prefix="_k"):
+        name = self.fresh(prefix)
+        self.ns[name] = value
+        return name
+
+    def literal(self, value):
+        """Source for a constant: a literal (so {} and [] are fresh per use) or a named constant."""
+        if isinstance(value, str) and value.startswith("$"):
+            return self.bind(value)
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return repr(value)
+        if value in ({}, []):
+            return repr(value)
+        return self.const(value)
+
+    def bind(self, ref):
+        name = ref[1:]
+        if name not in self.binds:
+            raise ValueError(f"unknown bind {ref!r}")
+        return name
+
+    @property
+    def params(self):
+        return "".join(", " + name for name in self.binds)
+
+    # -- values ---------------------------------------------------------------
+
+    def dict_at(self, w, src, parts):
+        """Variable holding the dict at src.parts (_EMPTY when a step is missing or not a dict)."""
+        if not parts:
+            return src
+        key = (src, parts)
+        var = w.cache.get(key)
+        if var is None:
+            parent = self.dict_at(w, src, parts[:-1])
+            var = self.fresh("_d")
+            w.line(f"{var} = {parent}.get({parts[-1]!r})")
+            w.line(f"if {var}.__class__ is not dict: {var} = _EMPTY")
+            w.cache[key] = var
+        return var
+
+    def path(self, w, src, path, default=None, has_default=False):
+        if path.startswith("$"):
+            return self.bind(path)
+        parts = tuple(path.split("."))
+        base = self.dict_at(w, src, parts[:-1])
+        if has_default:
+            return f"{base}.get({parts[-1]!r}, {self.literal(default)})"
+        return f"{base}.get({parts[-1]!r})"
+
+    def value(self, w, src, spec, parts_var=None):
+        """Emit what a value needs and return its expression."""
+        if isinstance(spec, str):
+            return self.path(w, src, spec)
+        if isinstance(spec, tuple):
+            return self.path(w, src, spec[0], spec[1], True)
+        if "const" in spec:
+            return self.literal(spec["const"])
+        expr = self.value(w, src, spec["path"])
+        transform = spec.get("transform")
+        if transform is None and "or" not in spec:
+            return expr
+        var = self.fresh("_v")
+        w.line(f"{var} = {expr}")
+        if "or" in spec:
+            w.line(f"if {var} is None: {var} = {self.literal(spec['or'])}")
+        if transform == "truthy":
+            w.line(f"if not {var}: {var} = None")
+        elif transform == "error-status":
+            w.line(f"{var} = 'error' if {var} else 'success'")
+        elif transform == "join-text":
+            parts_var = parts_var or self.fresh("_p")
+            w.line(f"{parts_var} = []")
+            w.line(f"if isinstance({var}, list):")
+            with w.block():
+                w.line(f"{parts_var} = [s.get('text', '') for s in {var} if isinstance(s, dict)]")
+                w.line(f"{var} = '\\n'.join({parts_var})")
+        elif transform is not None:
+            raise ValueError(f"unknown transform {transform!r} (known: {', '.join(_TRANSFORMS)})")
+        return var
+
+    def cond(self, w, src, spec):
+        if "any" in spec:
+            return "(" + " or ".join(self.cond(w, src, c) for c in spec["any"]) + ")"
+        if "truthy" in spec:
+            return f"({self.value(w, src, spec['truthy'])})"
+        if "not-none" in spec:
+            return f"({self.value(w, src, spec['not-none'])} is not None)"
+        raise ValueError(f"unknown condition {spec!r}")
+
+    # -- meta -----------------------------------------------------------------
+
+    def meta(self, w, src, updates):
+        for update in updates:
+            key, spec, mode = update[:3]
+            if mode == "set" and isinstance(spec, str) and "." in spec and not spec.startswith("$"):
+                parts = tuple(spec.split("."))
+                parent = self.dict_at(w, src, parts[:-1])
+                w.line(f"if {parent}: meta[{key!r}] = {parent}.get({parts[-1]!r})")
+                continue
+            var = self.fresh("_m")
+            w.line(f"{var} = {self.value(w, src, spec)}")
+            if mode == "first":
+                blockers = "".join(f" and {k!r} not in meta" for k in (key, *update[3:]))
+                w.line(f"if {var}{blockers}: meta[{key!r}] = {var}")
+            elif mode == "truthy":
+                w.line(f"if {var}: meta[{key!r}] = {var}")
+            elif mode == "set":
+                w.line(f"meta[{key!r}] = {var}")
+            elif mode == "model":
+                w.line(f"if {var}:")
+                with w.block():
+                    w.line(f"meta[{key!r}] = {var}")
+                    w.line(f"meta['models'].add({var})")
+            elif mode == "add":
+                w.line(f"if {var}: meta[{key!r}].add({var})")
+            elif mode == "if-unknown":
+                w.line(f"if {var} and meta[{key!r}] == 'unknown': meta[{key!r}] = {var}")
+            else:
+                raise ValueError(f"unknown meta mode {mode!r}")
+
+    # -- nodes ----------------------------------------------------------------
+
+    def handler(self, node):
+        """Name of the compiled function for a node: f(src, out, meta, context, *binds)."""
+        name = self.handlers.get(id(node))
+        if name is None:
+            name = self.handlers[id(node)] = self.fresh("_h")
+            w = _Writer()
+            w.line(f"def {name}(src, out, meta, context{self.params}):")
+            with w.block():
+                self.node(w, "src", node)
+                w.line("return")
+            self.functions.append(w)
+        return name
+
+    def table(self, rules):
+        name = self.fresh("_t")
+        self.tables.append((name, {key: self.handler(node) for key, node in rules.items()}))
+        return name
+
+    def dispatch(self, w, src, node, on_match):
+        """Look the node's "on" value up in its handler table; on_match follows a call."""
+        table = self.table(node["rules"])
+        default = self.handler(node["default"]) if node.get("default") is not None else "None"
+        key = self.fresh("_key")
+        w.line(f"{key} = {self.value(w, src, node['on'])}")
+        w.line(f"_h = {table}.get({key}, {default}) if {key}.__class__ is str else {default}")
+        w.line("if _h is not None:")
+        with w.block():
+            w.line(f"_h({src}, out, meta, context{self.params})")
+            if on_match:
+                w.line(on_match)
+
+    def node(self, w, src, node):
+        if isinstance(node, list):
+            for rule in node:
+                self.rule(w, src, rule)
+        elif "on" in node:
+            if node.get("source"):
+                src = self.dict_at(w, src, tuple(node["source"].split(".")))
+            self.dispatch(w, src, node, None)
+        else:
+            self.rule(w, src, node)
+
+    def rule(self, w, src, rule):
+        if rule.get("source"):
+            src = self.dict_at(w, src, tuple(rule["source"].split(".")))
+        if "when" in rule:
+            w.line(f"if {self.cond(w, src, rule['when'])}:")
+            with w.block():
+                self.rule(w, src, {k: v for k, v in rule.items() if k not in ("when", "source")})
+            return
+        self.meta(w, src, rule.get("meta", ()))
+        if "entry" in rule:
+            self.entry(w, src, rule)
+
+    def entry(self, w, src, rule):
+        etype = rule["entry"]
+        if isinstance(etype, str):
+            cls = ENTRY_CLASSES.get(etype, Entry)
+            type_expr = repr(etype)
+            types = {etype}
+        else:
+            types = set(etype["map"].values()) | {etype["default"]}
+            table = self.const(dict(etype["map"]), "_types")
+            if "context" in etype:
+                key_expr = self.value(w, src, etype["context"])
+                w.line(f"_tk = context.get({key_expr})")
+            else:
+                w.line(f"_tk = {self.value(w, src, etype['path'])}")
+            w.line(f"_type = {table}.get(_tk, {etype['default']!r}) if _tk.__class__ is str else {etype['default']!r}")
+            type_expr = "_type"
+            classes = {ENTRY_CLASSES.get(t, Entry) for t in types}
+            cls = classes.pop() if len(classes) == 1 else None
+        if cls is None:
+            w.line(f"e = _new({self.const(ENTRY_CLASSES, '_classes')}.get(_type, Entry))")
+            slots = set.intersection(*(set(ENTRY_CLASSES.get(t, Entry)._SLOTS) for t in types))
+            slot_names = {k: k.replace("-", "_") for k in slots}
+            fieldset = frozenset().union(*(ENTRY_CLASSES.get(t, Entry)._SLOTS for t in types))
+        else:
+            w.line(f"e = _new({self.const(cls, '_cls')})")
+            slot_names = cls._SLOTS
+            fieldset = frozenset(cls._SLOTS)
+
+        # Entry.__init__ inlined: type now, the passthrough layout once x is known
+        w.line(f"e.type = {type_expr}")
+
+        # Non-canonical keys go to "x" (native fields, in order) ahead of the passthrough
+        keys = list(rule.get("fields", ()))
+        keys += ["token-usage"] * bool(rule.get("token-usage")) + ["children"] * bool(rule.get("children"))
+        extra = any(slot_names.get(key) in (None, "type") for key in keys)
+        if extra:
+            w.line("x = {}")
+        field_vars = {}
+
+        def put(key, expr, known_set=False):
+            slot = slot_names.get(key)
+            if slot is not None and slot != "type":
+                w.line(f"e.{slot} = {expr}" if known_set else f"if {expr} is not None: e.{slot} = {expr}")
+                return
+            w.line(f"x[{key!r}] = {expr}" if known_set else f"if {expr} is not None: x[{key!r}] = {expr}")
+
+        parts_var = None
+        for key, spec in rule.get("fields", {}).items():
+            if isinstance(spec, dict) and "const" in spec and spec["const"] is not None:
+                put(key, self.literal(spec["const"]), known_set=True)
+                field_vars[key] = self.literal(spec["const"])
+                continue
+            if isinstance(spec, dict) and spec.get("transform") == "join-text":
+                parts_var = self.fresh("_p")
+            expr = self.value(w, src, spec, parts_var)
+            var = self.fresh("_f")
+            w.line(f"{var} = {expr}")
+            field_vars[key] = var
+            put(key, var)
+
+        usage = rule.get("token-usage")
+        if usage:
+            self.token_usage(w, src, usage)
+            w.line("if _tu:")
+            with w.block():
+                put("token-usage", "_tu", known_set=True)
+
+        if rule.get("children"):
+            w.line("_ch = []")
+            for child in rule["children"]:
+                self.children(w, src, child)
+            w.line("if _ch:")
+            with w.block():
+                put("children", "_ch", known_set=True)
+
+        for item in rule.get("passthrough", ()):
+            path, consumed = item[0], item[1]
+            dict_keys = item[2] if len(item) > 2 else ()
+            source = self.dict_at(w, src, tuple(path.split("."))) if path else src
+            consumed = self.const(frozenset(consumed), "_consumed")
+            comp = f"{{k: v for k, v in {source}.items() if k not in {consumed} and v is not None}}"
+            if extra:
+                w.line(f"x.update({comp})")
+            else:
+                w.line(f"x = {comp}")
+                extra = True
+            for key in dict_keys:
+                w.line(f"if {source}.get({key!r}).__class__ is dict: x.pop({key!r}, None)")
+
+        if extra:
+            fields = self.const(fieldset, "_fields")
+            w.line("if x:")
+            with w.block():
+                w.line(f"if {fields}.isdisjoint(x):")
+                with w.block():
+                    w.line("e._xkeys = _layout(tuple(x))")
+                    w.line("e._xvals = tuple(x.values())")
+                w.line("else:")
+                with w.block():
+                    w.line("e._xkeys = e._xvals = ()")
+                    w.line("e.update(x)")
+            w.line("else:")
+            with w.block():
+                w.line("e._xkeys = e._xvals = ()")
+        else:
+            w.line("e._xkeys = e._xvals = ()")
+        w.line("out.append(e)")
+
+        dedup = rule.get("dedup")
+        if dedup:
+            texts = []
+            for ref in dedup["texts"]:
+                if ref == "*parts":
+                    if parts_var is None:
+                        raise ValueError('"*parts" needs a "join-text" field')
+                    texts.append(f"*{parts_var}")
+                else:
+                    texts.append(field_vars[ref])
+            kind = type_expr
+            time = self.value(w, src, dedup["time"])
+            w.line(
+                f"meta['candidates'].append((len(out) - 1, {dedup['origin']!r}, {kind}, [{', '.join(texts)}], {time}))"
+            )
+
+    def token_usage(self, w, src, spec):
+        var = self.fresh("_u")
+        w.line("_tu = None")
+        w.line(f"{var} = {self.value(w, src, spec['path'])}")
+        w.line(f"if {var}.__class__ is dict and {var}:")
+        with w.block():
+            w.line("_tu = {}")
+            for native, canonical in spec["map"].items():
+                w.line(f"if {native!r} in {var}: _tu[{canonical!r}] = {var}[{native!r}]")
+            consumed = self.const(frozenset(spec["map"]), "_consumed")
+            w.line(f"_tu.update({{k: v for k, v in {var}.items() if k not in {consumed} and v is not None}})")
+        for canonical, value in spec.get("extra", {}).items():
+            extra = self.fresh("_x")
+            w.line(f"{extra} = {self.value(w, src, value)}")
+            w.line(f"if {extra} is not None:")
+            with w.block():
+                w.line("if _tu is None: _tu = {}")
+                w.line(f"_tu[{canonical!r}] = {extra}")
+
+    def children(self, w, src, spec):
+        items = self.fresh("_items")
+        w.line(f"{items} = {self.value(w, src, spec['path'])}")
+        w.line(f"if {items}.__class__ is list:")
+        with w.block():
+            w.line(f"for _part in {items}:")
+            with w.block():
+                w.line("if _part.__class__ is not dict: continue")
+                if "on" in spec:
+                    table = self.table(spec["rules"])
+                    w.line(f"_k = _part.get({spec['on']!r})")
+                    w.line(f"_h = {table}.get(_k) if _k.__class__ is str else None")
+                    w.line(f"if _h is not None: _h(_part, _ch, meta, context{self.params})")
+                else:
+                    w.line(f"{self.handler(spec['rule'])}(_part, _ch, meta, context{self.params})")
+
+    # -- top level ------------------------------------------------------------
+
+    def compile(self, name):
+        w = _Writer()
+        w.line(f"def {name}(objects, meta, context=None):")
+        with w.block():
+            w.line("out = []")
+            w.line("for obj in objects:")
+            with w.block():
+                w.line("if obj.__class__ is not dict: continue")
+                for bind, spec in self.spec.get("binds", {}).items():
+                    w.line(f"{bind} = {self.value(w, 'obj', spec)}")
+                for step in self.spec["steps"]:
+                    self.step(w, step)
+            w.line("return out")
+        return "\n\n".join("\n".join(f.lines) for f in [w, *self.functions]) + "\n"
+
+    def step(self, w, step):
+        if "meta" in step:
+            if "when" in step:
+                w.line(f"if {self.cond(w, 'obj', step['when'])}:")
+                with w.block():
+                    self.meta(w, "obj", step["meta"])
+            else:
+                self.meta(w, "obj", step["meta"])
+        elif "has" in step or "lacks" in step:
+            test = [f"{k!r} in obj" for k in step.get("has", ())]
+            test += [f"{k!r} not in obj" for k in step.get("lacks", ())]
+            w.line(f"if {' and '.join(test)}:")
+            with w.block():
+                if step.get("rule"):
+                    w.line(f"{self.handler(step['rule'])}(obj, out, meta, context{self.params})")
+                w.line("continue")
+        elif "on" in step:
+            self.dispatch(w, "obj", step, "continue")
+        else:
+            raise ValueError(f"unknown step {step!r}")
+
+
+def compile_spec(spec, name=None, module=None):
+    """Compile a mapping spec (see the module docstring) into
+    map_objects(objects, meta, context=None) -> entries.
+
+    name and module set the function's __name__/__qualname__ and
+    __module__, so a module that binds the result to that name can pickle
+    it (parse worker processes). The generated source is kept as
+    map_objects.source.
+    """
+    name = name or f"_map_{spec.get('agent', 'objects')}"
+    compiler = _Compiler(spec)
+    source = compiler.compile(name)
+    ns = compiler.ns
+    # The source is generated from the spec's literal paths and keys, never from session data
+    exec(compile(source, f"<vac.mapping {name}>", "exec"), ns)  # noqa: S102
+    for table, handlers in compiler.tables:
+        ns[table] = {key: ns[handler] for key, handler in handlers.items()}
+    fn = ns[name]
+    fn.__qualname__ = name
+    if module:
+        fn.__module__ = module
+    fn.source = source
+    return fn
@@ -0,0 +1,313 @@
+"""
+Machine-readable run metrics for the VAC validation and signing jobs (--metrics).
+
+At the end of a run the collected metrics are written atomically to a
+Prometheus textfile (path ending in .prom, for node_exporter's textfile
+collector) or a JSON document (any other path):
+
+  files        processed files by agent and status (pass / fail / skip)
+  bytes        input bytes of processed session files
+  entries      parsed entries (top-level, children not included)
+  stages       latency histograms per stage, fed by vac.profiling.stage()
+  signing      signatures produced, payload bytes signed and the resulting
+               signatures/s and bytes/s over time spent in the "sign" stage
+  run          start time and duration
+
+During long runs, --progress N prints files done, throughput and ETA (by
+input bytes) to stderr at most every N seconds.
+
+Instrumented code calls the module-level helpers (file_done, signed), which
+are no-ops until a RunMetrics is enabled. merge combines the documents of
+runs in parallel, e.g. the shards of a --shard run (see vac.shard).
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from . import profiling
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_active = None
+
+
+class RunMetrics:
+    """Counters and stage histograms for one script run; see module docstring."""
+
+    def __init__(self, script, total_files=0, total_bytes=0, progress_interval=0):
+        self.script = script
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.progress_interval = progress_interval
+        self._last_progress = self._t0
+        self.files = {}  # (agent, status) -> count
+        self.bytes = 0
+        self.entries = 0
+        self.signatures = 0
+        self.signed_bytes = 0
+        self.stages = {}  # name -> {"count", "sum", "buckets": [..]}
+
+    # -- collection ---------------------------------------------------------
+
+    def observe_stage(self, name, file, seconds):
+        h = self.stages.get(name)
+        if h is None:
+            h = self.stages[name] = {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)}
+        h["count"] += 1
+        h["sum"] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h["buckets"][i] += 1
+                break
+
+    def file_done(self, agent, status, nbytes=0, entries=0):
+        key = (agent, status)
+        self.files[key] = self.files.get(key, 0) + 1
+        self.bytes += nbytes
+        self.entries += entries
+        self._maybe_progress()
+
+    def signed(self, nbytes):
+        self.signatures += 1
+        self.signed_bytes += nbytes
+
+    def _maybe_progress(self):
+        if not self.progress_interval:
+            return
+        now = time.perf_counter()
+        if now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        print(self.progress_line(now), file=sys.stderr, flush=True)
+
+    def progress_line(self, now=None):
+        elapsed = (now or time.perf_counter()) - self._t0
+        done = sum(self.files.values())
+        rate = done / elapsed if elapsed else 0.0
+        line = f"[progress] {done}"
+        if self.total_files:
+            line += f"/{self.total_files} files ({done / self.total_files * 100:.1f}%)"
+        else:
+            line += " files"
+        line += f", {self.bytes / 1024 / 1024:.1f} MB, {rate:.1f} files/s"
+        if self.total_bytes and self.bytes:
+            remaining = elapsed * (self.total_bytes - self.bytes) / self.bytes
+            line += f", ETA {_fmt_duration(remaining)}"
+        return line
+
+    # -- export -------------------------------------------------------------
+
+    def _signing(self):
+        sign_seconds = self.stages.get("sign", {}).get("sum", 0.0)
+        return {
+            "signatures": self.signatures,
+            "signed_bytes": self.signed_bytes,
+            "seconds": round(sign_seconds, 6),
+            "signatures_per_second": round(self.signatures / sign_seconds, 3) if sign_seconds else 0.0,
+            "bytes_per_second": round(self.signed_bytes / sign_seconds, 1) if sign_seconds else 0.0,
+        }
+
+    def to_dict(self):
+        agents = {}
+        for (agent, status), n in sorted(self.files.items()):
+            agents.setdefault(agent, {"pass": 0, "fail": 0, "skip": 0})[status] = n
+        return {
+            "script": self.script,
+            "started": self.started,
+            "duration_seconds": round(time.perf_counter() - self._t0, 6),
+            "files": sum(self.files.values()),
+            "bytes": self.bytes,
+            "entries": self.entries,
+            "agents": agents,
+            "stages": {
+                name: {
+                    "count": h["count"],
+                    "sum": round(h["sum"], 6),
+                    "buckets": {str(b): c for b, c in zip(BUCKETS, _cumulative(h["buckets"]))},
+                }
+                for name, h in sorted(self.stages.items())
+            },
+            "signing": self._signing(),
+        }
+
+    def to_prometheus(self):
+        return to_prometheus(self.to_dict())
+
+    def write(self, path):
+        """Write metrics atomically: Prometheus text for *.prom, JSON otherwise."""
+        write(self.to_dict(), path)
+
+
+def to_prometheus(d):
+    """Prometheus textfile of a metrics document (RunMetrics.to_dict or merge)."""
+    job = f'script="{d["script"]}"'
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_str = f"{{{job}{',' + labels if labels else ''}}}"
+            lines.append(f"{name}{label_str} {value}")
+
+    metric("vac_run_start_timestamp_seconds", "gauge", "Run start (Unix time).", [("", d["started"])])
+    metric("vac_run_duration_seconds", "gauge", "Run wall time.", [("", d["duration_seconds"])])
+    metric(
+        "vac_files",
+        "gauge",
+        "Session files processed, by agent and status.",
+        [
+            (f'agent="{agent}",status="{status}"', n)
+            for agent, counts in d["agents"].items()
+            for status, n in counts.items()
+        ],
+    )
+    metric("vac_input_bytes", "gauge", "Input bytes of processed session files.", [("", d["bytes"])])
+    metric("vac_entries", "gauge", "Parsed entries (top-level).", [("", d["entries"])])
+
+    lines.append("# HELP vac_stage_duration_seconds Per-stage latency.")
+    lines.append("# TYPE vac_stage_duration_seconds histogram")
+    for name, h in d["stages"].items():
+        base = f'{job},stage="{name}"'
+        for bound, count in h["buckets"].items():
+            lines.append(f'vac_stage_duration_seconds_bucket{{{base},le="{bound}"}} {count}')
+        lines.append(f'vac_stage_duration_seconds_bucket{{{base},le="+Inf"}} {h["count"]}')
+        lines.append(f"vac_stage_duration_seconds_sum{{{base}}} {h['sum']}")
+        lines.append(f"vac_stage_duration_seconds_count{{{base}}} {h['count']}")
+
+    sg = d["signing"]
+    metric("vac_signatures", "gauge", "COSE_Sign1 signatures produced.", [("", sg["signatures"])])
+    metric("vac_signed_bytes", "gauge", "Canonical payload bytes signed.", [("", sg["signed_bytes"])])
+    metric(
+        "vac_signatures_per_second",
+        "gauge",
+        "Signing rate over time in the sign stage.",
+        [("", sg["signatures_per_second"])],
+    )
+    metric(
+        "vac_signed_bytes_per_second",
+        "gauge",
+        "Signing throughput over time in the sign stage.",
+        [("", sg["bytes_per_second"])],
+    )
+    return "\n".join(lines) + "\n"
+
+
+def write(d, path):
+    """Write a metrics document atomically: Prometheus text for *.prom, JSON otherwise."""
+    path = Path(path)
+    if path.suffix == ".prom":
+        text = to_prometheus(d)
+    else:
+        text = json.dumps(d, indent=2) + "\n"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp{os.getpid()}")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def merge(docs):
+    """One metrics document from those of runs in parallel (e.g. the shards of a run).
+
+    Counters and histogram buckets add up; the run spans the earliest
+    start to the latest end; signing rates are recomputed over the summed
+    sign-stage time.
+    """
+    agents, stages = {}, {}
+    for d in docs:
+        for agent, counts in d["agents"].items():
+            merged = agents.setdefault(agent, {"pass": 0, "fail": 0, "skip": 0})
+            for status, n in counts.items():
+                merged[status] = merged.get(status, 0) + n
+        for name, h in d["stages"].items():
+            m = stages.setdefault(name, {"count": 0, "sum": 0.0, "buckets": dict.fromkeys(h["buckets"], 0)})
+            m["count"] += h["count"]
+            m["sum"] += h["sum"]
+            for bound, count in h["buckets"].items():
+                m["buckets"][bound] += count
+    started = min(d["started"] for d in docs)
+    ended = max(d["started"] + d["duration_seconds"] for d in docs)
+    signatures = sum(d["signing"]["signatures"] for d in docs)
+    signed_bytes = sum(d["signing"]["signed_bytes"] for d in docs)
+    sign_seconds = sum(d["signing"]["seconds"] for d in docs)
+    return {
+        "script": docs[0]["script"],
+        "started": started,
+        "duration_seconds": round(ended - started, 6),
+        "files": sum(d["files"] for d in docs),
+        "bytes": sum(d["bytes"] for d in docs),
+        "entries": sum(d["entries"] for d in docs),
+        "agents": dict(sorted(agents.items())),
+        "stages": {name: dict(h, sum=round(h["sum"], 6)) for name, h in sorted(stages.items())},
+        "signing": {
+            "signatures": signatures,
+            "signed_bytes": signed_bytes,
+            "seconds": round(sign_seconds, 6),
+            "signatures_per_second": round(signatures / sign_seconds, 3) if sign_seconds else 0.0,
+            "bytes_per_second": round(signed_bytes / sign_seconds, 1) if sign_seconds else 0.0,
+        },
+    }
+
+
+def _cumulative(counts):
+    total, out = 0, []
+    for c in counts:
+        total += c
+        out.append(total)
+    return out
+
+
+def _fmt_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def enable(script, total_files=0, total_bytes=0, progress_interval=0):
+    """Start collecting metrics for this run and observe vac_profile stages."""
+    global _active
+    _active = RunMetrics(script, total_files, total_bytes, progress_interval)
+    profiling.observe(_active.observe_stage)
+    return _active
+
+
+def active():
+    """The enabled RunMetrics, or None."""
+    return _active
+
+
+def file_done(agent, status, nbytes=0, entries=0):
+    if _active is not None:
+        _active.file_done(agent, status, nbytes, entries)
+
+
+def signed(nbytes):
+    if _active is not None:
+        _active.signed(nbytes)
+
+
+def add_arguments(parser):
+    """Add the shared --metrics / --progress options to an argparse parser."""
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Write run metrics at exit: Prometheus textfile if PATH ends in .prom, JSON otherwise",
+    )
+    parser.add_argument(
+        "--progress",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Print progress and ETA to stderr at most every SECONDS (default: off)",
+    )
@@ -0,0 +1,259 @@
+"""
+Sidecar offset index (.idx) for random access and time-range slicing.
+
+parse_indexed(agent, path) parses a session exactly as PARSERS[agent] does
+and also records, for each native source object (a JSONL line, or one of
+OpenCode's concatenated objects), its byte offset and length, the types of
+the entries it maps to, the first entry timestamp and the call-ids it
+carries. write_index stores that next to the session as `<file>.idx`, or
+as `<name>.idx` in an index directory (for read-only archives):
+
+  line 1    header: {"vac-index": 1, "agent", "source-size",
+            "source-mtime-ns", "entries", "meta", "user-messages"}
+  line 2..  one row per source object:
+            [offset, length, first entry, [entry types], timestamp, [call-ids]]
+
+"first entry" numbers entries as the parser emits them without Codex
+dedup. extract_entries / extract_window seek to the rows they need, decode
+only those objects and map them with the parser's own per-object mapping,
+so the entries equal the matching slice of a full parse. The sub-record
+meta is the whole session's (from the header), which makes the result a
+valid record of the same session: wrap_record(*extract_entries(...)).
+
+Gemini sessions are one JSON document and are not indexed.
+"""
+
+import bisect
+import json
+import mmap
+import os
+from pathlib import Path
+
+from .parsers import (
+    _JSON_WS,
+    _claude_lines,
+    _codex_lines,
+    _cursor_lines,
+    _dedup_codex,
+    _infer_provider,
+    _merge_chunks,
+    _opencode_objects,
+    _opencode_roles,
+    _ts_seconds,
+)
+from .pipeline import atomic_write
+from .profiling import stage
+from .scan import _lines, _mapped, _meta
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+# Agent -> (cli name, initial provider) of the parser's meta
+_SESSION_META = {
+    "claude": ("claude-code", None),
+    "codex": ("codex-cli", "unknown"),
+    "cursor": ("cursor", "unknown"),
+    "opencode": ("opencode", "unknown"),
+}
+INDEXED_AGENTS = tuple(_SESSION_META)
+
+_JSONL_MAPPERS = {"claude": _claude_lines, "codex": _codex_lines, "cursor": _cursor_lines}
+
+# Row positions
+_OFFSET, _LENGTH, _FIRST, _TYPES, _TS, _CALLS = range(6)
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+
+def index_path(path, index_dir=None):
+    """Sidecar path of a session file: `<file>.idx`, or `<name>.idx` in index_dir."""
+    if index_dir is not None:
+        return Path(index_dir) / (Path(path).name + INDEX_SUFFIX)
+    return Path(str(path) + INDEX_SUFFIX)
+
+
+def _concatenated(data):
+    """Yield (object, byte offset, byte length) of concatenated JSON values,
+    stopping at the first undecodable position (as _load_concatenated)."""
+    text = data.decode("utf-8")
+    decoder = json.JSONDecoder()
+    pos, offset, end = 0, 0, len(text)
+    while True:
+        ws = _JSON_WS.match(text, pos).end()
+        offset += ws - pos  # JSON whitespace is ASCII
+        pos = ws
+        if pos >= end:
+            return
+        try:
+            obj, stop = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return
+        length = len(text[pos:stop].encode("utf-8"))
+        yield obj, offset, length
+        offset += length
+        pos = stop
+
+
+def _row(offset, length, first, entries):
+    ts = None
+    calls = []
+    for entry in entries:
+        if ts is None:
+            ts = entry.get("timestamp")
+        for e in (entry, *entry.get("children", ())):
+            call_id = e.get("call-id")
+            if call_id is not None and call_id not in calls:
+                calls.append(call_id)
+    return [offset, length, first, [entry["type"] for entry in entries], ts, calls]
+
+
+def _jsonl_indexed(mm, mapper, meta, entries, rows):
+    """Map each line on its own and fold its meta in; returns dedup candidates."""
+    candidates = []
+    for start, end in _lines(mm):
+        line_entries, chunk_meta = mapper([json.loads(mm[start:end])])
+        candidates.extend((len(entries) + idx, *rest) for idx, *rest in chunk_meta.pop("candidates", ()))
+        _merge_chunks([((), chunk_meta)], meta)
+        rows.append(_row(start, end - start, len(entries), line_entries))
+        entries.extend(line_entries)
+    return candidates
+
+
+def parse_indexed(agent, path, dedup=False):
+    """Parse a session like PARSERS[agent](path) and build its offset index.
+
+    Returns (entries, meta, index); index is the sidecar content (see the
+    module docstring) with rows under "objects". dedup applies to Codex as
+    in parse_codex; the index still numbers the entries before dedup.
+    """
+    if agent not in _SESSION_META:
+        raise ValueError(f"{agent} sessions cannot be indexed (JSONL and OpenCode only)")
+    meta = _meta(*_SESSION_META[agent])
+    entries, rows, user_messages = [], [], []
+
+    if agent == "opencode":
+        with stage("read"):
+            data = Path(path).read_bytes()
+        with stage("decode"):
+            spans = list(_concatenated(data))
+        del data
+        roles = _opencode_roles(obj for obj, _, _ in spans)
+        user_messages = sorted(mid for mid, role in roles.items() if role == "user" and isinstance(mid, str))
+        for obj, offset, length in spans:
+            obj_entries = _opencode_objects((obj,), roles, meta)
+            rows.append(_row(offset, length, len(entries), obj_entries))
+            entries.extend(obj_entries)
+    else:
+        candidates = _mapped(path, _jsonl_indexed, _JSONL_MAPPERS[agent], meta, entries, rows)
+        if agent == "claude":
+            meta["provider"] = _infer_provider(meta["model_id"])
+
+    st = os.stat(path)
+    header_meta = dict(meta, models=sorted(meta["models"]))
+    index = {
+        "vac-index": INDEX_VERSION,
+        "agent": agent,
+        "source-size": st.st_size,
+        "source-mtime-ns": st.st_mtime_ns,
+        "entries": len(entries),
+        "meta": header_meta,
+        "user-messages": user_messages,
+        "objects": rows,
+    }
+    if dedup and agent == "codex":
+        entries, meta["dedup"] = _dedup_codex(entries, candidates)
+    return entries, meta, index
+
+
+def write_index(index, path, index_dir=None):
+    """Write the index to its sidecar (see index_path) atomically; returns the sidecar path."""
+    out = index_path(path, index_dir)
+    header = {k: v for k, v in index.items() if k != "objects"}
+    lines = [json.dumps(header, ensure_ascii=False)]
+    lines.extend(json.dumps(row, ensure_ascii=False, separators=(",", ":")) for row in index["objects"])
+    atomic_write(out, ("\n".join(lines) + "\n").encode("utf-8"))
+    return out
+
+
+def build_index(agent, path):
+    """Parse a session and return its index; write_index stores it."""
+    return parse_indexed(agent, path)[2]
+
+
+def load_index(path, index_dir=None):
+    """Read the sidecar of a session file (see index_path).
+
+    Raises FileNotFoundError when there is none and ValueError when it is
+    from another index version or the session changed since (size/mtime).
+    """
+    sidecar = index_path(path, index_dir)
+    with open(sidecar, encoding="utf-8") as f:
+        index = json.loads(f.readline())
+        if index.get("vac-index") != INDEX_VERSION:
+            raise ValueError(f"{sidecar}: unsupported index version {index.get('vac-index')!r}")
+        st = os.stat(path)
+        if (index["source-size"], index["source-mtime-ns"]) != (st.st_size, st.st_mtime_ns):
+            raise ValueError(f"{sidecar}: stale, {Path(path).name} changed since it was indexed")
+        index["objects"] = [json.loads(line) for line in f]
+    return index
+
+
+# ---------------------------------------------------------------------------
+# Extraction
+# ---------------------------------------------------------------------------
+
+
+def _session_meta(index):
+    return dict(index["meta"], models=set(index["meta"]["models"]))
+
+
+def _map_rows(path, index, rows):
+    """Seek to and decode the source objects of rows; map them to entries."""
+    if not rows:
+        return []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, stage("decode"):
+        objects = [json.loads(mm[row[_OFFSET] : row[_OFFSET] + row[_LENGTH]]) for row in rows]
+    agent = index["agent"]
+    if agent == "opencode":
+        roles = dict.fromkeys(index["user-messages"], "user")
+        return _opencode_objects(objects, roles, _meta(*_SESSION_META[agent]))
+    return _JSONL_MAPPERS[agent](objects)[0]
+
+
+def extract_entries(path, index, start=0, stop=None):
+    """Entries [start, stop) of a session (parser order, no dedup) and the
+    session meta, decoding only the source objects that hold them."""
+    total = index["entries"]
+    start, stop, _ = slice(start, stop).indices(total)
+    if start >= stop:
+        return [], _session_meta(index)
+    rows = index["objects"]
+    firsts = [row[_FIRST] for row in rows]
+    lo = bisect.bisect_right(firsts, start) - 1
+    hi = bisect.bisect_left(firsts, stop)
+    entries = _map_rows(path, index, rows[lo:hi])
+    base = rows[lo][_FIRST]
+    return entries[start - base : stop - base], _session_meta(index)
+
+
+def extract_window(path, index, since=None, until=None):
+    """Entries of the source objects timestamped within [since, until]
+    (epoch seconds, either open) and the session meta.
+
+    An object without a timestamp of its own (OpenCode text and reasoning
+    parts, Codex session_meta) takes the last timestamp before it; objects
+    before the first timestamp are never in a window.
+    """
+    selected = []
+    current = None
+    for row in index["objects"]:
+        if row[_TS] is not None:
+            current = _ts_seconds(row[_TS])
+        if current is None:
+            continue
+        if (since is None or current >= since) and (until is None or current <= until):
+            selected.append(row)
+    return _map_rows(path, index, selected), _session_meta(index)
@@ -0,0 +1,622 @@
+"""
+Native session-format parsers.
+
+Each parser reads one native session file (Claude Code, Gemini CLI, Codex
+CLI, OpenCode, Cursor) and returns (entries, meta) with minimal mapping;
+see the field mapping table in scripts/validate-sessions.py. The per-object
+mapping is declared in vac.specs and compiled by vac.mapping; this module
+keeps the readers and Codex dedup. PARSERS maps the agent name (session
+filename prefix) to its parser.
+
+Every parser takes workers=N. The JSONL formats (Claude, Codex, Cursor) are
+mapped line by line in chunks, so a large file can be split at newline
+boundaries and parsed in N processes; the single-document formats (Gemini,
+OpenCode) ignore it.
+"""
+
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import re
+
+from .mapping import compile_spec
+from .profiling import stage
+from .specs import CLAUDE, CODEX, CURSOR, GEMINI, OPENCODE
+
+# Max timestamp distance (seconds) between a Codex event_msg and the
+# response_item it duplicates. user_message trails its response_item by ~1ms.
+DEDUP_WINDOW_SECONDS = 1.0
+
+# Target chunk size for parallel JSONL parsing (parse_*(path, workers=N))
+PARSE_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Read size for the incremental JSON reader (iter_gemini)
+STREAM_BLOCK_CHARS = 64 * 1024
+
+_JSON_WS = re.compile(r"[ \t\n\r]*")
+_JSON_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _content_to_str(content):
+    """Flatten content field (string, list of parts, etc.) to a string.
+    Handles arbitrarily nested structures (e.g. Claude tool_result content
+    where 'content' is itself a list of dicts)."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for c in content:
+            if isinstance(c, dict):
+                inner = c.get("text", c.get("content", ""))
+                parts.append(_content_to_str(inner))
+            else:
+                parts.append(str(c))
+        return "\n".join(parts)
+    if isinstance(content, dict):
+        return _content_to_str(content.get("text", content.get("content", str(content))))
+    return str(content)
+
+
+def _load_jsonl(path):
+    """Read a JSONL file into a list of objects (profiled as read + decode)."""
+    with stage("read"), open(path) as f:
+        text = f.read()
+    with stage("decode"):
+        return [json.loads(line) for line in text.split("\n") if line.strip()]
+
+
+def _load_concatenated(path):
+    """Read concatenated (pretty-printed) JSON objects, stopping at the first
+    undecodable position (profiled as read + decode)."""
+    with stage("read"), open(path) as f:
+        content = f.read()
+    with stage("decode"):
+        # Decode in place from an offset: slicing the remainder per object is quadratic
+        decoder = json.JSONDecoder()
+        objects, pos, end = [], 0, len(content)
+        while True:
+            pos = _JSON_WS.match(content, pos).end()
+            if pos >= end:
+                break
+            try:
+                obj, pos = decoder.raw_decode(content, pos)
+            except json.JSONDecodeError:
+                break
+            objects.append(obj)
+    return objects
+
+
+class _JsonStream:
+    """Incremental reader that decodes one JSON value at a time from a text file.
+
+    Only the unconsumed tail of the file plus one read block is held, so
+    memory is bounded by the largest single value, not the document.
+    """
+
+    def __init__(self, f, block=STREAM_BLOCK_CHARS):
+        self.f = f
+        self.block = block
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, n):
+        """Drop the consumed prefix and read at least n more characters."""
+        if self.pos:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        chunk = self.f.read(max(n, self.block))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self):
+        """Skip whitespace; return the next character ("" at end of file)."""
+        while True:
+            self.pos = _JSON_WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.block):
+                return ""
+
+    def next(self):
+        """Consume and return the next non-whitespace character."""
+        c = self.peek()
+        self.pos += 1
+        return c
+
+    def expect(self, c):
+        if self.peek() != c:
+            raise json.JSONDecodeError(f"Expecting {c!r}", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value, reading more input until it is complete."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Grow geometrically so a large value is re-scanned O(log n) times
+                if not self._fill(len(self.buf) - self.pos):
+                    raise
+                continue
+            # A number cut off by the buffer end ("-1." of "-1.5e10") decodes as a shorter one
+            if (
+                type(obj) in (int, float)
+                and _JSON_NUMBER_TAIL.match(self.buf, end).end() == len(self.buf)
+                and self._fill(self.block)
+            ):
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_gemini_messages(path, header):
+    """Stream the messages of a Gemini CLI session file one at a time.
+
+    Top-level members other than "messages" are stored into header as they
+    are read; Gemini writes sessionId/startTime before the messages array.
+    """
+    with open(path) as f:
+        js = _JsonStream(f)
+        js.expect("{")
+        if js.peek() == "}":
+            return
+        while True:
+            key = js.value()
+            js.expect(":")
+            if key == "messages" and js.peek() == "[":
+                js.next()
+                if js.peek() == "]":
+                    js.next()
+                else:
+                    while True:
+                        yield js.value()
+                        c = js.next()
+                        if c == "]":
+                            break
+                        if c != ",":
+                            raise json.JSONDecodeError("Expecting ',' or ']'", js.buf, js.pos - 1)
+            else:
+                header[key] = js.value()
+            if js.next() == "}":
+                return
+            js.pos -= 1
+            js.expect(",")
+
+
+# ---------------------------------------------------------------------------
+# Chunked JSONL parsing: per-chunk mappers, parallel driver, ordered merge
+# ---------------------------------------------------------------------------
+
+
+def _jsonl_spans(path, chunk_bytes):
+    """Split a file into (start, end) byte spans that end on newline boundaries."""
+    spans = []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return spans
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                nl = mm.find(b"\n", min(size, start + chunk_bytes) - 1)
+                end = size if nl < 0 else nl + 1
+                spans.append((start, end))
+                start = end
+    return spans
+
+
+def _map_span(mapper, path, start, end):
+    """Worker: decode the lines of one span and run the per-chunk mapper."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode("utf-8")
+    return mapper([json.loads(line) for line in text.split("\n") if line.strip()])
+
+
+def _map_jsonl(path, mapper, workers=1):
+    """Run mapper over a JSONL file; returns [(entries, chunk meta)] in file order.
+
+    With workers > 1 and a file larger than PARSE_CHUNK_BYTES, the file is
+    memory-mapped, split at newline boundaries and the chunks are decoded and
+    mapped in a process pool. Each worker maps its own span of the file, so
+    only results cross the process boundary.
+    """
+    size = os.path.getsize(path)
+    if workers <= 1 or size <= PARSE_CHUNK_BYTES:
+        return [mapper(_load_jsonl(path))]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # At least one chunk per worker, so a file just over the threshold still spreads
+    spans = _jsonl_spans(path, min(PARSE_CHUNK_BYTES, -(-size // workers)))
+    with stage("decode"), ProcessPoolExecutor(max_workers=min(workers, len(spans))) as pool:
+        futures = [pool.submit(_map_span, mapper, str(path), start, end) for start, end in spans]
+        return [f.result() for f in futures]
+
+
+def _merge_chunks(chunks, meta):
+    """Concatenate chunk entries in file order and fold chunk metas into meta.
+
+    A chunk meta holds only the keys its lines assigned. "start" keeps the
+    first value, "models" is unioned, "turn_model" (Codex turn_context) is
+    applied only while model_id is still unknown, and any other key keeps
+    the last value assigned.
+    """
+    entries = []
+    for chunk_entries, chunk_meta in chunks:
+        entries.extend(chunk_entries)
+        for key, value in chunk_meta.items():
+            if key == "start":
+                if not meta["start"]:
+                    meta["start"] = value
+            elif key == "models":
+                meta["models"] |= value
+            elif key == "turn_model":
+                if meta["model_id"] == "unknown":
+                    meta["model_id"] = value
+                    meta["models"].add(value)
+            else:
+                meta[key] = value
+    return entries
+
+
+def _infer_provider(model_id):
+    """Infer provider from model ID prefix."""
+    if not model_id or model_id == "unknown":
+        return "unknown"
+    if model_id.startswith("claude"):
+        return "anthropic"
+    if model_id.startswith("gemini"):
+        return "google"
+    if model_id.startswith(("gpt", "o3", "o4")):
+        return "openai"
+    return "unknown"
+
+
+# ---------------------------------------------------------------------------
+# Per-object mappings, compiled once from the specs in vac.specs
+# ---------------------------------------------------------------------------
+
+_map_claude = compile_spec(CLAUDE, "_map_claude", __name__)
+_map_gemini = compile_spec(GEMINI, "_map_gemini", __name__)
+_map_codex = compile_spec(CODEX, "_map_codex", __name__)
+_map_opencode = compile_spec(OPENCODE, "_map_opencode", __name__)
+_map_cursor = compile_spec(CURSOR, "_map_cursor", __name__)
+
+
+# ---------------------------------------------------------------------------
+# Parsers: read native format, yield (entries, metadata) with minimal mapping
+# ---------------------------------------------------------------------------
+
+
+def parse_claude(path, workers=1):
+    """Claude Code: JSONL, one event per line.
+
+    Each JSONL line maps to ONE entry. Assistant and user messages that contain
+    multiple content blocks (tool_use, tool_result, thinking) produce a single
+    parent entry with typed children.
+
+    Content is passed through as-is (string or array of blocks).
+    Model extracted from: message.model on assistant lines.
+    Provider inferred from: claude- prefix on model ID.
+    Token-usage extracted from: message.usage on assistant lines.
+    Native fields preserved: line-level + message-level (no-drop policy).
+
+    With workers > 1, large files are parsed in parallel chunks (see _map_jsonl).
+    """
+    meta = {
+        "session_id": None,
+        "model_id": "unknown",
+        "provider": None,
+        "cli": "claude-code",
+        "cli_version": None,
+        "start": None,
+        "cwd": None,
+        "branch": None,
+        "models": set(),
+    }
+    entries = _merge_chunks(_map_jsonl(path, _claude_lines, workers), meta)
+    meta["provider"] = _infer_provider(meta["model_id"])
+    return entries, meta
+
+
+def _claude_lines(lines):
+    """Map decoded Claude Code lines to (entries, chunk meta); see parse_claude."""
+    meta = {"models": set()}  # only keys assigned by these lines; see _merge_chunks
+    return _map_claude(lines, meta), meta
+
+
+def parse_gemini(path, workers=1):
+    """Gemini CLI: single JSON object with messages array (see iter_gemini).
+
+    Each message maps to ONE entry. Gemini-type messages that contain toolCalls
+    or thoughts produce a single assistant entry with typed children.
+
+    Content is passed through as-is (already a string in Gemini).
+    Model extracted from: messages[].model on gemini-type messages.
+    Provider inferred from: gemini- prefix.
+    Token-usage extracted from: messages[].tokens on assistant messages.
+    Native fields preserved: message-level + toolCall-level (no-drop policy).
+    """
+    meta, stream = iter_gemini(path)
+    with stage("decode"):
+        entries = list(stream)
+    return entries, meta
+
+
+def iter_gemini(path):
+    """Streaming form of parse_gemini: returns (meta, entries iterator).
+
+    The file is read incrementally and each message is mapped and yielded as
+    soon as it is decoded, so memory stays flat regardless of session length.
+    meta["session_id"] and meta["start"] are set by the time the first entry
+    is yielded; model_id, models and provider are final once the iterator is
+    exhausted.
+    """
+    meta = {
+        "session_id": None,
+        "model_id": "unknown",
+        "provider": None,
+        "cli": "gemini-cli",
+        "cli_version": None,
+        "start": None,
+        "cwd": None,
+        "branch": None,
+        "models": set(),
+    }
+    return meta, _gemini_entries(path, meta)
+
+
+def _gemini_entries(path, meta):
+    """Map streamed Gemini messages to entries; see parse_gemini."""
+    header = {}
+    for msg in _iter_gemini_messages(path, header):
+        if meta["session_id"] is None:  # header members precede "messages"
+            meta["session_id"] = header.get("sessionId")
+            meta["start"] = header.get("startTime")
+        yield from _map_gemini((msg,), meta)
+
+    # Members written after "messages" (or an empty array) are known only now
+    meta["session_id"] = header.get("sessionId")
+    meta["start"] = header.get("startTime")
+    meta["provider"] = _infer_provider(meta["model_id"])
+
+
+def _ts_seconds(ts):
+    """Convert an RFC 3339 string or epoch-milliseconds number to epoch seconds."""
+    if isinstance(ts, (int, float)):
+        return ts / 1000
+    if isinstance(ts, str):
+        try:
+            return datetime.datetime.fromisoformat(ts).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def _fingerprint(text):
+    """Whitespace-normalized SHA-256 of a text, or None for empty text."""
+    normalized = " ".join(_content_to_str(text or "").split())
+    if not normalized:
+        return None
+    return hashlib.sha256(normalized.encode("utf-8")).digest()
+
+
+def _dedup_codex(entries, candidates):
+    """Drop event_msg entries that duplicate a response_item entry.
+
+    candidates: (entry index, origin, entry type, texts, timestamp) tuples,
+    recorded by parse_codex for every message/reasoning entry. An event_msg
+    entry is a duplicate when a response_item entry of the same type has a
+    text with the same fingerprint within DEDUP_WINDOW_SECONDS. A multi-part
+    reasoning summary contributes one fingerprint per part, because Codex
+    emits one agent_reasoning event per part. Each distinct text of a
+    response_item absorbs at most one event (a one-part summary equals the
+    joined content, and counts once).
+
+    Returns (kept entries, {entry type: collapsed count}).
+    """
+    canonical = {}
+    for _, origin, kind, texts, ts in candidates:
+        if origin != "response_item":
+            continue
+        t = _ts_seconds(ts)
+        for fp in {_fingerprint(text) for text in texts} - {None}:
+            canonical.setdefault((kind, fp), []).append(t)
+
+    drop = set()
+    collapsed = {}
+    for idx, origin, kind, texts, ts in candidates:
+        if origin != "event_msg":
+            continue
+        seen = canonical.get((kind, _fingerprint(texts[0])))
+        t = _ts_seconds(ts)
+        if not seen or t is None:
+            continue
+        for i, other in enumerate(seen):
+            if other is not None and abs(t - other) <= DEDUP_WINDOW_SECONDS:
+                del seen[i]
+                drop.add(idx)
+                collapsed[kind] = collapsed.get(kind, 0) + 1
+                break
+
+    return [e for i, e in enumerate(entries) if i not in drop], collapsed
+
+
+def parse_codex(path, dedup=False, workers=1):
+    """Codex CLI: JSONL with {timestamp, type, payload} envelope.
+
+    Envelope-level types: session_meta, response_item, event_msg, turn_context.
+    Tool calls, reasoning, etc. are nested INSIDE response_item at payload.type:
+      payload.type=message (has role) → user/assistant
+      payload.type=function_call → tool-call (arguments is a JSON string, not dict)
+      payload.type=function_call_output → tool-result
+      payload.type=reasoning → reasoning (has encrypted_content for encrypted reasoning)
+      payload.type=web_search_call → tool-call (name="web_search")
+      payload.type=custom_tool_call → tool-call
+      payload.type=custom_tool_call_output → tool-result
+
+    event_msg entries (NOTE: these duplicate response_item for reasoning/messages):
+      payload.type=agent_reasoning → reasoning (duplicates response_item reasoning)
+      payload.type=token_count → system-event (unique, no response_item equivalent)
+      payload.type=user_message → user (may duplicate response_item message)
+      payload.type=agent_message → assistant (may duplicate response_item message)
+
+    Model extracted from: payload.model in turn_context (not in session_meta).
+    Provider extracted from: payload.model_provider in session_meta.
+    Token-usage extracted from: event_msg/token_count payload info.
+    Native fields preserved: payload-level fields (no-drop policy).
+
+    With dedup=True, event_msg entries duplicating a response_item entry are
+    dropped (the response_item version is canonical) and meta["dedup"] holds
+    the collapsed count per entry type. Dedup runs on the merged entries, so
+    it sees duplicates across chunk boundaries when workers > 1.
+    """
+    meta = {
+        "session_id": None,
+        "model_id": "unknown",
+        "provider": "unknown",
+        "cli": "codex-cli",
+        "cli_version": None,
+        "start": None,
+        "cwd": None,
+        "branch": None,
+        "models": set(),
+    }
+    chunks = _map_jsonl(path, _codex_lines, workers)
+
+    # Chunk-local candidate indices -> indices into the merged entries
+    candidates = []
+    base = 0
+    for chunk_entries, chunk_meta in chunks:
+        candidates.extend((base + idx, *rest) for idx, *rest in chunk_meta.pop("candidates"))
+        base += len(chunk_entries)
+    entries = _merge_chunks(chunks, meta)
+
+    if dedup:
+        entries, meta["dedup"] = _dedup_codex(entries, candidates)
+
+    return entries, meta
+
+
+def _codex_lines(lines):
+    """Map decoded Codex lines to (entries, chunk meta); see parse_codex.
+
+    The chunk meta also carries "candidates": dedup fingerprint sources with
+    chunk-local entry indices (see _dedup_codex).
+    """
+    meta = {"models": set(), "candidates": []}  # only keys assigned by these lines; see _merge_chunks
+    return _map_codex(lines, meta), meta
+
+
+def parse_opencode(path, workers=1):
+    """OpenCode: concatenated pretty-printed JSON objects (not strict JSONL).
+
+    Entry types emitted: user, assistant (no content for message-level), tool-call,
+    tool-result, reasoning, system-event, patch.
+
+    Tool objects are unified: each "type":"tool" object contains BOTH the
+    invocation (state.input) and the result (state.output, state.status) in
+    a single object. The parser emits both a tool-call and a tool-result entry
+    from each tool object. Timestamps come from state.time.start/end.
+
+    Message-level role objects (role="user"/"assistant") are envelope markers
+    with no inline text. Content follows in child objects. These entries are
+    emitted without a content field.
+
+    Text parts (type="text") are attributed to user or assistant by looking
+    up their messageID against message-level role objects. Role messages
+    appear AFTER their child parts in the file, so a two-pass approach is
+    used: first collect all role messages, then process parts.
+
+    Model extracted from: modelID on assistant message objects.
+    Provider extracted from: providerID on assistant message objects.
+    Multi-model: collects all modelID values seen.
+    Token-usage extracted from: role-message tokens/cost fields.
+    Native fields preserved: object-level fields (no-drop policy).
+    """
+    objects = _load_concatenated(path)
+
+    meta = {
+        "session_id": None,
+        "model_id": "unknown",
+        "provider": "unknown",
+        "cli": "opencode",
+        "cli_version": None,
+        "start": None,
+        "cwd": None,
+        "branch": None,
+        "models": set(),
+    }
+
+    # First pass: collect message-level role objects so we can attribute
+    # text parts to the correct role (user vs assistant).  Role messages
+    # appear AFTER their child parts in the file, so a lookahead is needed.
+    message_roles = _opencode_roles(objects)
+    return _opencode_objects(objects, message_roles, meta), meta
+
+
+def _opencode_roles(objects):
+    """Message id -> role of the message-level role objects; see parse_opencode."""
+    message_roles = {}
+    for obj in objects:
+        if isinstance(obj, dict) and "role" in obj and "type" not in obj:
+            message_roles[obj.get("id")] = obj.get("role")
+    return message_roles
+
+
+def _opencode_objects(objects, message_roles, meta):
+    """Map decoded OpenCode objects to entries, updating meta in place; see parse_opencode.
+
+    Objects are mapped one at a time, so mapping a file's objects one call
+    each (vac.offsets) gives the same entries and meta as a single call.
+    """
+    return _map_opencode(objects, meta, message_roles)
+
+
+def parse_cursor(path, workers=1):
+    """Cursor: bare JSONL {role, message}. No timestamps, no session ID,
+    no entry IDs, no model identification.
+
+    NOTE: Cursor's export format contains zero metadata. This is a known
+    limitation — the format stores only role and text content. Session ID
+    is generated by the record wrapper. Model/provider are "unknown".
+    """
+    meta = {
+        "session_id": None,
+        "model_id": "unknown",
+        "provider": "unknown",
+        "cli": "cursor",
+        "cli_version": None,
+        "start": None,
+        "cwd": None,
+        "branch": None,
+        "models": set(),
+    }
+    return _merge_chunks(_map_jsonl(path, _cursor_lines, workers), meta), meta
+
+
+def _cursor_lines(lines):
+    """Map decoded Cursor lines to (entries, chunk meta); see parse_cursor."""
+    return _map_cursor(lines, {}), {}
+
+
+PARSERS = {
+    "claude": parse_claude,
+    "gemini": parse_gemini,
+    "codex": parse_codex,
+    "opencode": parse_opencode,
+    "cursor": parse_cursor,
+}
@@ -0,0 +1,156 @@
+"""
+Single-file ingest pipeline: parse -> wrap_record -> CDDL validate -> sign.
+
+A Pipeline holds everything that is expensive to set up (parsers, resolved
+schema path, parsed signing key, the pycose/cbor2 imports) so long-running
+callers such as scripts/ingest-daemon.py pay for it once. Outputs are
+written atomically: each lands under a temporary name in the output
+directory and is renamed into place, so readers never see partial files.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from . import metrics
+from .attribution import build_attribution
+from .blobs import DEFAULT_BLOB_THRESHOLD, externalize_blobs
+from .parsers import PARSERS
+from .profiling import stage
+from .record import validate, wrap_record, write_record_json
+from .signing import DEFAULT_CONTENT_HASH_ALG, canonical_json, load_signing_key, sign_payload
+
+
+def atomic_write(path, data):
+    """Write bytes to path via a temp file in the same directory + os.replace."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class Pipeline:
+    """Warm parse/validate/sign state; see module docstring.
+
+    schema      CDDL schema path, or None to skip validation
+    key_pem     Ed25519 private key PEM, or None to skip signing
+    blob_dir    externalize large payloads into this blob store (optional)
+    parse_workers  processes per large JSONL file (see vac.parsers._map_jsonl)
+    hash_alg    content-hash-alg of signatures (see vac.signing.CONTENT_HASH_ALGS)
+    """
+
+    def __init__(
+        self,
+        out_dir,
+        schema=None,
+        key_pem=None,
+        blob_dir=None,
+        blob_threshold=DEFAULT_BLOB_THRESHOLD,
+        dedup=False,
+        parse_workers=1,
+        hash_alg=DEFAULT_CONTENT_HASH_ALG,
+    ):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.schema = Path(schema).resolve() if schema else None
+        if self.schema is not None and not self.schema.exists():
+            raise FileNotFoundError(f"Schema not found: {self.schema}")
+        self.key = load_signing_key(key_pem) if key_pem else None
+        self.blob_dir = blob_dir
+        self.blob_threshold = blob_threshold
+        self.dedup = dedup
+        self.parse_workers = parse_workers
+        self.hash_alg = hash_alg
+
+    def process(self, path, agent, consumers=()):
+        """Run one session file through the pipeline and write its outputs.
+
+        The record JSON is encoded once: the blocks go to the output file (also
+        the cddl input), a SHA-256 and any extra consumers (e.g. list.append to
+        keep the bytes). The canonical JSON is encoded once for hash and signature.
+
+        Returns a result dict: ok, error, session_id, entries, record
+        (output path), record_sha256, sig (output path or None), content_hash.
+        """
+        path = Path(path)
+        name = path.name
+        result = {
+            "ok": False,
+            "error": None,
+            "session_id": None,
+            "entries": 0,
+            "record": None,
+            "record_sha256": None,
+            "sig": None,
+            "content_hash": None,
+        }
+        parse_fn = PARSERS.get(agent)
+        if parse_fn is None:
+            result["error"] = f"no parser for agent {agent!r}"
+            return result
+
+        with stage("parse", name):
+            if self.dedup and agent == "codex":
+                entries, meta = parse_fn(path, dedup=True, workers=self.parse_workers)
+            else:
+                entries, meta = parse_fn(path, workers=self.parse_workers)
+        if not entries:
+            result["error"] = "no entries parsed"
+            return result
+        result["entries"] = len(entries)
+
+        # Before the blob store takes large tool inputs (Write contents) out
+        with stage("attribution", name):
+            attribution = build_attribution(entries, meta)
+
+        if self.blob_dir:
+            with stage("blobs", name):
+                externalize_blobs(entries, self.blob_dir, self.blob_threshold)
+
+        with stage("wrap_record", name):
+            record = wrap_record(entries, meta, attribution)
+        result["session_id"] = record["session"]["session-id"]
+
+        # The validated temp file becomes the output, so the record is written once
+        record_path = self.out_dir / f"{path.stem}.spec.json"
+        fd, tmp = tempfile.mkstemp(dir=self.out_dir, prefix=f".{record_path.name}.", suffix=".tmp")
+        try:
+            digest = hashlib.sha256()
+            with stage("serialize", name), os.fdopen(fd, "wb") as f:
+                write_record_json(record, f, digest.update, *consumers)
+            result["record_sha256"] = digest.hexdigest()
+            if self.schema is not None:
+                with stage("cddl", name):
+                    ok, output = validate(self.schema, tmp)
+                if not ok:
+                    result["error"] = f"CDDL validation failed: {output[:500]}"
+                    return result
+
+            # Drop any signature over a previous version before the record changes
+            (self.out_dir / f"{path.stem}.sig.cbor").unlink(missing_ok=True)
+            os.replace(tmp, record_path)
+            tmp = None
+        finally:
+            if tmp is not None:
+                os.unlink(tmp)
+
+        # Signature last: a .sig.cbor never exists without its record
+        sig_path = None
+        if self.key is not None:
+            with stage("sign", name):
+                with stage("canonicalize"):
+                    json_bytes = canonical_json(record)
+                metrics.signed(len(json_bytes))
+                sig_bytes, trace_meta = sign_payload(record, json_bytes, self.key, hash_alg=self.hash_alg)
+            result["content_hash"] = trace_meta["content-hash"]
+            sig_path = self.out_dir / f"{path.stem}.sig.cbor"
+            atomic_write(sig_path, sig_bytes)
+
+        result.update(ok=True, record=str(record_path), sig=str(sig_path) if sig_path else None)
+        return result
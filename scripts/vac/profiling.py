@@ -0,0 +1,198 @@
+"""
+Per-stage profiling for the VAC scripts (--profile).
+
+Each instrumented stage records wall time, CPU time and the tracemalloc peak
+reached while it ran, tagged with the file being processed. Records are
+emitted as JSON lines the moment a stage finishes (so hot spots show up in
+production logs) and summarized as a table at the end of the run.
+
+Stages nest: a stage opened inside another is reported as "outer.inner"
+(e.g. "parse.read", "parse.decode") and its time is included in the outer
+stage. Peaks are measured relative to traced memory at stage entry.
+
+Instrumented code calls the module-level stage(), which is a no-op until a
+Profiler is enabled or an observer (e.g. the vac.metrics histograms) is
+registered, so the hooks cost nothing on normal runs. Observers only get
+wall time and never turn on tracemalloc.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import sys
+import time
+
+_NULL = contextlib.nullcontext()
+_active = None
+_observers = []  # callables (stage name, file, wall seconds)
+_names = []  # stage name stack for observer-only timing
+
+
+class _Frame:
+    __slots__ = ("base", "file", "name", "peak")
+
+    def __init__(self, name, file, base):
+        self.name = name
+        self.file = file
+        self.base = base
+        self.peak = base
+
+
+class Profiler:
+    """Collects stage records; see module docstring."""
+
+    def __init__(self, out=None):
+        import tracemalloc  # imported on enable; unprofiled runs never load it
+
+        # out: text stream for JSON lines, a path to append them to (closed by close()), or None
+        self._owns_out = isinstance(out, (str, os.PathLike))
+        self.out = _open_jsonl(out) if self._owns_out else out
+        self.records = []
+        self._stack = []
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+
+    def close(self):
+        """Close the JSON lines file opened for a path target."""
+        if self._owns_out:
+            self.out.close()
+
+    @contextlib.contextmanager
+    def stage(self, name, file=None):
+        import tracemalloc
+
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None:
+            name = f"{parent.name}.{name}"
+            if file is None:
+                file = parent.file
+            # Fold the parent's peak so far in before resetting for the child
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        frame = _Frame(name, file, tracemalloc.get_traced_memory()[0])
+        self._stack.append(frame)
+        wall0 = time.perf_counter()
+        cpu0 = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall0
+            cpu = time.process_time() - cpu0
+            self._stack.pop()
+            peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+            if parent is not None:
+                parent.peak = max(parent.peak, peak)
+            self._record(name, file, wall, cpu, peak - frame.base)
+            for fn in _observers:
+                fn(name, file, wall)
+
+    def _record(self, name, file, wall, cpu, peak):
+        rec = {
+            "stage": name,
+            "file": file,
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": round(cpu * 1000, 3),
+            "peak_kb": round(max(peak, 0) / 1024, 1),
+        }
+        self.records.append(rec)
+        if self.out is not None:
+            self.out.write(json.dumps(rec) + "\n")
+            self.out.flush()
+
+    def summary(self, out=sys.stdout):
+        """Print per-stage totals, slowest first."""
+        stages = {}
+        for rec in self.records:
+            s = stages.setdefault(rec["stage"], {"n": 0, "wall": 0.0, "cpu": 0.0, "max": 0.0, "peak": 0.0})
+            s["n"] += 1
+            s["wall"] += rec["wall_ms"]
+            s["cpu"] += rec["cpu_ms"]
+            s["max"] = max(s["max"], rec["wall_ms"])
+            s["peak"] = max(s["peak"], rec["peak_kb"])
+
+        print(f"\n{'=' * 80}", file=out)
+        print("PROFILE (wall/cpu in ms, peak = max tracemalloc peak above stage entry)", file=out)
+        print(f"{'=' * 80}", file=out)
+        print(f"  {'stage':<28}{'count':>6}{'wall':>11}{'mean':>10}{'max':>10}{'cpu':>11}{'peak KB':>11}", file=out)
+        for name, s in sorted(stages.items(), key=lambda kv: -kv[1]["wall"]):
+            print(
+                f"  {name:<28}{s['n']:>6}{s['wall']:>11.1f}{s['wall'] / s['n']:>10.1f}"
+                f"{s['max']:>10.1f}{s['cpu']:>11.1f}{s['peak']:>11.1f}",
+                file=out,
+            )
+
+
+def _open_jsonl(path):
+    """Open a JSON lines file for appending; the Profiler that opened it closes it."""
+    return open(path, "a", encoding="utf-8")
+
+
+def enable(target="-"):
+    """Start profiling. target: "-" for stderr, a path for a JSON lines file, None for no JSON lines."""
+    global _active
+    _active = Profiler(sys.stderr if target == "-" else target)
+    atexit.register(_active.close)
+    return _active
+
+
+def disable():
+    """Stop the enabled Profiler (and tracemalloc, if it started it); returns it, or None."""
+    global _active
+    profiler, _active = _active, None
+    if profiler is not None:
+        import tracemalloc
+
+        if profiler._started:
+            tracemalloc.stop()
+        profiler.close()
+        atexit.unregister(profiler.close)
+    return profiler
+
+
+def active():
+    """The enabled Profiler, or None."""
+    return _active
+
+
+def observe(fn):
+    """Register fn(stage name, file, wall seconds), called as each stage ends."""
+    _observers.append(fn)
+
+
+@contextlib.contextmanager
+def _timed(name, file):
+    if _names:
+        name = f"{_names[-1]}.{name}"
+    _names.append(name)
+    wall0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall0
+        _names.pop()
+        for fn in _observers:
+            fn(name, file, wall)
+
+
+def stage(name, file=None):
+    """Context manager timing one stage (no-op unless profiling or observed)."""
+    if _active is not None:
+        return _active.stage(name, file)
+    if _observers:
+        return _timed(name, file)
+    return _NULL
+
+
+def add_argument(parser):
+    """Add the shared --profile option to an argparse parser."""
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="PATH",
+        help="Record wall/CPU time and tracemalloc peak per stage and file; JSON lines go to PATH "
+        "(default: stderr) and a summary table is printed at the end",
+    )
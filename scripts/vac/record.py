@@ -0,0 +1,179 @@
+"""
+Record wrapping, serialization and CDDL validation.
+"""
+
+import itertools
+import json
+import uuid
+
+from .entries import json_default
+
+# iterencode tokens joined per output block (~64 KiB of indent=2 JSON)
+_ENCODE_BATCH = 4096
+
+
+# ---------------------------------------------------------------------------
+# Wrap parsed entries into minimal verifiable-agent-record for CDDL validation
+# ---------------------------------------------------------------------------
+
+
+def wrap_record(entries, meta, attribution=True):
+    """Build the thinnest possible verifiable-agent-record around parsed entries.
+
+    attribution: True derives the record's file-attribution from the
+    entries' file-writing tool calls (see vac.attribution; an entries
+    iterator is not consumed for it); a file-attribution-record built
+    earlier, e.g. before externalize_blobs replaced large tool inputs, is
+    used as is; None or False leaves it out.
+    """
+    if attribution is True:
+        from .attribution import build_attribution  # loads vac.scan and the parsers
+
+        attribution = build_attribution(entries, meta) if isinstance(entries, list) else None
+    session_id = meta["session_id"] or str(uuid.uuid4())
+
+    agent_meta = {
+        "model-id": meta["model_id"],
+        "model-provider": meta["provider"],
+    }
+    models = sorted(meta.get("models", set()))
+    if len(models) > 1:
+        agent_meta["models"] = models
+    if meta.get("cli"):
+        agent_meta["cli-name"] = meta["cli"]
+    if meta.get("cli_version"):
+        agent_meta["cli-version"] = meta["cli_version"]
+
+    record = {
+        "version": "3.0.0-draft",
+        "id": session_id,
+        "recording-agent": {
+            "name": "vac-validate",
+            "version": "3.0.0-draft",
+        },
+        "session": {
+            "format": "interactive",
+            "session-id": session_id,
+            "agent-meta": agent_meta,
+            "entries": entries,
+        },
+    }
+    if meta.get("start") is not None:
+        record["created"] = meta["start"]
+        record["session"]["session-start"] = meta["start"]
+    if meta.get("cwd"):
+        record["session"]["environment"] = {"working-dir": meta["cwd"]}
+    if attribution:
+        record["file-attribution"] = attribution
+    return record
+
+
+# ---------------------------------------------------------------------------
+# Serialization: encode once, fan the bytes out to every consumer
+# ---------------------------------------------------------------------------
+
+
+def encode_record_json(record):
+    """Yield the record as indent=2 JSON in UTF-8 blocks.
+
+    The bytes are those of json.dumps(record, indent=2, default=json_default),
+    without holding the whole document as one string.
+    """
+    tokens = json.JSONEncoder(indent=2, default=json_default).iterencode(record)
+    while True:
+        block = "".join(itertools.islice(tokens, _ENCODE_BATCH))
+        if not block:
+            return
+        yield block.encode("utf-8")
+
+
+def write_record_json(record, f, *consumers):
+    """Encode the record once into binary file f, passing every block to each
+    consumer as well (e.g. hashlib's update, list.append). Returns the byte count."""
+    size = 0
+    for block in encode_record_json(record):
+        f.write(block)
+        for consume in consumers:
+            consume(block)
+        size += len(block)
+    return size
+
+
+def _cbor_head(major, n):
+    """Initial byte(s) of a CBOR data item: major type plus shortest-form argument."""
+    mt = major << 5
+    if n < 24:
+        return bytes((mt | n,))
+    for info, width in ((24, 1), (25, 2), (26, 4), (27, 8)):
+        if n < 1 << (8 * width):
+            return bytes((mt | info,)) + n.to_bytes(width, "big")
+    raise ValueError(f"CBOR argument too large: {n}")
+
+
+def write_record_cbor(record, f):
+    """Stream a record as deterministic CBOR into binary file f; returns bytes written.
+
+    Map keys are sorted length-first (cbor2's canonical order, equal to RFC 8949
+    bytewise order for text keys) and floats take their shortest exact form.
+    The header members are encoded as they come up in key order, but the
+    entries array is written one entry at a time, so memory holds one
+    encoded entry rather than the whole record. f only needs write(), so a
+    socket.makefile("wb") works too.
+
+    With entries as a list the output equals cbor2.dumps(record, canonical=True).
+    An entries iterator (e.g. from iter_gemini) is written as an indefinite-length
+    array, because its count is unknown up front.
+    """
+    import io
+
+    import cbor2
+
+    from .entries import cbor_default
+
+    encoder = cbor2.CBOREncoder(io.BytesIO(), canonical=True, default=cbor_default)
+    encode = encoder.encode_to_bytes
+    size = 0
+
+    def emit(data):
+        nonlocal size
+        f.write(data)
+        size += len(data)
+
+    def emit_map(mapping, streamed_key, emit_streamed):
+        emit(_cbor_head(5, len(mapping)))
+        keys = [(encode(k), k) for k in mapping]
+        for encoded_key, key in sorted(keys, key=lambda item: (len(item[0]), item[0])):
+            emit(encoded_key)
+            if key == streamed_key:
+                emit_streamed(mapping[key])
+            else:
+                emit(encode(mapping[key]))
+
+    def emit_entries(entries):
+        counted = hasattr(entries, "__len__")
+        emit(_cbor_head(4, len(entries)) if counted else b"\x9f")
+        for entry in entries:
+            emit(encode(entry))
+        if not counted:
+            emit(b"\xff")
+
+    emit_map(record, "session", lambda session: emit_map(session, "entries", emit_entries))
+    return size
+
+
+# ---------------------------------------------------------------------------
+# CDDL validation
+# ---------------------------------------------------------------------------
+
+
+def validate(schema_path, json_path):
+    import subprocess  # only validating callers pay for it
+
+    result = subprocess.run(
+        ["cddl", str(schema_path), "validate", str(json_path)],
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=False,
+    )
+    return result.returncode == 0, (result.stdout + result.stderr).strip()
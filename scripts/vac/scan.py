@@ -0,0 +1,425 @@
+"""
+Metadata-only session scans for catalogs.
+
+scan_<agent>(path) returns (meta, counts): the meta dict the matching
+parser would return (session id, cli name/version, model set, provider,
+start, cwd, branch) and a Counter of the entry types it would emit,
+children included. No entries are built, and content is not decoded
+wherever the native layout allows:
+
+  claude    per line, only the fields before "message" and the message head
+            (role, model) are decoded; tool_use / thinking / tool_result
+            blocks are counted from the raw line
+  codex     each line's envelope head ({"timestamp", "type", "payload":
+            {"type", "role"}}) classifies it; only session_meta and the
+            turn_context lines that can still set the model are decoded
+  cursor    the leading "role" of each line
+  gemini    the indent=2 layout: message keys sit at indent 6, toolCalls /
+            thoughts items at 8, a tool call's "result" at 10
+  opencode  the indent=2 layout: object keys sit at indent 2, state / time /
+            model members at 4; text parts are attributed to their role
+            after the scan, as in parse_opencode
+
+Files are memory-mapped and matched with bytes regexes, so string bodies
+are skipped by the regex engine instead of being decoded. Any line or file
+that does not have the expected layout falls back to the parser's own
+mapping for that line (or the whole file for Gemini / OpenCode), so
+results match a full parse.
+
+With counts=False the counts come back empty and a scan stops as soon as
+the meta is final: Codex after session_meta plus the model (from
+turn_context when session_meta has none), Cursor immediately (its format
+carries no metadata). Claude, Gemini and OpenCode keep the last model
+seen, so they are always read to the end.
+"""
+
+import json
+import mmap
+import re
+from collections import Counter
+
+from .parsers import (
+    _claude_lines,
+    _codex_lines,
+    _cursor_lines,
+    _infer_provider,
+    _merge_chunks,
+    iter_gemini,
+    parse_opencode,
+)
+
+_NONBLANK_RE = re.compile(rb"\S")
+
+_CLAUDE_MESSAGE = b'"message":{'
+_CLAUDE_CONTENT = b'"content":'
+_CLAUDE_ROLE_RE = re.compile(rb'"role":"(\w+)"')
+_CLAUDE_MODEL_RE = re.compile(rb'"model":"((?:[^"\\]|\\.)*)"')
+_CLAUDE_BLOCK_RE = re.compile(rb'"type":"(tool_use|thinking|tool_result)"')
+_CLAUDE_CHILDREN = {
+    "assistant": {b"tool_use": "tool-call", b"thinking": "reasoning"},
+    "user": {b"tool_result": "tool-result"},
+}
+
+_CODEX_HEAD_RE = re.compile(
+    rb'\{"timestamp":"([^"\\]*)","type":"(\w+)"'
+    rb'(?:,"payload":\{"type":"(\w+)"(?:,"role":"(\w+)")?)?'
+)
+_CODEX_TYPES = {
+    (b"response_item", b"function_call"): "tool-call",
+    (b"response_item", b"web_search_call"): "tool-call",
+    (b"response_item", b"custom_tool_call"): "tool-call",
+    (b"response_item", b"function_call_output"): "tool-result",
+    (b"response_item", b"custom_tool_call_output"): "tool-result",
+    (b"response_item", b"reasoning"): "reasoning",
+    (b"event_msg", b"agent_reasoning"): "reasoning",
+    (b"event_msg", b"token_count"): "system-event",
+    (b"event_msg", b"user_message"): "user",
+    (b"event_msg", b"agent_message"): "assistant",
+}
+_CODEX_ROLES = {b"user": "user", b"developer": "user", b"assistant": "assistant"}
+
+_CURSOR_HEAD_RE = re.compile(rb'\{"role":"(\w+)"')
+
+# Pretty-printed layouts: key lines by indentation; the value's first byte only
+_GEMINI_RE = re.compile(
+    rb'\n(?:  "([^"\\]*)": (\S)|    (\{)|      "([^"\\]*)": (\S)|        (\{)|          "result": (\S))'
+)
+# OpenCode: top-level starts, the depth-1 keys parse_opencode reads (plain strings
+# captured whole), object-valued depth-1 keys, and the depth-2 members it reads
+_OPENCODE_RE = re.compile(
+    rb"\n(?:([{\[])"
+    rb'|  "(type|role|id|messageID|sessionID|modelID|providerID|worktree|secret|url)": (?:"([^"\\\n]*)"|(\S))'
+    rb'|  "([^"\\]*)": \{'
+    rb'|    "(created|status|modelID|providerID)": (?:"([^"\\\n]*)"|(\S))'
+    rb'|    "output": (\S))'
+)
+
+
+def _meta(cli, provider):
+    return {
+        "session_id": None,
+        "model_id": "unknown",
+        "provider": provider,
+        "cli": cli,
+        "cli_version": None,
+        "start": None,
+        "cwd": None,
+        "branch": None,
+        "models": set(),
+    }
+
+
+def _tally(entries, counts):
+    for entry in entries:
+        counts[entry["type"]] += 1
+        for child in entry.get("children", ()):
+            counts[child["type"]] += 1
+
+
+def _fold(mapper, line, meta, counts):
+    """Map one decoded line with the parser's own mapper and fold the result in."""
+    entries, chunk_meta = mapper([line])
+    chunk_meta.pop("candidates", None)
+    _merge_chunks([((), chunk_meta)], meta)
+    _tally(entries, counts)
+
+
+def _lines(mm):
+    """Yield (start, end) of each non-blank line of a mapped file."""
+    pos, size = 0, len(mm)
+    while pos < size:
+        end = mm.find(b"\n", pos)
+        if end < 0:
+            end = size
+        if _NONBLANK_RE.search(mm, pos, end):
+            yield pos, end
+        pos = end + 1
+
+
+def _value(mm, pos):
+    """Decode the scalar JSON value starting at pos and ending its line."""
+    end = mm.find(b"\n", pos)
+    return json.loads(mm[pos : end if end >= 0 else len(mm)].rstrip(b", \r"))
+
+
+def _mapped(path, scan, *args):
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return scan(b"", *args)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return scan(mm, *args)
+
+
+# ---------------------------------------------------------------------------
+# JSONL formats
+# ---------------------------------------------------------------------------
+
+
+def scan_claude(path, counts=True):
+    """Claude Code meta and entry-type counts; see parse_claude and the module docstring."""
+    meta = _meta("claude-code", None)
+    tally = Counter()
+    _mapped(path, _scan_claude, meta, tally)
+    meta["provider"] = _infer_provider(meta["model_id"])
+    return meta, tally if counts else Counter()
+
+
+def _scan_claude(mm, meta, tally):
+    for start, end in _lines(mm):
+        i = mm.find(_CLAUDE_MESSAGE, start, end)
+        j = mm.find(_CLAUDE_CONTENT, i, end) if i >= 0 else -1
+        head = msg_head = role = None
+        if i >= 0 and j >= 0 and meta["start"]:
+            try:
+                head = json.loads(mm[start:i].rstrip(b", ") + b"}")
+            except ValueError:
+                head = None
+            msg_head = mm[i + len(_CLAUDE_MESSAGE) : j]
+            role = _CLAUDE_ROLE_RE.search(msg_head)
+        if not isinstance(head, dict) or "sessionId" not in head or "version" not in head or role is None:
+            _fold(_claude_lines, json.loads(mm[start:end]), meta, tally)
+            continue
+
+        for key, field in (
+            ("sessionId", "session_id"),
+            ("version", "cli_version"),
+            ("cwd", "cwd"),
+            ("gitBranch", "branch"),
+        ):
+            if head.get(key):
+                meta[field] = head[key]
+        role = role.group(1).decode()
+        model = _CLAUDE_MODEL_RE.search(msg_head)
+        if model:
+            model = json.loads(b'"' + model.group(1) + b'"')
+            if model:
+                meta["model_id"] = model
+                meta["models"].add(model)
+        children = _CLAUDE_CHILDREN.get(role)
+        if children is None:
+            continue
+        tally[role] += 1
+        for block in _CLAUDE_BLOCK_RE.findall(mm, j, end):
+            if block in children:
+                tally[children[block]] += 1
+
+
+def scan_codex(path, counts=True):
+    """Codex CLI meta and entry-type counts (without dedup); see parse_codex."""
+    meta = _meta("codex-cli", "unknown")
+    tally = Counter()
+    _mapped(path, _scan_codex, meta, tally, counts)
+    return meta, tally if counts else Counter()
+
+
+def _scan_codex(mm, meta, tally, counts):
+    seen_session = False
+    for start, end in _lines(mm):
+        m = _CODEX_HEAD_RE.match(mm, start, end)
+        ltype = m and m.group(2)
+        if m and not meta["start"] and m.group(1):
+            meta["start"] = m.group(1).decode()
+        if ltype in (b"response_item", b"event_msg") and m.group(3) and (m.group(3) != b"message" or m.group(4)):
+            ptype = m.group(3)
+            if ptype == b"message":
+                kind = _CODEX_ROLES.get(m.group(4)) if ltype == b"response_item" else None
+            else:
+                kind = _CODEX_TYPES.get((ltype, ptype))
+            if kind:
+                tally[kind] += 1
+        elif m and ltype not in (b"session_meta", b"turn_context", b"response_item", b"event_msg"):
+            pass  # no entry, only the timestamp
+        elif ltype == b"turn_context" and meta["model_id"] != "unknown":
+            pass  # only the first model-bearing turn_context counts
+        else:
+            seen_session = seen_session or ltype == b"session_meta"
+            _fold(_codex_lines, json.loads(mm[start:end]), meta, tally)
+        if not counts and seen_session and meta["model_id"] != "unknown":
+            return
+
+
+def scan_cursor(path, counts=True):
+    """Cursor entry counts (the format has no metadata); see parse_cursor."""
+    meta = _meta("cursor", "unknown")
+    tally = Counter()
+    if counts:
+        _mapped(path, _scan_cursor, tally)
+    return meta, tally if counts else Counter()
+
+
+def _scan_cursor(mm, tally):
+    for start, end in _lines(mm):
+        m = _CURSOR_HEAD_RE.match(mm, start, end)
+        if m is None:
+            _tally(_cursor_lines([json.loads(mm[start:end])])[0], tally)
+        else:
+            tally["user" if m.group(1) == b"user" else "assistant"] += 1
+
+
+# ---------------------------------------------------------------------------
+# Pretty-printed formats
+# ---------------------------------------------------------------------------
+
+
+def scan_gemini(path, counts=True):
+    """Gemini CLI meta and entry-type counts; see parse_gemini."""
+    meta = _meta("gemini-cli", None)
+    tally = Counter()
+    if not _mapped(path, _scan_gemini, meta, tally):
+        stream_meta, stream = iter_gemini(path)
+        _tally(stream, tally)
+        meta.update(stream_meta)
+    else:
+        meta["provider"] = _infer_provider(meta["model_id"])
+    return meta, tally if counts else Counter()
+
+
+def _scan_gemini(mm, meta, tally):
+    """Layout scan; returns False (nothing counted) if mm is not indent=2 JSON."""
+    if mm[:5] != b'{\n  "':
+        return False
+    header = {}
+    in_messages = False
+    msg_type = None  # type of the open message, "" if it has none
+    children = Counter()
+    child_list = None  # "toolCalls" / "thoughts" while inside one
+
+    def close_message():
+        if msg_type is None:
+            return
+        if msg_type in ("user", "human"):
+            tally["user"] += 1
+        else:
+            tally["assistant"] += 1
+            tally.update(children)
+
+    for m in _GEMINI_RE.finditer(mm):
+        key, key6 = m.group(1), m.group(4)
+        if key is not None:
+            close_message()
+            msg_type, child_list = None, None
+            in_messages = key == b"messages" and m.group(2) == b"["
+            if not in_messages and key in (b"sessionId", b"startTime"):
+                header[key.decode()] = _value(mm, m.start(2))
+        elif not in_messages:
+            continue
+        elif m.group(3):
+            close_message()
+            msg_type, child_list = "user", None
+            children.clear()
+        elif key6 is not None:
+            child_list = key6 if key6 in (b"toolCalls", b"thoughts") and m.group(5) == b"[" else None
+            if key6 == b"type":
+                msg_type = _value(mm, m.start(5))
+            elif key6 == b"model":
+                model = _value(mm, m.start(5))
+                if model:
+                    meta["model_id"] = model
+                    meta["models"].add(model)
+        elif m.group(6):
+            if child_list == b"toolCalls":
+                children["tool-call"] += 1
+            elif child_list == b"thoughts":
+                children["reasoning"] += 1
+        elif child_list == b"toolCalls" and mm[m.start(7) : m.start(7) + 4] != b"null":
+            children["tool-result"] += 1
+    close_message()
+    meta["session_id"] = header.get("sessionId")
+    meta["start"] = header.get("startTime")
+    return True
+
+
+def scan_opencode(path, counts=True):
+    """OpenCode meta and entry-type counts; see parse_opencode."""
+    meta = _meta("opencode", "unknown")
+    tally = Counter()
+    if not _mapped(path, _scan_opencode, meta, tally):
+        entries, meta = parse_opencode(path)
+        tally.clear()
+        _tally(entries, tally)
+    return meta, tally if counts else Counter()
+
+
+def _scan_opencode(mm, meta, tally):
+    """Layout scan; returns False if mm is not indent=2 concatenated JSON."""
+    if mm[:5] != b'{\n  "':
+        return False
+    message_roles = {}
+    texts = Counter()  # messageID -> text parts, attributed once all roles are known
+    obj = None  # depth-1 key -> value (scalars decoded, objects as {member: value})
+
+    def close_object():
+        if obj is None:
+            return
+        if "worktree" in obj:
+            meta["cwd"] = obj["worktree"]
+            time_info = obj.get("time")
+            if isinstance(time_info, dict) and time_info.get("created"):
+                meta["start"] = time_info["created"]
+            return
+        if "secret" in obj and "url" in obj and "type" not in obj and "role" not in obj:
+            return
+        if obj.get("sessionID"):
+            meta["session_id"] = obj["sessionID"]
+        if "role" in obj and "type" not in obj:
+            message_roles[obj.get("id")] = obj["role"]
+            if obj.get("modelID"):
+                meta["model_id"] = obj["modelID"]
+                meta["models"].add(obj["modelID"])
+            if obj.get("providerID"):
+                meta["provider"] = obj["providerID"]
+            model_obj = obj.get("model")
+            if isinstance(model_obj, dict):
+                if model_obj.get("modelID"):
+                    meta["models"].add(model_obj["modelID"])
+                if model_obj.get("providerID") and meta["provider"] == "unknown":
+                    meta["provider"] = model_obj["providerID"]
+            tally["user" if obj["role"] == "user" else "assistant"] += 1
+            return
+        otype = obj.get("type")
+        if otype == "text":
+            texts[obj.get("messageID")] += 1
+        elif otype == "tool":
+            tally["tool-call"] += 1
+            state = obj.get("state")
+            if isinstance(state, dict) and (state.get("output") is not None or state.get("status")):
+                tally["tool-result"] += 1
+        elif otype == "patch":
+            tally["tool-result"] += 1
+        elif otype == "reasoning":
+            tally["reasoning"] += 1
+        elif otype in ("step-start", "step-finish"):
+            tally["system-event"] += 1
+
+    obj = {}
+    parent = {}  # members of the last object-valued depth-1 key
+    for m in _OPENCODE_RE.finditer(mm):
+        top, key, text, _, okey, member, mtext, _, _ = m.groups()
+        if top:
+            close_object()
+            obj = {} if top == b"{" else None
+            parent = {}
+        elif obj is None:
+            continue
+        elif key:
+            obj[key.decode()] = text.decode() if text is not None else _value(mm, m.start(4))
+        elif okey is not None:
+            parent = obj[okey.decode()] = {}
+        elif member:
+            parent[member.decode()] = mtext.decode() if mtext is not None else _value(mm, m.start(8))
+        else:  # only whether it is null matters; outputs can be huge
+            parent["output"] = None if mm[m.start(9) : m.start(9) + 4] == b"null" else True
+    close_object()
+
+    for message_id, n in texts.items():
+        tally["user" if message_roles.get(message_id, "assistant") == "user" else "assistant"] += n
+    return True
+
+
+SCANNERS = {
+    "claude": scan_claude,
+    "gemini": scan_gemini,
+    "codex": scan_codex,
+    "opencode": scan_opencode,
+    "cursor": scan_cursor,
+}
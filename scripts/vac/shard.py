@@ -0,0 +1,148 @@
+"""
+Deterministic sharding of a run across machines (--shard i/N) and merging
+of the shard results.
+
+Shard i of N owns the files whose key hashes to i:
+
+  shard_of(key, N) = int(first 8 bytes of SHA-256(key)) % N
+
+The key is the file's path relative to the directory being processed
+(--shard-key path, the default) or its session id (--shard-key
+session-id, read by the metadata-only scan of vac.scan; files without
+one, or that cannot be scanned, fall back to their path). Neither
+depends on the machine, mount point, Python version or PYTHONHASHSEED,
+so every node computes the same split and the N shards partition the
+files.
+
+A sharded run writes a results document (--results PATH, JSON):
+
+  {"vac-results": 1, "script", "shard": [i, N] | null, "shard-key",
+   "options", "detect": [lines], "agents": {agent: {"samples", "parser"}},
+   "files": [{"order", "agent", "file", "status", "lines", "report"}, ...],
+   "blobs", "metrics"}
+
+"order" is a file's position in the unsharded run, so merge_results can
+put the files of all shards back in that order; the script then prints
+the same report an unsharded run prints. Shard metrics are merged with
+vac.metrics.merge.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from . import metrics
+from .scan import SCANNERS
+
+RESULTS_VERSION = 1
+SHARD_KEYS = ("path", "session-id")
+
+
+def parse_shard(text):
+    """argparse type for --shard: "i/N" with 0 <= i < N -> (i, N)."""
+    index, sep, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {text!r}") from None
+    if not sep or count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"expected i/N with 0 <= i < N, got {text!r}")
+    return index, count
+
+
+def shard_of(key, count):
+    """Shard (0..count-1) of a key string."""
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big") % count
+
+
+def shard_key(path, root, agent=None, by="path"):
+    """Sharding key of a session file: its path relative to root, or its session id."""
+    if by == "session-id" and agent in SCANNERS:
+        try:
+            meta, _ = SCANNERS[agent](path, counts=False)
+        except (OSError, ValueError):
+            meta = {}  # unreadable: the run reports it, on whichever shard its path picks
+        if meta.get("session_id"):
+            return meta["session_id"]
+    return Path(path).relative_to(root).as_posix()
+
+
+def in_shard(shard, path, root, agent=None, by="path"):
+    """Whether shard (i, N), or None for an unsharded run, owns a session file."""
+    if shard is None:
+        return True
+    index, count = shard
+    return shard_of(shard_key(path, root, agent, by), count) == index
+
+
+def add_arguments(parser):
+    """Add the shared --shard / --shard-key options to an argparse parser."""
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="Process only the files of shard I of N (0 <= I < N), chosen by a stable hash of --shard-key",
+    )
+    parser.add_argument(
+        "--shard-key",
+        choices=SHARD_KEYS,
+        default="path",
+        help="Hash each file's path relative to the input directory, or its session id (default: path)",
+    )
+
+
+# ---------------------------------------------------------------------------
+# Results documents
+# ---------------------------------------------------------------------------
+
+
+def write_results(doc, path):
+    """Write a results document atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp{os.getpid()}")
+    tmp.write_text(json.dumps(doc, ensure_ascii=False, default=sorted) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_results(path):
+    """Read a results document; ValueError if it is not one."""
+    doc = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(doc, dict) or doc.get("vac-results") != RESULTS_VERSION:
+        raise ValueError(f"{path}: not a version {RESULTS_VERSION} results document")
+    return doc
+
+
+def merge_results(docs):
+    """Combine the results of shards 0..N-1 of one run into the unsharded run's results.
+
+    Raises ValueError unless the documents are one complete set of shards
+    of the same run (script, options, key, inputs).
+    """
+    if not docs:
+        raise ValueError("no results to merge")
+    first = docs[0]
+    if first["shard"] is None:
+        raise ValueError("results are from an unsharded run")
+    count = first["shard"][1]
+    seen = sorted(doc["shard"][0] for doc in docs if doc["shard"] is not None and doc["shard"][1] == count)
+    if seen != list(range(count)) or len(docs) != count:
+        raise ValueError(f"expected shards 0..{count - 1} of {count} exactly once, got {[d['shard'] for d in docs]}")
+    for doc in docs[1:]:
+        for field in ("script", "shard-key", "options", "detect", "agents"):
+            if doc[field] != first[field]:
+                raise ValueError(f"shard {doc['shard'][0]} differs from shard {first['shard'][0]} in {field!r}")
+
+    files = sorted((f for doc in docs for f in doc["files"]), key=lambda f: f["order"])
+    blobs = {k: sum(doc["blobs"][k] for doc in docs) for k in first["blobs"]}
+    shard_metrics = [doc["metrics"] for doc in docs if doc.get("metrics")]
+    return dict(
+        first,
+        shard=None,
+        files=files,
+        blobs=blobs,
+        metrics=metrics.merge(shard_metrics) if shard_metrics else None,
+    )
@@ -0,0 +1,290 @@
+"""
+COSE_Sign1 (RFC 9052) signing and verification for verifiable agent records.
+
+Signatures use Ed25519 with a detached payload: the canonical JSON record is
+signed, then the payload slot is replaced with null, matching the
+`signed-agent-record` type in agent-conversation.cddl Section 9. The
+protected header carries CWT_Claims; the unprotected header carries
+trace-metadata including the content hash and its algorithm
+(`content-hash-alg`, one of CONTENT_HASH_ALGS; verification dispatches on
+it and defaults to "sha-256" when it is absent).
+
+pycose, cbor2 and cryptography are imported inside the functions that use
+them (together ~150 ms), so importing this module is cheap.
+"""
+
+import base64
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+
+from . import metrics
+from .entries import json_default
+from .profiling import stage
+
+TRACE_METADATA_LABEL = 100  # Private-use label per CDDL Section 9
+CWT_CLAIMS_LABEL = 15  # COSE label for CWT_Claims in protected header
+CWT_ISS_LABEL = 1  # CWT issuer claim
+CWT_SUB_LABEL = 2  # CWT subject claim
+
+DEFAULT_CONTENT_HASH_ALG = "sha-256"
+
+# Leaf size of "sha-256-tree". It is part of the algorithm: changing it
+# changes every digest, so it needs a new algorithm name, not a new value.
+TREE_HASH_LEAF_BYTES = 1 << 20
+# Payloads at least this large have their leaves hashed in threads
+# (hashlib releases the GIL while hashing)
+TREE_HASH_PARALLEL_BYTES = 8 << 20
+
+
+# ---------------------------------------------------------------------------
+# Payload and header construction
+# ---------------------------------------------------------------------------
+
+
+def canonical_json(obj):
+    """Serialize to canonical JSON: compact, sorted keys, UTF-8."""
+    return json.dumps(obj, separators=(",", ":"), sort_keys=True, ensure_ascii=False, default=json_default).encode(
+        "utf-8"
+    )
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _leaf_digest(leaf):
+    h = hashlib.sha256(b"\x00")
+    h.update(leaf)
+    return h.digest()
+
+
+def sha256_tree_hex(data: bytes, workers=None) -> str:
+    """ "sha-256-tree": SHA-256(0x01 || L1 || ... || Ln), where Li is
+    SHA-256(0x00 || leaf i) over TREE_HASH_LEAF_BYTES leaves.
+
+    The digest does not depend on workers (default: all CPUs); leaves of
+    payloads of TREE_HASH_PARALLEL_BYTES or more are hashed in that many threads.
+    """
+    view = memoryview(data)
+    leaves = [view[i : i + TREE_HASH_LEAF_BYTES] for i in range(0, len(view), TREE_HASH_LEAF_BYTES)]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(view) >= TREE_HASH_PARALLEL_BYTES:
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(leaves))) as pool:
+            digests = list(pool.map(_leaf_digest, leaves))
+    else:
+        digests = map(_leaf_digest, leaves)
+    root = hashlib.sha256(b"\x01")
+    for digest in digests:
+        root.update(digest)
+    return root.hexdigest()
+
+
+# content-hash-alg name -> hex digest function over the canonical payload
+CONTENT_HASH_ALGS = {
+    "sha-256": sha256_hex,
+    "sha-384": lambda data: hashlib.sha384(data).hexdigest(),
+    "sha-512": lambda data: hashlib.sha512(data).hexdigest(),
+    "sha-256-tree": sha256_tree_hex,
+}
+
+
+def content_hash(data, alg=DEFAULT_CONTENT_HASH_ALG):
+    """Hex digest of data under a content-hash-alg name. Raises ValueError
+    for a name not in CONTENT_HASH_ALGS."""
+    fn = CONTENT_HASH_ALGS.get(alg)
+    if fn is None:
+        raise ValueError(f"Unsupported content-hash-alg {alg!r} (known: {', '.join(CONTENT_HASH_ALGS)})")
+    return fn(data)
+
+
+def extract_cwt_claims(record, issuer_override=None, subject_override=None):
+    """Build CWT_Claims map for the protected header.
+
+    Defaults: iss = model-provider (e.g. "anthropic"), sub = session-id.
+    """
+    session = record.get("session", {})
+    agent_meta = session.get("agent-meta", {})
+
+    iss = issuer_override or agent_meta.get("model-provider", "unknown")
+    sub = subject_override or session.get("session-id", record.get("id", "unknown"))
+
+    return {CWT_ISS_LABEL: iss, CWT_SUB_LABEL: sub}
+
+
+def extract_trace_metadata(record, json_bytes, hash_alg=DEFAULT_CONTENT_HASH_ALG):
+    """Build trace-metadata map from a verifiable-agent-record JSON object."""
+    session = record.get("session", {})
+    agent_meta = session.get("agent-meta", {})
+
+    meta = {
+        "session-id": session.get("session-id", record.get("id", "unknown")),
+        "agent-vendor": agent_meta.get("model-provider", "unknown"),
+        "trace-format": "ietf-vac-v3.0",
+        "content-hash": content_hash(json_bytes, hash_alg),
+        "content-hash-alg": hash_alg,
+    }
+
+    ts_start = session.get("session-start")
+    if ts_start is not None:
+        meta["timestamp-start"] = ts_start
+    else:
+        # Fallback to signing time — trace-metadata requires a valid abstract-timestamp
+        # (RFC 3339 or epoch number), and some agents (e.g. Cursor) lack timestamps entirely.
+        now_utc = datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+        meta["timestamp-start"] = record.get("created", now_utc)
+
+    ts_end = session.get("session-end")
+    if ts_end is not None:
+        meta["timestamp-end"] = ts_end
+
+    return meta
+
+
+# ---------------------------------------------------------------------------
+# Keys, signing and verification
+# ---------------------------------------------------------------------------
+
+
+# RFC 8410 DER prefixes: an Ed25519 PKCS#8 private key / SubjectPublicKeyInfo is
+# this fixed header followed by the 32 raw key bytes. Encoding them directly
+# avoids importing cryptography's serialization package (~50 ms) for keygen.
+_ED25519_PKCS8_PREFIX = bytes.fromhex("302e020100300506032b657004220420")
+_ED25519_SPKI_PREFIX = bytes.fromhex("302a300506032b6570032100")
+
+
+def _pem(label, der):
+    b64 = base64.b64encode(der).decode("ascii")
+    lines = [b64[i : i + 64] for i in range(0, len(b64), 64)]
+    return f"-----BEGIN {label}-----\n" + "\n".join(lines) + f"\n-----END {label}-----\n"
+
+
+def generate_keypair():
+    """Generate an Ed25519 keypair, return (private_pem, public_pem) as str."""
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    private_key = Ed25519PrivateKey.generate()
+    priv_pem = _pem("PRIVATE KEY", _ED25519_PKCS8_PREFIX + private_key.private_bytes_raw())
+    pub_pem = _pem("PUBLIC KEY", _ED25519_SPKI_PREFIX + private_key.public_key().public_bytes_raw())
+    return priv_pem, pub_pem
+
+
+def load_signing_key(priv_pem):
+    """Parse a private key PEM into a COSE key, for callers signing many records."""
+    from pycose.keys import OKPKey
+
+    return OKPKey.from_pem_private_key(priv_pem)
+
+
+def sign_payload(record, json_bytes, priv_pem, issuer=None, subject=None, hash_alg=DEFAULT_CONTENT_HASH_ALG):
+    """Sign canonical record bytes with COSE_Sign1 (detached payload).
+
+    priv_pem is a PEM string or a key from load_signing_key(); hash_alg
+    names the content hash (see CONTENT_HASH_ALGS).
+    Returns (detached CBOR bytes, trace-metadata map).
+    """
+    import cbor2
+    from pycose.algorithms import EdDSA
+    from pycose.headers import Algorithm, ContentType
+    from pycose.messages import Sign1Message
+
+    with stage("hash"):
+        trace_meta = extract_trace_metadata(record, json_bytes, hash_alg)
+    cwt_claims = extract_cwt_claims(record, issuer, subject)
+    if isinstance(priv_pem, (str, bytes)):
+        with stage("load_key"):
+            cose_key = load_signing_key(priv_pem)
+    else:
+        cose_key = priv_pem
+
+    msg = Sign1Message(
+        phdr={Algorithm: EdDSA, ContentType: "application/json", CWT_CLAIMS_LABEL: cwt_claims},
+        uhdr={TRACE_METADATA_LABEL: trace_meta},
+        payload=json_bytes,
+    )
+    msg.key = cose_key
+
+    # Encode (computes signature over the actual payload)
+    with stage("cose_sign"):
+        encoded = msg.encode()
+
+    # Manually replace payload with null for detached mode
+    # pycose doesn't properly null out the payload in CBOR output
+    with stage("detach"):
+        raw = cbor2.loads(encoded)
+        detached_cose = cbor2.CBORTag(18, [raw.value[0], raw.value[1], None, raw.value[3]])
+        return cbor2.dumps(detached_cose), trace_meta
+
+
+def sign_record(record, priv_pem, issuer=None, subject=None, hash_alg=DEFAULT_CONTENT_HASH_ALG):
+    """Canonicalize and sign a record. Returns detached COSE_Sign1 CBOR bytes."""
+    with stage("canonicalize"):
+        json_bytes = canonical_json(record)
+    metrics.signed(len(json_bytes))
+    return sign_payload(record, json_bytes, priv_pem, issuer, subject, hash_alg)[0]
+
+
+def verify_payload(sig_bytes, json_bytes, pub_pem):
+    """Verify a detached COSE_Sign1 signature over canonical record bytes.
+
+    Returns (ok, error message or None, decoded Sign1Message or None).
+    """
+    from pycose.keys import OKPKey
+    from pycose.messages import Sign1Message
+
+    with stage("load_key"):
+        cose_key = OKPKey.from_pem_public_key(pub_pem)
+
+    # Decode COSE_Sign1 and attach the detached payload
+    with stage("decode"):
+        decoded = Sign1Message.decode(sig_bytes)
+    decoded.key = cose_key
+    decoded.payload = json_bytes
+
+    try:
+        with stage("cose_verify"):
+            valid = decoded.verify_signature()
+    except Exception as e:
+        return False, f"Signature verification error: {e}", None
+
+    if not valid:
+        return False, "Signature is invalid", None
+
+    # Verify content hash if present, with the algorithm it names
+    trace_meta = decoded.uhdr.get(TRACE_METADATA_LABEL, {})
+    expected_hash = trace_meta.get("content-hash")
+    if expected_hash:
+        alg = trace_meta.get("content-hash-alg", DEFAULT_CONTENT_HASH_ALG)
+        if alg not in CONTENT_HASH_ALGS:
+            return False, f"Unsupported content-hash-alg: {alg}", None
+        with stage("hash"):
+            actual_hash = content_hash(json_bytes, alg)
+        if actual_hash != expected_hash:
+            return False, f"Content hash mismatch: expected {expected_hash}, got {actual_hash}", None
+
+    return True, None, decoded
+
+
+def verify_signature(sig_bytes, record, pub_pem):
+    """Verify a COSE_Sign1 signature against a record. Returns (ok, error_msg)."""
+    with stage("canonicalize"):
+        json_bytes = canonical_json(record)
+    ok, err, _ = verify_payload(sig_bytes, json_bytes, pub_pem)
+    return ok, err
+
+
+def validate_cbor(schema_path, cbor_bytes):
+    """Validate CBOR bytes against the CDDL schema. Returns (ok, output)."""
+    from .record import validate  # vac.record pulls in uuid (and platform); only validation needs it
+
+    with tempfile.NamedTemporaryFile(suffix=".cbor", delete=False) as f:
+        f.write(cbor_bytes)
+        tmp = f.name
+    try:
+        return validate(schema_path, tmp)
+    finally:
+        os.unlink(tmp)
@@ -0,0 +1,438 @@
+"""
+Mapping specs of the native session formats, compiled by vac.mapping.
+
+One spec per agent declares what the hand-written parsers used to do per
+object: the dispatch field, the native fields behind each entry field,
+the consumed keys (everything else is passed through as a native field),
+children, token-usage normalization and session meta. The field mapping
+table in scripts/validate-sessions.py summarizes them. vac.parsers
+compiles each spec once at import and keeps the readers (JSONL chunks,
+the Gemini stream, OpenCode's concatenated objects and role pre-pass)
+and Codex dedup.
+
+A new JSONL agent is a spec here plus a parse_<agent> in vac.parsers
+that runs it through _map_jsonl.
+"""
+
+# ---------------------------------------------------------------------------
+# Claude Code: one JSONL line per event; message.role selects the entry
+# ---------------------------------------------------------------------------
+
+_CLAUDE_LINE_CONSUMED = {
+    "timestamp",
+    "sessionId",
+    "version",
+    "cwd",
+    "gitBranch",
+    "uuid",
+    "type",
+    "message",
+    "parentUuid",
+}
+_CLAUDE_MSG_CONSUMED = {"role", "content", "model", "type", "id", "usage"}
+_CLAUDE_PASSTHROUGH = [("", _CLAUDE_LINE_CONSUMED), ("message", _CLAUDE_MSG_CONSUMED)]
+
+CLAUDE = {
+    "agent": "claude",
+    "binds": {"ts": "timestamp"},
+    "steps": [
+        {
+            "meta": [
+                ("start", "$ts", "first"),
+                ("session_id", "sessionId", "truthy"),
+                ("cli_version", "version", "truthy"),
+                ("cwd", "cwd", "truthy"),
+                ("branch", "gitBranch", "truthy"),
+            ]
+        },
+        {
+            "on": "type",
+            "rules": {
+                "queue-operation": {
+                    "entry": "system-event",
+                    "fields": {"timestamp": "$ts", "id": "uuid", "event-type": {"const": "queue-operation"}},
+                    "passthrough": [("", _CLAUDE_LINE_CONSUMED | {"operation"})],
+                }
+            },
+        },
+        # Lines with any role name the model, even roles that map to no entry
+        {"meta": [("model_id", "message.model", "model")], "when": {"truthy": "message.role"}},
+        {
+            "on": "message.role",
+            "rules": {
+                "user": {
+                    "entry": "user",
+                    "fields": {
+                        "timestamp": "$ts",
+                        "id": "uuid",
+                        "content": ("message.content", ""),
+                        "parent-id": "parentUuid",
+                    },
+                    "children": [
+                        {
+                            "path": "message.content",
+                            "on": "type",
+                            "rules": {
+                                "tool_result": {
+                                    "entry": "tool-result",
+                                    "fields": {
+                                        "call-id": "tool_use_id",
+                                        "output": ("content", ""),
+                                        "status": {"path": "is_error", "transform": "error-status"},
+                                    },
+                                }
+                            },
+                        }
+                    ],
+                    "passthrough": _CLAUDE_PASSTHROUGH,
+                },
+                "assistant": {
+                    "entry": "assistant",
+                    "fields": {
+                        "timestamp": "$ts",
+                        "id": "uuid",
+                        "content": ("message.content", ""),
+                        "model-id": "message.model",
+                        "parent-id": "parentUuid",
+                    },
+                    "token-usage": {
+                        "path": "message.usage",
+                        "map": {"input_tokens": "input", "output_tokens": "output", "cache_read_input_tokens": "cached"},
+                    },
+                    "children": [
+                        {
+                            "path": "message.content",
+                            "on": "type",
+                            "rules": {
+                                "tool_use": {
+                                    "entry": "tool-call",
+                                    "fields": {"name": ("name", "unknown"), "input": ("input", {}), "call-id": "id"},
+                                },
+                                "thinking": {"entry": "reasoning", "fields": {"content": ("thinking", "")}},
+                            },
+                        }
+                    ],
+                    "passthrough": _CLAUDE_PASSTHROUGH,
+                },
+            },
+        },
+    ],
+}
+
+
+# ---------------------------------------------------------------------------
+# Gemini CLI: messages of one JSON document (session header read by the parser)
+# ---------------------------------------------------------------------------
+
+# "tokens" is consumed only when it is a dict (mapped to token-usage)
+_GEMINI_PASSTHROUGH = [("", {"type", "timestamp", "content", "id", "model", "thoughts", "toolCalls"}, {"tokens"})]
+
+_GEMINI_USER = {
+    "entry": "user",
+    "fields": {"timestamp": "$ts", "content": ("content", ""), "id": "id"},
+    "passthrough": _GEMINI_PASSTHROUGH,
+}
+
+GEMINI = {
+    "agent": "gemini",
+    "binds": {"ts": "timestamp"},
+    "steps": [
+        {"meta": [("model_id", "model", "model")]},
+        {
+            "on": ("type", "user"),
+            "rules": {"user": _GEMINI_USER, "human": _GEMINI_USER},
+            "default": {
+                "entry": "assistant",
+                "fields": {"timestamp": "$ts", "content": ("content", ""), "id": "id", "model-id": "model"},
+                "token-usage": {"path": "tokens", "map": {"inputTokens": "input", "outputTokens": "output"}},
+                "children": [
+                    {
+                        "path": ("thoughts", []),
+                        "rule": {
+                            "entry": "reasoning",
+                            "fields": {"content": ("description", ""), "subject": "subject"},
+                            "passthrough": [("", {"description", "subject"})],
+                        },
+                    },
+                    {
+                        "path": ("toolCalls", []),
+                        "rule": [
+                            {
+                                "entry": "tool-call",
+                                "fields": {
+                                    "timestamp": ("timestamp", "$ts"),
+                                    "name": ("name", "unknown"),
+                                    "input": ("args", {}),
+                                    "call-id": "id",
+                                },
+                                "passthrough": [("", {"timestamp", "name", "args", "id", "result", "status"})],
+                            },
+                            {
+                                "when": {"not-none": "result"},
+                                "entry": "tool-result",
+                                "fields": {
+                                    "timestamp": ("timestamp", "$ts"),
+                                    "output": "result",
+                                    "status": "status",
+                                    "call-id": "id",
+                                },
+                            },
+                        ],
+                    },
+                ],
+                "passthrough": _GEMINI_PASSTHROUGH,
+            },
+        },
+    ],
+}
+
+
+# ---------------------------------------------------------------------------
+# Codex CLI: {timestamp, type, payload} lines; type, then payload.type
+# ---------------------------------------------------------------------------
+
+
+def _codex_message(entry, origin, field):
+    """A Codex user/assistant entry and its dedup candidate."""
+    return {
+        "entry": entry,
+        "fields": {"timestamp": "$ts", "content": field},
+        "passthrough": [("", {"type", "role", "content"} if origin == "response_item" else {"type", "message"})],
+        "dedup": {"origin": origin, "texts": ["content"], "time": "$ts"},
+    }
+
+
+def _codex_call(input_field, input_default):
+    return {
+        "entry": "tool-call",
+        "fields": {
+            "timestamp": "$ts",
+            "name": ("name", "unknown"),
+            "input": (input_field, input_default),
+            "call-id": "call_id",
+        },
+        "passthrough": [("", {"type", "name", input_field, "call_id"})],
+    }
+
+
+_CODEX_OUTPUT = {
+    "entry": "tool-result",
+    "fields": {"timestamp": "$ts", "output": ("output", ""), "call-id": "call_id"},
+    "passthrough": [("", {"type", "output", "call_id"})],
+}
+
+CODEX = {
+    "agent": "codex",
+    "binds": {"ts": "timestamp"},
+    "steps": [
+        {"meta": [("start", "$ts", "first")]},
+        {
+            "on": ("type", ""),
+            "rules": {
+                "session_meta": {
+                    "source": "payload",
+                    "meta": [
+                        ("session_id", "id", "set"),
+                        ("cli_version", "cli_version", "set"),
+                        ("cwd", "cwd", "set"),
+                        ("model_id", "model", "model"),
+                        ("provider", "model_provider", "truthy"),
+                        ("branch", "git.branch", "set"),
+                    ],
+                },
+                # The model lives here when session_meta has none; whether it
+                # still does depends on earlier chunks, so _merge_chunks decides
+                "turn_context": {"source": "payload", "meta": [("turn_model", "model", "first", "model_id")]},
+                "response_item": {
+                    "source": "payload",
+                    "on": ("type", ""),
+                    "rules": {
+                        "message": {
+                            "on": ("role", ""),
+                            "rules": {
+                                "user": _codex_message("user", "response_item", ("content", [])),
+                                "developer": _codex_message("user", "response_item", ("content", [])),
+                                "assistant": _codex_message("assistant", "response_item", ("content", [])),
+                            },
+                        },
+                        "function_call": _codex_call("arguments", {}),
+                        "function_call_output": _CODEX_OUTPUT,
+                        "reasoning": {
+                            "entry": "reasoning",
+                            "fields": {
+                                "timestamp": "$ts",
+                                "content": {"path": "summary", "transform": "join-text"},
+                                "encrypted": "encrypted_content",
+                            },
+                            "passthrough": [("", {"type", "summary", "encrypted_content"})],
+                            # One candidate text per summary part: Codex emits
+                            # one agent_reasoning event per part
+                            "dedup": {"origin": "response_item", "texts": ["*parts", "content"], "time": "$ts"},
+                        },
+                        "web_search_call": {
+                            "entry": "tool-call",
+                            "fields": {"timestamp": "$ts", "name": {"const": "web_search"}, "input": ("action", {})},
+                            "passthrough": [("", {"type", "action"})],
+                        },
+                        "custom_tool_call": _codex_call("input", ""),
+                        "custom_tool_call_output": _CODEX_OUTPUT,
+                    },
+                },
+                "event_msg": {
+                    "source": "payload",
+                    "on": ("type", ""),
+                    "rules": {
+                        "agent_reasoning": {
+                            "entry": "reasoning",
+                            "fields": {"timestamp": "$ts", "content": "text"},
+                            "passthrough": [("", {"type", "text"})],
+                            "dedup": {"origin": "event_msg", "texts": ["content"], "time": "$ts"},
+                        },
+                        "token_count": {
+                            "entry": "system-event",
+                            "fields": {"timestamp": "$ts", "event-type": {"const": "token-count"}},
+                            "token-usage": {
+                                "path": "info",
+                                "map": {"input_tokens": "input", "output_tokens": "output", "total_tokens": "total"},
+                            },
+                            "passthrough": [("", {"type", "info"})],
+                        },
+                        "user_message": _codex_message("user", "event_msg", "message"),
+                        "agent_message": _codex_message("assistant", "event_msg", "message"),
+                    },
+                },
+            },
+        },
+    ],
+}
+
+
+# ---------------------------------------------------------------------------
+# OpenCode: concatenated objects; context maps message id -> role
+# ---------------------------------------------------------------------------
+
+_OPENCODE_STEP = {
+    "entry": "system-event",
+    "fields": {"event-type": "type"},
+    "passthrough": [("", {"type"})],
+}
+
+OPENCODE = {
+    "agent": "opencode",
+    "steps": [
+        {
+            "has": ["worktree"],
+            "rule": {"meta": [("cwd", "worktree", "set"), ("start", "time.created", "truthy")]},
+        },
+        # Share-info objects hold secrets and nothing else
+        {"has": ["secret", "url"], "lacks": ["type", "role"], "rule": None},
+        {"meta": [("session_id", "sessionID", "truthy")]},
+        # Message-level role objects: envelope markers without inline content
+        {
+            "has": ["role"],
+            "lacks": ["type"],
+            "rule": {
+                "meta": [
+                    ("model_id", "modelID", "model"),
+                    ("provider", "providerID", "truthy"),
+                    ("models", "model.modelID", "add"),
+                    ("provider", "model.providerID", "if-unknown"),
+                ],
+                "entry": {"path": "role", "map": {"user": "user"}, "default": "assistant"},
+                "fields": {"timestamp": "time.created", "parent-id": "parentID"},
+                "token-usage": {
+                    "path": "tokens",
+                    "map": {"input": "input", "output": "output"},
+                    "extra": {"cost": "cost"},
+                },
+                "passthrough": [
+                    (
+                        "",
+                        {
+                            "role",
+                            "modelID",
+                            "providerID",
+                            "model",
+                            "time",
+                            "id",
+                            "sessionID",
+                            "tokens",
+                            "cost",
+                            "parentID",
+                        },
+                    )
+                ],
+            },
+        },
+        {
+            "on": "type",
+            "rules": {
+                # Text parts belong to the role of their message (context)
+                "text": {
+                    "entry": {"context": "messageID", "map": {"user": "user"}, "default": "assistant"},
+                    "fields": {"content": ("text", ""), "id": "id"},
+                    "passthrough": [("", {"type", "text", "id", "messageID"})],
+                },
+                # One object holds the call and its result
+                "tool": [
+                    {
+                        "entry": "tool-call",
+                        "fields": {
+                            "timestamp": {"path": "state.time.start", "transform": "truthy"},
+                            "name": ("tool", "unknown"),
+                            "input": ("state.input", {}),
+                            "id": "id",
+                            "call-id": "callID",
+                        },
+                        "passthrough": [
+                            ("state", {"input", "output", "status", "time"}),
+                            ("", {"type", "tool", "callID", "state", "id", "sessionID", "messageID"}),
+                        ],
+                    },
+                    {
+                        "when": {"any": [{"not-none": "state.output"}, {"truthy": "state.status"}]},
+                        "entry": "tool-result",
+                        "fields": {
+                            "timestamp": {"path": "state.time.end", "transform": "truthy"},
+                            "output": {"path": "state.output", "or": ""},
+                            "status": "state.status",
+                            "call-id": "callID",
+                            "metadata": {"path": "state.metadata", "transform": "truthy"},
+                        },
+                    },
+                ],
+                "patch": {
+                    "entry": "tool-result",
+                    "fields": {"id": "id", "output": ("diff", ""), "status": {"const": "success"}},
+                    "passthrough": [("", {"type", "diff", "id"})],
+                },
+                "reasoning": {
+                    "entry": "reasoning",
+                    "fields": {"content": "text", "id": "id"},
+                    "passthrough": [("", {"type", "text", "id"})],
+                },
+                "step-start": _OPENCODE_STEP,
+                "step-finish": _OPENCODE_STEP,
+            },
+        },
+    ],
+}
+
+
+# ---------------------------------------------------------------------------
+# Cursor: bare {role, message} lines
+# ---------------------------------------------------------------------------
+
+CURSOR = {
+    "agent": "cursor",
+    "steps": [
+        {
+            "on": ("role", "user"),
+            "rules": {"user": {"entry": "user", "fields": {"content": ("message.content", [])}}},
+            "default": {"entry": "assistant", "fields": {"content": ("message.content", [])}},
+        }
+    ],
+}
+
+
+SPECS = {"claude": CLAUDE, "gemini": GEMINI, "codex": CODEX, "opencode": OPENCODE, "cursor": CURSOR}
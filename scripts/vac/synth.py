@@ -0,0 +1,561 @@
+"""
+Synthetic session generator for load and scale testing.
+
+learn() reads sample sessions of one native format and builds a
+SessionModel from them:
+
+  kinds      each native record (JSONL line, Gemini message, OpenCode
+             object) is classified, e.g. codex "response_item:function_call",
+             claude "assistant:tool_use", opencode "reasoning" / "role:assistant"
+  chain      first-order Markov chain over kinds, counted in sample order
+  templates  the sample records themselves, grouped by kind
+
+generate() walks the chain with a seeded random.Random and streams records
+to a binary file until a byte size or record count is reached, so memory
+stays flat at any output size. Each record is a copy of a template of its
+kind in which:
+
+  - strings of SYNTH_MIN_CHARS or more become slices of a seeded word pool
+    (length x text_scale, or x reasoning_scale in reasoning records);
+    JSON held in strings (Codex function_call arguments) stays JSON
+  - ids, parent links, call-id pairs, the session id and timestamps are
+    rewritten consistently: OpenCode parts carry the open message id and
+    the role object that closes the message follows them, as in the
+    native files; tool results answer the oldest open call
+  - the model moves round-robin through `models` every `switch_every`
+    records (default: the most common model in the samples)
+
+tool_weight / reasoning_weight scale the chain's transitions into tool-call
+and reasoning kinds. The same samples, seed and options give byte-identical
+output (Gemini's header lastUpdated is patched in only when f is seekable).
+"""
+
+import datetime
+import json
+import random
+import re
+import uuid
+from collections import Counter
+
+from .parsers import _infer_provider, _load_concatenated, _load_jsonl
+
+# Template strings at least this long are replaced with synthetic text
+SYNTH_MIN_CHARS = 64
+
+_POOL_CHARS = 1 << 20
+_POOL_MAX_WORDS = 200_000
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_.\-/]{0,24}")
+
+# Sessions start here (plus a seeded offset); records advance 20 ms - 4 s
+_EPOCH_MS = 1767225600000  # 2026-01-01T00:00:00Z
+_STEP_MS = (20, 4000)
+
+_LAYOUT = {
+    "claude": "jsonl",
+    "codex": "jsonl",
+    "cursor": "jsonl",
+    "gemini": "document",
+    "opencode": "concatenated",
+}
+
+# Where each format keeps the model id (key paths, set only where present)
+_MODEL_PATHS = {
+    "claude": [("message", "model")],
+    "codex": [("payload", "model"), ("payload", "collaboration_mode", "settings", "model")],
+    "gemini": [("model",)],
+    "opencode": [("modelID",), ("model", "modelID")],
+    "cursor": [],
+}
+
+_TOOL_MARKERS = ("tool", "function_call")
+_RESULT_MARKERS = ("result", "output")
+_REASONING_MARKERS = ("reasoning", "thought", "thinking")
+
+
+# ---------------------------------------------------------------------------
+# Record kinds
+# ---------------------------------------------------------------------------
+
+
+def _kind_claude(obj):
+    msg = obj.get("message")
+    if not isinstance(msg, dict):
+        return obj.get("type", "?")
+    content = msg.get("content")
+    if isinstance(content, str):
+        return f"{obj.get('type')}:str"
+    return f"{obj.get('type')}:" + ",".join(sorted({c.get("type", "?") for c in content if isinstance(c, dict)}))
+
+
+def _kind_codex(obj):
+    payload = obj.get("payload", {})
+    kind = f"{obj.get('type')}:{payload.get('type')}"
+    return f"{kind}:{payload['role']}" if "role" in payload else kind
+
+
+def _kind_cursor(obj):
+    return obj.get("role", "user")
+
+
+def _kind_gemini(obj):
+    kind = obj.get("type", "?")
+    if obj.get("toolCalls"):
+        kind += ":tools"
+    return kind + ":thoughts" if obj.get("thoughts") else kind
+
+
+def _kind_opencode(obj):
+    if not isinstance(obj, dict):
+        return "list"
+    if "worktree" in obj:
+        return "project"
+    if "secret" in obj:
+        return "share"
+    if "type" in obj:
+        return obj["type"]
+    if "role" in obj:
+        return f"role:{obj['role']}"
+    return "session"
+
+
+_KINDS = {
+    "claude": _kind_claude,
+    "codex": _kind_codex,
+    "cursor": _kind_cursor,
+    "gemini": _kind_gemini,
+    "opencode": _kind_opencode,
+}
+
+
+def _records(agent, path):
+    """Native records of one sample file, plus the Gemini header (else None)."""
+    if agent == "opencode":
+        return _load_concatenated(path), None
+    if agent == "gemini":
+        with open(path) as f:
+            doc = json.load(f)
+        messages = doc.pop("messages", [])
+        return messages, doc
+    return _load_jsonl(path), None
+
+
+# ---------------------------------------------------------------------------
+# Learned model
+# ---------------------------------------------------------------------------
+
+
+class SessionModel:
+    """Kinds, Markov chain and templates learned from one format's samples."""
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.starts = Counter()  # first kind of each sample
+        self.chain = {}  # kind -> Counter(next kind)
+        self.body = Counter()  # every kind reached by a transition (dead-end fallback)
+        self.templates = {}  # kind -> [record]
+        self.header = None  # Gemini document header
+        self.models = Counter()
+        self.words = []
+        self.samples = 0
+
+    def add(self, records, header=None):
+        kind_of = _KINDS[self.agent]
+        prev = None
+        for obj in records:
+            kind = kind_of(obj)
+            self.templates.setdefault(kind, []).append(obj)
+            if prev is None:
+                self.starts[kind] += 1
+            else:
+                self.chain.setdefault(prev, Counter())[kind] += 1
+                self.body[kind] += 1
+            prev = kind
+            for path in _MODEL_PATHS[self.agent]:
+                value = _get_path(obj, path)
+                if isinstance(value, str) and value and not value.startswith("<"):
+                    self.models[value] += 1
+            if len(self.words) < _POOL_MAX_WORDS:
+                _collect_words(obj, self.words)
+        if header is not None and self.header is None:
+            self.header = header
+        self.samples += 1
+
+    def kinds(self):
+        return sorted(self.templates)
+
+    def default_models(self):
+        return [self.models.most_common(1)[0][0]] if self.models else []
+
+
+def learn(agent, paths):
+    """Build a SessionModel for agent ("claude", "codex", ...) from sample files."""
+    if agent not in _KINDS:
+        raise ValueError(f"unknown agent {agent!r}")
+    model = SessionModel(agent)
+    for path in sorted(paths):
+        records, header = _records(agent, path)
+        if records:
+            model.add(records, header)
+    if not model.samples:
+        raise ValueError(f"no {agent} samples to learn from")
+    return model
+
+
+def _get_path(obj, path):
+    for key in path:
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(key)
+    return obj
+
+
+def _set_path(obj, path, value):
+    """Set obj[path] only if the whole path already exists."""
+    for key in path[:-1]:
+        obj = obj.get(key) if isinstance(obj, dict) else None
+    if isinstance(obj, dict) and path[-1] in obj:
+        obj[path[-1]] = value
+
+
+def _collect_words(obj, words):
+    if isinstance(obj, str):
+        if len(obj) >= SYNTH_MIN_CHARS:
+            words.extend(_WORD_RE.findall(obj))
+    elif isinstance(obj, dict):
+        for v in obj.values():
+            _collect_words(v, words)
+    elif isinstance(obj, list):
+        for v in obj:
+            _collect_words(v, words)
+
+
+# ---------------------------------------------------------------------------
+# Generation
+# ---------------------------------------------------------------------------
+
+
+class _Synth:
+    """Per-run state: rng, clock, id chains, word pool."""
+
+    def __init__(self, model, rng, text_scale, reasoning_scale, models, switch_every):
+        self.model = model
+        self.rng = rng
+        self.text_scale = text_scale
+        self.reasoning_scale = reasoning_scale
+        self.models = list(models) if models else model.default_models()
+        self.switch_every = switch_every
+        self.model_id = self.models[0] if self.models else None
+        self.clock = _EPOCH_MS + rng.randrange(180 * 86400 * 1000)
+        self.start = self.clock
+        self.open_calls = []  # call ids awaiting a result, oldest first
+        self.prev_uuid = None  # Claude parentUuid chain
+        # OpenCode: the open message, the last user message, the project
+        self.message_id = self.opencode_id("msg_")
+        self.user_message_id = None
+        self.project_id = self.hex(40)
+        self.session_id = self.opencode_id("ses_") if model.agent == "opencode" else str(self.uuid())
+        words = model.words or ["lorem", "ipsum", "dolor", "sit", "amet"]
+        chunks = []
+        size = 0
+        while size < _POOL_CHARS:
+            line = " ".join(rng.choices(words, k=12))
+            chunks.append(line)
+            size += len(line) + 1
+        self.pool = "\n".join(chunks)
+
+    # -- values ---------------------------------------------------------------
+
+    def uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def hex(self, n):
+        return f"{self.rng.getrandbits(4 * n):0{n}x}"
+
+    def base62(self, n):
+        return "".join(self.rng.choices("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz", k=n))
+
+    def opencode_id(self, prefix):
+        return prefix + self.hex(12) + self.base62(14)
+
+    def tick(self):
+        self.clock += self.rng.randint(*_STEP_MS)
+        return self.clock
+
+    def iso(self, ms=None):
+        ms = self.clock if ms is None else ms
+        dt = datetime.datetime.fromtimestamp(ms / 1000, tz=datetime.UTC)
+        return dt.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ms % 1000:03d}Z"
+
+    def text(self, n):
+        pool = self.pool
+        if n <= len(pool):
+            off = self.rng.randrange(len(pool) - n + 1)
+            return pool[off : off + n]
+        parts = [pool] * (n // len(pool))
+        return "".join(parts) + pool[: n - len(pool) * len(parts)]
+
+    def open_call(self, call_id):
+        self.open_calls.append(call_id)
+        return call_id
+
+    def close_call(self, make):
+        return self.open_calls.pop(0) if self.open_calls else make()
+
+    def clone(self, obj, scale):
+        """Deep copy with long strings replaced by pool text (see module docstring)."""
+        if isinstance(obj, str):
+            if len(obj) < SYNTH_MIN_CHARS:
+                return obj
+            if obj[0] in "{[" and obj[-1] in "}]":
+                try:
+                    return json.dumps(self.clone(json.loads(obj), scale), ensure_ascii=False)
+                except ValueError:
+                    pass
+            return self.text(max(1, round(len(obj) * scale)))
+        if isinstance(obj, dict):
+            return {k: self.clone(v, scale) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [self.clone(v, scale) for v in obj]
+        return obj
+
+    # -- chain ----------------------------------------------------------------
+
+    def next_kind(self, kind, tool_weight, reasoning_weight):
+        counts = self.model.chain.get(kind) or self.model.body or self.model.starts
+        if kind is None:
+            counts = self.model.starts
+        kinds = list(counts)
+        weights = []
+        for k in kinds:
+            w = counts[k]
+            if any(m in k for m in _TOOL_MARKERS):
+                if any(m in k for m in _RESULT_MARKERS):
+                    w *= bool(self.open_calls)  # no result without an open call
+                else:
+                    w *= tool_weight
+            if any(m in k for m in _REASONING_MARKERS):
+                w *= reasoning_weight
+            weights.append(w)
+        if not any(weights):
+            weights = [counts[k] for k in kinds]
+        return self.rng.choices(kinds, weights)[0]
+
+    def record(self, kind, index):
+        if self.switch_every and self.models and index and index % self.switch_every == 0:
+            self.model_id = self.models[(index // self.switch_every) % len(self.models)]
+        template = self.rng.choice(self.model.templates[kind])
+        reasoning = any(m in kind for m in _REASONING_MARKERS)
+        obj = self.clone(template, self.text_scale * (self.reasoning_scale if reasoning else 1.0))
+        if self.model_id and isinstance(obj, dict):
+            for path in _MODEL_PATHS[self.model.agent]:
+                _set_path(obj, path, self.model_id)
+        self.tick()
+        _FIXUPS[self.model.agent](self, kind, obj)
+        return obj
+
+
+# ---------------------------------------------------------------------------
+# Per-format id / timestamp rewriting
+# ---------------------------------------------------------------------------
+
+
+def _fix_claude(s, kind, obj):
+    obj["timestamp"] = s.iso()
+    if "sessionId" in obj:
+        obj["sessionId"] = s.session_id
+    if "uuid" in obj:
+        obj["uuid"] = str(s.uuid())
+        obj["parentUuid"] = s.prev_uuid
+        s.prev_uuid = obj["uuid"]
+    if "requestId" in obj:
+        obj["requestId"] = "req_" + s.base62(24)
+    msg = obj.get("message")
+    if not isinstance(msg, dict):
+        return
+    if "id" in msg:
+        msg["id"] = "msg_" + s.base62(24)
+    if isinstance(msg.get("content"), list):
+        for part in msg["content"]:
+            if not isinstance(part, dict):
+                continue
+            if part.get("type") == "tool_use":
+                part["id"] = s.open_call("toolu_" + s.base62(24))
+            elif part.get("type") == "tool_result":
+                part["tool_use_id"] = s.close_call(lambda: "toolu_" + s.base62(24))
+
+
+def _fix_codex(s, kind, obj):
+    obj["timestamp"] = s.iso()
+    payload = obj.get("payload")
+    if not isinstance(payload, dict):
+        return
+    if obj.get("type") == "session_meta":
+        payload["id"] = str(s.uuid())
+        payload["timestamp"] = s.iso()
+    if "call_id" in payload:
+        if payload.get("type", "").endswith("_output"):
+            payload["call_id"] = s.close_call(lambda: "call_" + s.base62(24))
+        else:
+            payload["call_id"] = s.open_call("call_" + s.base62(24))
+
+
+def _fix_cursor(s, kind, obj):
+    pass
+
+
+def _fix_gemini(s, kind, obj):
+    obj["id"] = str(s.uuid())
+    obj["timestamp"] = s.iso()
+    for thought in obj.get("thoughts") or ():
+        if isinstance(thought, dict) and "timestamp" in thought:
+            thought["timestamp"] = s.iso()
+    for call in obj.get("toolCalls") or ():
+        if not isinstance(call, dict):
+            continue
+        call_id = f"{call.get('name', 'tool')}-{s.clock}-{s.hex(13)}"
+        call["id"] = call_id
+        if "timestamp" in call:
+            call["timestamp"] = s.iso()
+        for result in call.get("result") or ():
+            if isinstance(result, dict) and isinstance(result.get("functionResponse"), dict):
+                result["functionResponse"]["id"] = call_id
+
+
+def _fix_opencode(s, kind, obj):
+    if not isinstance(obj, dict):
+        return
+    if kind == "project":
+        obj["id"] = s.project_id
+        obj["time"] = {"created": s.start, "updated": s.clock}
+        return
+    if kind == "share":
+        obj["id"] = s.session_id[-8:]
+        if "url" in obj:
+            obj["url"] = obj["url"].rsplit("/", 1)[0] + "/" + obj["id"]
+        return
+    if kind == "session":
+        obj["id"] = s.session_id
+        if "projectID" in obj:
+            obj["projectID"] = s.project_id
+        if isinstance(obj.get("time"), dict):
+            obj["time"] = {"created": s.start, "updated": s.clock}
+        return
+    if "sessionID" in obj:
+        obj["sessionID"] = s.session_id
+    if "role" in obj and "type" not in obj:
+        # The role object closes the message whose parts were written before it
+        obj["id"] = s.message_id
+        provider = _infer_provider(s.model_id)
+        if obj["role"] == "assistant":
+            obj["parentID"] = s.user_message_id or s.message_id
+            if provider != "unknown":
+                obj["providerID"] = provider
+        else:
+            s.user_message_id = s.message_id
+            if provider != "unknown" and isinstance(obj.get("model"), dict):
+                obj["model"]["providerID"] = provider
+        time_info = obj.get("time")
+        if isinstance(time_info, dict):
+            time_info["created"] = s.clock - s.rng.randint(*_STEP_MS)
+            if "completed" in time_info:
+                time_info["completed"] = s.clock
+        s.message_id = s.opencode_id("msg_")
+        return
+    obj["id"] = s.opencode_id("prt_")
+    if "messageID" in obj:
+        obj["messageID"] = s.message_id
+    if isinstance(obj.get("time"), dict):
+        obj["time"] = {k: s.clock for k in obj["time"]}
+    if obj.get("type") == "tool":
+        obj["callID"] = "call_" + s.base62(24)  # call and result share the object
+        state = obj.get("state")
+        if isinstance(state, dict) and isinstance(state.get("time"), dict):
+            state["time"] = {"start": s.clock, "end": s.tick()}
+
+
+_FIXUPS = {
+    "claude": _fix_claude,
+    "codex": _fix_codex,
+    "cursor": _fix_cursor,
+    "gemini": _fix_gemini,
+    "opencode": _fix_opencode,
+}
+
+
+def _dumps_compact(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _indent(text, prefix):
+    return text.replace("\n", "\n" + prefix)
+
+
+def generate(
+    model,
+    f,
+    seed=0,
+    size=None,
+    records=None,
+    text_scale=1.0,
+    reasoning_scale=1.0,
+    tool_weight=1.0,
+    reasoning_weight=1.0,
+    models=None,
+    switch_every=0,
+):
+    """Stream a synthetic session in model.agent's native format to binary file f.
+
+    Stops once `size` bytes or `records` records have been written (at
+    least one of them is required). Returns a stats dict: records,
+    bytes, kinds (Counter), models (those used).
+    """
+    if size is None and records is None:
+        raise ValueError("generate() needs size or records")
+    s = _Synth(model, random.Random(f"{model.agent}:{seed}"), text_scale, reasoning_scale, models, switch_every)
+    layout = _LAYOUT[model.agent]
+    written = 0
+    count = 0
+    kinds = Counter()
+    used = []
+
+    def emit(text):
+        nonlocal written
+        data = text.encode("utf-8")
+        f.write(data)
+        written += len(data)
+
+    header_pos = None
+    if layout == "document":
+        header = dict(model.header or {})
+        header.update(sessionId=s.session_id, startTime=s.iso(), lastUpdated=s.iso())
+        if "projectHash" in header:
+            header["projectHash"] = s.hex(64)
+        head = json.dumps(header, ensure_ascii=False, indent=2)
+        # lastUpdated is patched in place at the end when f is seekable
+        header_pos = head.index('"lastUpdated": ') + len('"lastUpdated": "')
+        header_pos = (f.tell() + len(head[:header_pos].encode("utf-8"))) if f.seekable() else None
+        emit(head[:-2] + ',\n  "messages": [')
+
+    kind = None
+    while (size is None or written < size) and (records is None or count < records):
+        kind = s.next_kind(kind, tool_weight, reasoning_weight)
+        obj = s.record(kind, count)
+        kinds[kind] += 1
+        if s.model_id and s.model_id not in used:
+            used.append(s.model_id)
+        if layout == "jsonl":
+            emit(_dumps_compact(obj) + "\n")
+        elif layout == "concatenated":
+            emit(("\n" if count else "") + json.dumps(obj, ensure_ascii=False, indent=2))
+        else:
+            emit(("," if count else "") + "\n    " + _indent(json.dumps(obj, ensure_ascii=False, indent=2), "    "))
+        count += 1
+
+    if layout == "document":
+        emit("\n  ]\n}" if count else "]\n}")
+        if header_pos is not None:
+            end = f.tell()
+            f.seek(header_pos)
+            f.write(s.iso().encode("ascii"))
+            f.seek(end)
+    return {"records": count, "bytes": written, "kinds": kinds, "models": used}
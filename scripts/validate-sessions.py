@@ -17,6 +17,8 @@ Each agent uses a different native format. The mapping per agent is:
   model-id       | .message.model   | .model       | .payload.model         | .modelID        | (none)
   provider       | (inferred)       | (inferred)   | .payload.model_provider| .providerID     | (none)
 
+The table is declared per agent in vac.specs and compiled by vac.mapping.
+
 Fields are only included when present in the native format. The CDDL schema
 marks timestamp, content, and call-id as optional to accommodate agents that
 don't record them (Cursor lacks timestamps entirely; OpenCode message-level
@@ -30,7 +32,9 @@ Known accepted behaviors:
     canonical record (includes encrypted_content for reasoning); the
     event_msg version is a streaming notification with the same content.
     Both are emitted as separate entries. Verified: 71/74 overlapping
-    timestamps have identical content across both sources.
+    timestamps have identical content across both sources. With --dedup,
+    event_msg copies are collapsed into their response_item original (see
+    _dedup_codex) and the collapsed count is reported per session.
 
   Codex function_call arguments are JSON strings:
     The OpenAI Responses API stores function arguments as a JSON-encoded
@@ -57,6 +61,11 @@ Known accepted behaviors:
     Cursor's export format. Session IDs are generated for the record
     envelope. Model/provider are set to "unknown".
 
+Session files are routed to a parser by their `<agent>-` name prefix.
+Files without a known prefix are sniffed (vac.detect): the first 8 KB are
+fingerprinted and the file is validated under the detected agent when the
+confidence is at least 0.5; otherwise it is skipped.
+
 Usage:
   python3 scripts/validate-sessions.py [OPTIONS]
 
@@ -67,6 +76,36 @@ Options:
                        relative to repo root)
   --samples N          Max sessions to validate per agent (default: all)
   --verbose            Print full CDDL error output on failures
+  --profile [PATH]     Per-stage wall/CPU time and memory peak as JSON lines
+                       (default: stderr) plus a summary table
+  --metrics PATH       Write run metrics (files, bytes, entries, per-agent results,
+                       stage latency histograms) as a Prometheus textfile (*.prom)
+                       or JSON document at exit
+  --progress SECONDS   Print progress and ETA to stderr every SECONDS
+  --dedup              Collapse Codex event_msg duplicates of response_item entries
+  --parse-workers N    Parse JSONL sessions larger than 16 MB in N processes,
+                       split at newline boundaries (default: 1)
+  --index              Write a `.idx` offset sidecar next to each JSONL / OpenCode
+                       session while parsing it (single process; see slice-session.py)
+  --blob-dir PATH      Move large input/output/encrypted payloads into a
+                       content-addressed blob store (see externalize_blobs)
+  --blob-threshold N   Externalize payloads larger than N bytes (default: 65536)
+  --shard I/N          Validate only the files of shard I of N (0 <= I < N),
+                       chosen by a stable SHA-256 hash of each file's path
+                       relative to --sessions-dir (see vac.shard)
+  --shard-key KEY      path (default) or session-id (read by a metadata scan)
+  --results PATH       Write this run's results (per-file lines, report rows,
+                       metrics) as JSON
+  --merge RESULTS...   Print the report of the shards' --results files exactly
+                       as an unsharded run prints it; with --metrics/--results,
+                       also write the merged metrics/results
+
+Sharded runs over several machines:
+  # on node i of 4, each with the sessions directory mounted anywhere
+  python3 scripts/validate-sessions.py --sessions-dir /mnt/sessions --shard i/4 \\
+    --results shard-i.json --metrics shard-i.prom
+  # anywhere, once all four are done
+  python3 scripts/validate-sessions.py --merge shard-*.json --metrics run.prom
 
 Requires: cddl gem (available via `nix develop` or `gem install cddl`)
 """
@@ -74,844 +113,40 @@ Requires: cddl gem (available via `nix develop` or `gem install cddl`)
 import argparse
 import json
 import os
-import subprocess
 import sys
 import tempfile
-import uuid
 from pathlib import Path
 
+from vac import (
+    DEFAULT_BLOB_THRESHOLD,
+    INDEXED_AGENTS,
+    PARSERS,
+    RESULTS_VERSION,
+    build_attribution,
+    externalize_blobs,
+    in_shard,
+    load_results,
+    merge_results,
+    parse_indexed,
+    resolve_agent,
+    validate,
+    wrap_record,
+    write_index,
+    write_record_cbor,
+    write_record_json,
+    write_results,
+)
+from vac import metrics as vac_metrics
+from vac import profiling as vac_profile
+from vac import shard as vac_shard
+from vac.parsers import _content_to_str, _iter_gemini_messages, _load_concatenated, _load_jsonl
+from vac.profiling import stage
+
 REPO_ROOT = Path(__file__).resolve().parent.parent
 SCHEMA = REPO_ROOT / "agent-conversation.cddl"
 DEFAULT_SESSIONS = REPO_ROOT / "examples" / "sessions"
 
 
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
-
-
-def _content_to_str(content):
-    """Flatten content field (string, list of parts, etc.) to a string.
-    Handles arbitrarily nested structures (e.g. Claude tool_result content
-    where 'content' is itself a list of dicts)."""
-    if isinstance(content, str):
-        return content
-    if isinstance(content, list):
-        parts = []
-        for c in content:
-            if isinstance(c, dict):
-                inner = c.get("text", c.get("content", ""))
-                parts.append(_content_to_str(inner))
-            else:
-                parts.append(str(c))
-        return "\n".join(parts)
-    if isinstance(content, dict):
-        return _content_to_str(content.get("text", content.get("content", str(content))))
-    return str(content)
-
-
-def _make_entry(type_val, **kwargs):
-    """Build an entry dict, only including keys with non-None values."""
-    entry = {"type": type_val}
-    for k, v in kwargs.items():
-        if v is not None:
-            entry[k] = v
-    return entry
-
-
-def _passthrough(source, exclude):
-    """Collect fields from source dict that are NOT in the exclude set.
-    Returns a dict of native passthrough fields (no renaming)."""
-    return {k: v for k, v in source.items() if k not in exclude and v is not None}
-
-
-def _infer_provider(model_id):
-    """Infer provider from model ID prefix."""
-    if not model_id or model_id == "unknown":
-        return "unknown"
-    if model_id.startswith("claude"):
-        return "anthropic"
-    if model_id.startswith("gemini"):
-        return "google"
-    if model_id.startswith("gpt") or model_id.startswith("o3") or model_id.startswith("o4"):
-        return "openai"
-    return "unknown"
-
-
-# ---------------------------------------------------------------------------
-# Parsers: read native format, yield (entries, metadata) with minimal mapping
-# ---------------------------------------------------------------------------
-
-
-def parse_claude(path):
-    """Claude Code: JSONL, one event per line.
-
-    Each JSONL line maps to ONE entry. Assistant and user messages that contain
-    multiple content blocks (tool_use, tool_result, thinking) produce a single
-    parent entry with typed children.
-
-    Content is passed through as-is (string or array of blocks).
-    Model extracted from: message.model on assistant lines.
-    Provider inferred from: claude- prefix on model ID.
-    Token-usage extracted from: message.usage on assistant lines.
-    Native fields preserved: line-level + message-level (no-drop policy).
-    """
-    # Fields consumed for canonical mapping or metadata — not passed through
-    _LINE_CONSUMED = {"timestamp", "sessionId", "version", "cwd", "gitBranch", "uuid", "type", "message", "parentUuid"}
-    _MSG_CONSUMED = {"role", "content", "model", "type", "id", "usage"}
-
-    with open(path) as f:
-        lines = [json.loads(line) for line in f if line.strip()]
-
-    meta = {
-        "session_id": None,
-        "model_id": "unknown",
-        "provider": None,
-        "cli": "claude-code",
-        "cli_version": None,
-        "start": None,
-        "cwd": None,
-        "branch": None,
-        "models": set(),
-    }
-    entries = []
-
-    for line in lines:
-        ts = line.get("timestamp")
-        if not meta["start"] and ts:
-            meta["start"] = ts
-        if line.get("sessionId"):
-            meta["session_id"] = line["sessionId"]
-        if line.get("version"):
-            meta["cli_version"] = line["version"]
-        if line.get("cwd"):
-            meta["cwd"] = line["cwd"]
-        if line.get("gitBranch"):
-            meta["branch"] = line["gitBranch"]
-
-        line_id = line.get("uuid")
-
-        if line.get("type") == "queue-operation":
-            entry = _make_entry("system-event", timestamp=ts, id=line_id, **{"event-type": "queue-operation"})
-            entry.update(_passthrough(line, _LINE_CONSUMED | {"operation"}))
-            entries.append(entry)
-            continue
-
-        msg = line.get("message", {})
-        role = msg.get("role")
-        if not role:
-            continue
-
-        model = msg.get("model")
-        if model:
-            meta["model_id"] = model
-            meta["models"].add(model)
-
-        content = msg.get("content", "")
-
-        # Native passthrough: line-level + message-level fields
-        line_extra = _passthrough(line, _LINE_CONSUMED)
-        msg_extra = _passthrough(msg, _MSG_CONSUMED)
-
-        # Token-usage extraction (canonical)
-        usage = msg.get("usage", {})
-        token_usage = None
-        if usage:
-            token_usage = {}
-            if "input_tokens" in usage:
-                token_usage["input"] = usage["input_tokens"]
-            if "output_tokens" in usage:
-                token_usage["output"] = usage["output_tokens"]
-            if "cache_read_input_tokens" in usage:
-                token_usage["cached"] = usage["cache_read_input_tokens"]
-            # Pass through remaining native usage fields
-            usage_consumed = {"input_tokens", "output_tokens", "cache_read_input_tokens"}
-            token_usage.update(_passthrough(usage, usage_consumed))
-            # Remove usage from msg_extra since we extracted it canonically
-            msg_extra.pop("usage", None)
-
-        if role == "user":
-            entry = _make_entry(
-                "user", timestamp=ts, id=line_id, content=content, **{"parent-id": line.get("parentUuid")}
-            )
-            # Extract typed children from content blocks
-            if isinstance(content, list):
-                children = []
-                for part in content:
-                    if not isinstance(part, dict):
-                        continue
-                    if part.get("type") == "tool_result":
-                        children.append(
-                            _make_entry(
-                                "tool-result",
-                                **{"call-id": part.get("tool_use_id")},
-                                output=part.get("content", ""),
-                                status="error" if part.get("is_error") else "success",
-                            )
-                        )
-                if children:
-                    entry["children"] = children
-            entry.update(line_extra)
-            entry.update(msg_extra)
-            entries.append(entry)
-
-        elif role == "assistant":
-            entry = _make_entry(
-                "assistant",
-                timestamp=ts,
-                id=line_id,
-                content=content,
-                **{"model-id": model, "parent-id": line.get("parentUuid")},
-            )
-            if token_usage:
-                entry["token-usage"] = token_usage
-            # Extract typed children from content blocks
-            if isinstance(content, list):
-                children = []
-                for part in content:
-                    if not isinstance(part, dict):
-                        continue
-                    if part.get("type") == "tool_use":
-                        children.append(
-                            _make_entry(
-                                "tool-call",
-                                name=part.get("name", "unknown"),
-                                input=part.get("input", {}),
-                                **{"call-id": part.get("id")},
-                            )
-                        )
-                    elif part.get("type") == "thinking":
-                        children.append(_make_entry("reasoning", content=part.get("thinking", "")))
-                if children:
-                    entry["children"] = children
-            entry.update(line_extra)
-            entry.update(msg_extra)
-            entries.append(entry)
-
-    meta["provider"] = _infer_provider(meta["model_id"])
-    return entries, meta
-
-
-def parse_gemini(path):
-    """Gemini CLI: single JSON object with messages array.
-
-    Each message maps to ONE entry. Gemini-type messages that contain toolCalls
-    or thoughts produce a single assistant entry with typed children.
-
-    Content is passed through as-is (already a string in Gemini).
-    Model extracted from: messages[].model on gemini-type messages.
-    Provider inferred from: gemini- prefix.
-    Token-usage extracted from: messages[].tokens on assistant messages.
-    Native fields preserved: message-level + toolCall-level (no-drop policy).
-    """
-    # Fields consumed for canonical mapping or metadata
-    _MSG_CONSUMED = {"type", "timestamp", "content", "id", "model", "thoughts", "toolCalls"}
-    _TC_CONSUMED = {"timestamp", "name", "args", "id", "result", "status"}
-    _THOUGHT_CONSUMED = {"description", "subject"}
-
-    with open(path) as f:
-        data = json.load(f)
-
-    meta = {
-        "session_id": data.get("sessionId"),
-        "model_id": "unknown",
-        "provider": None,
-        "cli": "gemini-cli",
-        "cli_version": None,
-        "start": data.get("startTime"),
-        "cwd": None,
-        "branch": None,
-        "models": set(),
-    }
-    entries = []
-
-    for msg in data.get("messages", []):
-        t = msg.get("type", "user")
-        ts = msg.get("timestamp")
-
-        model = msg.get("model")
-        if model:
-            meta["model_id"] = model
-            meta["models"].add(model)
-
-        msg_extra = _passthrough(msg, _MSG_CONSUMED)
-
-        # Token-usage extraction (canonical)
-        tokens = msg.get("tokens")
-        token_usage = None
-        if isinstance(tokens, dict):
-            token_usage = {}
-            if "inputTokens" in tokens:
-                token_usage["input"] = tokens["inputTokens"]
-            if "outputTokens" in tokens:
-                token_usage["output"] = tokens["outputTokens"]
-            # Pass through remaining native token fields
-            tokens_consumed = {"inputTokens", "outputTokens"}
-            token_usage.update(_passthrough(tokens, tokens_consumed))
-            msg_extra.pop("tokens", None)
-        elif tokens is not None:
-            # tokens is a scalar — keep as native passthrough
-            pass
-
-        if t in ("user", "human"):
-            entry = _make_entry("user", timestamp=ts, content=msg.get("content", ""), id=msg.get("id"))
-            entry.update(msg_extra)
-            entries.append(entry)
-        else:
-            entry = _make_entry(
-                "assistant", timestamp=ts, content=msg.get("content", ""), id=msg.get("id"), **{"model-id": model}
-            )
-            if token_usage:
-                entry["token-usage"] = token_usage
-
-            # Build typed children from thoughts and toolCalls
-            children = []
-            for thought in msg.get("thoughts", []):
-                child = _make_entry("reasoning", content=thought.get("description", ""), subject=thought.get("subject"))
-                child.update(_passthrough(thought, _THOUGHT_CONSUMED))
-                children.append(child)
-
-            for tc in msg.get("toolCalls", []):
-                child = _make_entry(
-                    "tool-call",
-                    timestamp=tc.get("timestamp", ts),
-                    name=tc.get("name", "unknown"),
-                    input=tc.get("args", {}),
-                    **{"call-id": tc.get("id")},
-                )
-                child.update(_passthrough(tc, _TC_CONSUMED))
-                children.append(child)
-
-                result = tc.get("result")
-                if result is not None:
-                    children.append(
-                        _make_entry(
-                            "tool-result",
-                            timestamp=tc.get("timestamp", ts),
-                            output=result,
-                            status=tc.get("status"),
-                            **{"call-id": tc.get("id")},
-                        )
-                    )
-
-            if children:
-                entry["children"] = children
-            entry.update(msg_extra)
-            entries.append(entry)
-
-    meta["provider"] = _infer_provider(meta["model_id"])
-    return entries, meta
-
-
-def parse_codex(path):
-    """Codex CLI: JSONL with {timestamp, type, payload} envelope.
-
-    Envelope-level types: session_meta, response_item, event_msg, turn_context.
-    Tool calls, reasoning, etc. are nested INSIDE response_item at payload.type:
-      payload.type=message (has role) → user/assistant
-      payload.type=function_call → tool-call (arguments is a JSON string, not dict)
-      payload.type=function_call_output → tool-result
-      payload.type=reasoning → reasoning (has encrypted_content for encrypted reasoning)
-      payload.type=web_search_call → tool-call (name="web_search")
-      payload.type=custom_tool_call → tool-call
-      payload.type=custom_tool_call_output → tool-result
-
-    event_msg entries (NOTE: these duplicate response_item for reasoning/messages):
-      payload.type=agent_reasoning → reasoning (duplicates response_item reasoning)
-      payload.type=token_count → system-event (unique, no response_item equivalent)
-      payload.type=user_message → user (may duplicate response_item message)
-      payload.type=agent_message → assistant (may duplicate response_item message)
-
-    Model extracted from: payload.model in turn_context (not in session_meta).
-    Provider extracted from: payload.model_provider in session_meta.
-    Token-usage extracted from: event_msg/token_count payload info.
-    Native fields preserved: payload-level fields (no-drop policy).
-    """
-    with open(path) as f:
-        lines = [json.loads(line) for line in f if line.strip()]
-
-    meta = {
-        "session_id": None,
-        "model_id": "unknown",
-        "provider": "unknown",
-        "cli": "codex-cli",
-        "cli_version": None,
-        "start": None,
-        "cwd": None,
-        "branch": None,
-        "models": set(),
-    }
-    entries = []
-
-    for line in lines:
-        ts = line.get("timestamp")
-        if not meta["start"] and ts:
-            meta["start"] = ts
-        payload = line.get("payload", {})
-        ltype = line.get("type", "")
-
-        if ltype == "session_meta":
-            meta["session_id"] = payload.get("id")
-            meta["cli_version"] = payload.get("cli_version")
-            meta["cwd"] = payload.get("cwd")
-            if payload.get("model"):
-                meta["model_id"] = payload["model"]
-                meta["models"].add(payload["model"])
-            if payload.get("model_provider"):
-                meta["provider"] = payload["model_provider"]
-            git = payload.get("git", {})
-            if git:
-                meta["branch"] = git.get("branch")
-
-        elif ltype == "turn_context":
-            # Model name lives here when absent from session_meta
-            if payload.get("model") and meta["model_id"] == "unknown":
-                meta["model_id"] = payload["model"]
-                meta["models"].add(payload["model"])
-
-        elif ltype == "response_item":
-            ptype = payload.get("type", "")
-
-            if ptype == "message":
-                role = payload.get("role", "")
-                content = payload.get("content", [])
-                consumed = {"type", "role", "content"}
-                extra = _passthrough(payload, consumed)
-                if role in ("user", "developer"):
-                    entry = _make_entry("user", timestamp=ts, content=content)
-                    entry.update(extra)
-                    entries.append(entry)
-                elif role == "assistant":
-                    entry = _make_entry("assistant", timestamp=ts, content=content)
-                    entry.update(extra)
-                    entries.append(entry)
-
-            elif ptype == "function_call":
-                consumed = {"type", "name", "arguments", "call_id"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry(
-                    "tool-call",
-                    timestamp=ts,
-                    name=payload.get("name", "unknown"),
-                    input=payload.get("arguments", {}),
-                    **{"call-id": payload.get("call_id")},
-                )
-                entry.update(extra)
-                entries.append(entry)
-
-            elif ptype == "function_call_output":
-                consumed = {"type", "output", "call_id"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry(
-                    "tool-result",
-                    timestamp=ts,
-                    output=payload.get("output", ""),
-                    **{"call-id": payload.get("call_id")},
-                )
-                entry.update(extra)
-                entries.append(entry)
-
-            elif ptype == "reasoning":
-                summary = payload.get("summary")
-                if isinstance(summary, list):
-                    summary = "\n".join(s.get("text", "") for s in summary if isinstance(s, dict))
-                consumed = {"type", "summary", "encrypted_content"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry(
-                    "reasoning", timestamp=ts, content=summary, encrypted=payload.get("encrypted_content")
-                )
-                entry.update(extra)
-                entries.append(entry)
-
-            elif ptype == "web_search_call":
-                action = payload.get("action", {})
-                consumed = {"type", "action"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry("tool-call", timestamp=ts, name="web_search", input=action)
-                entry.update(extra)
-                entries.append(entry)
-
-            elif ptype == "custom_tool_call":
-                consumed = {"type", "name", "input", "call_id"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry(
-                    "tool-call",
-                    timestamp=ts,
-                    name=payload.get("name", "unknown"),
-                    input=payload.get("input", ""),
-                    **{"call-id": payload.get("call_id")},
-                )
-                entry.update(extra)
-                entries.append(entry)
-
-            elif ptype == "custom_tool_call_output":
-                consumed = {"type", "output", "call_id"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry(
-                    "tool-result",
-                    timestamp=ts,
-                    output=payload.get("output", ""),
-                    **{"call-id": payload.get("call_id")},
-                )
-                entry.update(extra)
-                entries.append(entry)
-
-        elif ltype == "event_msg":
-            ptype = payload.get("type", "")
-
-            if ptype == "agent_reasoning":
-                consumed = {"type", "text"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry("reasoning", timestamp=ts, content=payload.get("text"))
-                entry.update(extra)
-                entries.append(entry)
-
-            elif ptype == "token_count":
-                consumed = {"type"}
-                extra = _passthrough(payload, consumed)
-                # Extract token-usage from info field if present
-                info = payload.get("info", {})
-                token_usage = None
-                if isinstance(info, dict) and info:
-                    token_usage = {}
-                    if "input_tokens" in info:
-                        token_usage["input"] = info["input_tokens"]
-                    if "output_tokens" in info:
-                        token_usage["output"] = info["output_tokens"]
-                    if "total_tokens" in info:
-                        token_usage["total"] = info["total_tokens"]
-                    info_consumed = {"input_tokens", "output_tokens", "total_tokens"}
-                    token_usage.update(_passthrough(info, info_consumed))
-                entry = _make_entry("system-event", timestamp=ts, **{"event-type": "token-count"})
-                if token_usage:
-                    entry["token-usage"] = token_usage
-                extra.pop("info", None)
-                entry.update(extra)
-                entries.append(entry)
-
-            elif ptype == "user_message":
-                consumed = {"type", "message"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry("user", timestamp=ts, content=payload.get("message"))
-                entry.update(extra)
-                entries.append(entry)
-
-            elif ptype == "agent_message":
-                consumed = {"type", "message"}
-                extra = _passthrough(payload, consumed)
-                entry = _make_entry("assistant", timestamp=ts, content=payload.get("message"))
-                entry.update(extra)
-                entries.append(entry)
-
-    return entries, meta
-
-
-def parse_opencode(path):
-    """OpenCode: concatenated pretty-printed JSON objects (not strict JSONL).
-
-    Entry types emitted: user, assistant (no content for message-level), tool-call,
-    tool-result, reasoning, system-event, patch.
-
-    Tool objects are unified: each "type":"tool" object contains BOTH the
-    invocation (state.input) and the result (state.output, state.status) in
-    a single object. The parser emits both a tool-call and a tool-result entry
-    from each tool object. Timestamps come from state.time.start/end.
-
-    Message-level role objects (role="user"/"assistant") are envelope markers
-    with no inline text. Content follows in child objects. These entries are
-    emitted without a content field.
-
-    Text parts (type="text") are attributed to user or assistant by looking
-    up their messageID against message-level role objects. Role messages
-    appear AFTER their child parts in the file, so a two-pass approach is
-    used: first collect all role messages, then process parts.
-
-    Model extracted from: modelID on assistant message objects.
-    Provider extracted from: providerID on assistant message objects.
-    Multi-model: collects all modelID values seen.
-    Token-usage extracted from: role-message tokens/cost fields.
-    Native fields preserved: object-level fields (no-drop policy).
-    """
-    # Fields consumed for canonical mapping per object type
-    _ROLE_CONSUMED = {"role", "modelID", "providerID", "model", "time", "id", "sessionID", "tokens", "cost", "parentID"}
-    _TEXT_CONSUMED = {"type", "text", "id", "messageID"}
-    _TOOL_CONSUMED = {"type", "tool", "callID", "state", "id", "sessionID", "messageID"}
-    _PATCH_CONSUMED = {"type", "diff", "id"}
-    _REASONING_CONSUMED = {"type", "text", "id"}
-    _STEP_CONSUMED = {"type"}
-
-    with open(path) as f:
-        content = f.read()
-
-    decoder = json.JSONDecoder()
-    objects, pos = [], 0
-    while pos < len(content):
-        stripped = content[pos:].lstrip()
-        if not stripped:
-            break
-        try:
-            obj, end = decoder.raw_decode(stripped)
-            objects.append(obj)
-            pos += (len(content[pos:]) - len(stripped)) + end
-        except json.JSONDecodeError:
-            break
-
-    meta = {
-        "session_id": None,
-        "model_id": "unknown",
-        "provider": "unknown",
-        "cli": "opencode",
-        "cli_version": None,
-        "start": None,
-        "cwd": None,
-        "branch": None,
-        "models": set(),
-    }
-    entries = []
-
-    # First pass: collect message-level role objects so we can attribute
-    # text parts to the correct role (user vs assistant).  Role messages
-    # appear AFTER their child parts in the file, so a lookahead is needed.
-    message_roles = {}
-    for obj in objects:
-        if isinstance(obj, dict) and "role" in obj and "type" not in obj:
-            message_roles[obj.get("id")] = obj.get("role")
-
-    for obj in objects:
-        if not isinstance(obj, dict):
-            continue
-        if "worktree" in obj:
-            meta["cwd"] = obj.get("worktree")
-            time_info = obj.get("time", {})
-            if isinstance(time_info, dict) and time_info.get("created"):
-                meta["start"] = time_info["created"]
-            continue
-
-        # Skip share-info objects (contain secrets, no useful data)
-        if "secret" in obj and "url" in obj and "type" not in obj and "role" not in obj:
-            continue
-
-        if obj.get("sessionID"):
-            meta["session_id"] = obj["sessionID"]
-
-        # Message-level objects (role field, no type)
-        if "role" in obj and "type" not in obj:
-            mid = obj.get("modelID")
-            pid = obj.get("providerID")
-            if mid:
-                meta["model_id"] = mid
-                meta["models"].add(mid)
-            if pid:
-                meta["provider"] = pid
-            # Also check nested model object (on user messages)
-            model_obj = obj.get("model", {})
-            if isinstance(model_obj, dict):
-                if model_obj.get("modelID"):
-                    meta["models"].add(model_obj["modelID"])
-                if model_obj.get("providerID") and meta["provider"] == "unknown":
-                    meta["provider"] = model_obj["providerID"]
-
-            ts = obj.get("time", {})
-            ts = ts.get("created") if isinstance(ts, dict) else None
-
-            # Token-usage extraction (canonical) from role messages
-            token_usage = None
-            tokens_raw = obj.get("tokens")
-            cost_raw = obj.get("cost")
-            if isinstance(tokens_raw, dict):
-                token_usage = {}
-                if "input" in tokens_raw:
-                    token_usage["input"] = tokens_raw["input"]
-                if "output" in tokens_raw:
-                    token_usage["output"] = tokens_raw["output"]
-                tokens_consumed = {"input", "output"}
-                token_usage.update(_passthrough(tokens_raw, tokens_consumed))
-            if cost_raw is not None:
-                if token_usage is None:
-                    token_usage = {}
-                token_usage["cost"] = cost_raw
-
-            # Content is in child objects, not here — omit content field
-            parent_id = obj.get("parentID")
-            entry = _make_entry(
-                "user" if obj.get("role") == "user" else "assistant",
-                timestamp=ts,
-                **{"parent-id": parent_id},
-            )
-            if token_usage:
-                entry["token-usage"] = token_usage
-            entry.update(_passthrough(obj, _ROLE_CONSUMED))
-            entries.append(entry)
-            continue
-
-        otype = obj.get("type")
-
-        if otype == "text":
-            msg_id = obj.get("messageID")
-            role = message_roles.get(msg_id, "assistant")
-            entry_type = "user" if role == "user" else "assistant"
-            entry = _make_entry(entry_type, content=obj.get("text", ""), id=obj.get("id"))
-            entry.update(_passthrough(obj, _TEXT_CONSUMED))
-            entries.append(entry)
-        elif otype == "tool":
-            state = obj.get("state", {})
-            call_id = obj.get("callID")
-            tool_ts = None
-            time_info = state.get("time", {})
-            if isinstance(time_info, dict) and time_info.get("start"):
-                tool_ts = time_info["start"]
-
-            # Tool-call entry with native passthrough
-            entry = _make_entry(
-                "tool-call",
-                timestamp=tool_ts,
-                name=obj.get("tool", "unknown"),
-                input=state.get("input", {}),
-                id=obj.get("id"),
-                **{"call-id": call_id},
-            )
-            # Pass through state-level fields (title, metadata, time)
-            state_consumed = {"input", "output", "status", "time"}
-            state_extra = _passthrough(state, state_consumed)
-            if state_extra:
-                entry.update(state_extra)
-            entry.update(_passthrough(obj, _TOOL_CONSUMED))
-            entries.append(entry)
-
-            # OpenCode stores result inline in the same object
-            output = state.get("output")
-            status = state.get("status")
-            if output is not None or status:
-                result_ts = None
-                if isinstance(time_info, dict) and time_info.get("end"):
-                    result_ts = time_info["end"]
-                result_entry = _make_entry(
-                    "tool-result",
-                    timestamp=result_ts,
-                    output=output if output is not None else "",
-                    status=status,
-                    **{"call-id": call_id},
-                )
-                # Pass through state metadata on result too
-                if state.get("metadata"):
-                    result_entry["metadata"] = state["metadata"]
-                entries.append(result_entry)
-        elif otype == "patch":
-            entry = _make_entry("tool-result", id=obj.get("id"), output=obj.get("diff", ""), status="success")
-            entry.update(_passthrough(obj, _PATCH_CONSUMED))
-            entries.append(entry)
-        elif otype == "reasoning":
-            entry = _make_entry("reasoning", content=obj.get("text"), id=obj.get("id"))
-            entry.update(_passthrough(obj, _REASONING_CONSUMED))
-            entries.append(entry)
-        elif otype in ("step-start", "step-finish"):
-            entry = _make_entry("system-event", **{"event-type": otype})
-            entry.update(_passthrough(obj, _STEP_CONSUMED))
-            entries.append(entry)
-
-    return entries, meta
-
-
-def parse_cursor(path):
-    """Cursor: bare JSONL {role, message}. No timestamps, no session ID,
-    no entry IDs, no model identification.
-
-    NOTE: Cursor's export format contains zero metadata. This is a known
-    limitation — the format stores only role and text content. Session ID
-    is generated by the record wrapper. Model/provider are "unknown".
-    """
-    with open(path) as f:
-        lines = [json.loads(line) for line in f if line.strip()]
-
-    meta = {
-        "session_id": None,
-        "model_id": "unknown",
-        "provider": "unknown",
-        "cli": "cursor",
-        "cli_version": None,
-        "start": None,
-        "cwd": None,
-        "branch": None,
-        "models": set(),
-    }
-    entries = []
-
-    for line in lines:
-        role = line.get("role", "user")
-        msg = line.get("message", {})
-        content = msg.get("content", [])
-        entries.append(_make_entry("user" if role == "user" else "assistant", content=content))
-
-    return entries, meta
-
-
-PARSERS = {
-    "claude": parse_claude,
-    "gemini": parse_gemini,
-    "codex": parse_codex,
-    "opencode": parse_opencode,
-    "cursor": parse_cursor,
-}
-
-
-# ---------------------------------------------------------------------------
-# Wrap parsed entries into minimal verifiable-agent-record for CDDL validation
-# ---------------------------------------------------------------------------
-
-
-def wrap_record(entries, meta):
-    """Build the thinnest possible verifiable-agent-record around parsed entries."""
-    session_id = meta["session_id"] or str(uuid.uuid4())
-
-    agent_meta = {
-        "model-id": meta["model_id"],
-        "model-provider": meta["provider"],
-    }
-    models = sorted(meta.get("models", set()))
-    if len(models) > 1:
-        agent_meta["models"] = models
-    if meta.get("cli"):
-        agent_meta["cli-name"] = meta["cli"]
-    if meta.get("cli_version"):
-        agent_meta["cli-version"] = meta["cli_version"]
-
-    record = {
-        "version": "3.0.0-draft",
-        "id": session_id,
-        "recording-agent": {
-            "name": "vac-validate",
-            "version": "3.0.0-draft",
-        },
-        "session": {
-            "format": "interactive",
-            "session-id": session_id,
-            "agent-meta": agent_meta,
-            "entries": entries,
-        },
-    }
-    if meta.get("start") is not None:
-        record["created"] = meta["start"]
-        record["session"]["session-start"] = meta["start"]
-    if meta.get("cwd"):
-        record["session"]["environment"] = {"working-dir": meta["cwd"]}
-    return record
-
-
-# ---------------------------------------------------------------------------
-# CDDL validation
-# ---------------------------------------------------------------------------
-
-
-def validate(schema_path, json_path):
-    result = subprocess.run(
-        ["cddl", str(schema_path), "validate", str(json_path)],
-        capture_output=True,
-        text=True,
-        timeout=60,
-    )
-    return result.returncode == 0, (result.stdout + result.stderr).strip()
-
-
 def _count_original_items(path, agent):
     """Count items in the original file to detect data loss.
 
@@ -921,11 +156,8 @@ def _count_original_items(path, agent):
     counts = {"total_lines": 0, "user": 0, "assistant": 0, "tool_call": 0, "tool_result": 0, "reasoning": 0, "other": 0}
 
     if agent == "gemini":
-        with open(path) as f:
-            data = json.load(f)
-        msgs = data.get("messages", [])
-        counts["total_lines"] = len(msgs)
-        for msg in msgs:
+        for msg in _iter_gemini_messages(path, {}):
+            counts["total_lines"] += 1
             t = msg.get("type", "user")
             if t in ("user", "human"):
                 counts["user"] += 1
@@ -943,25 +175,12 @@ def _count_original_items(path, agent):
         return counts
 
     if agent == "opencode":
-        with open(path) as f:
-            content = f.read()
-        decoder = json.JSONDecoder()
         # Two-pass: first collect role messages for text-part attribution
-        all_objs = []
+        all_objs = _load_concatenated(path)
         msg_roles = {}
-        pos = 0
-        while pos < len(content):
-            stripped = content[pos:].lstrip()
-            if not stripped:
-                break
-            try:
-                obj, end = decoder.raw_decode(stripped)
-                all_objs.append(obj)
-                if isinstance(obj, dict) and "role" in obj and "type" not in obj:
-                    msg_roles[obj.get("id")] = obj.get("role")
-                pos += (len(content[pos:]) - len(stripped)) + end
-            except json.JSONDecodeError:
-                break
+        for obj in all_objs:
+            if isinstance(obj, dict) and "role" in obj and "type" not in obj:
+                msg_roles[obj.get("id")] = obj.get("role")
         for obj in all_objs:
             counts["total_lines"] += 1
             if not isinstance(obj, dict):
@@ -997,8 +216,7 @@ def _count_original_items(path, agent):
         return counts
 
     # JSONL formats: claude, codex, cursor
-    with open(path) as f:
-        lines = [json.loads(line) for line in f if line.strip()]
+    lines = _load_jsonl(path)
     counts["total_lines"] = len(lines)
 
     if agent == "cursor":
@@ -1088,10 +306,9 @@ def _count_original_items(path, agent):
     return counts
 
 
-def _build_report_row(path, agent, entries, meta, record_json):
+def _build_report_row(path, agent, entries, meta, prod_size):
     """Build a report row for one session file."""
     orig_size = os.path.getsize(path)
-    prod_size = len(record_json.encode("utf-8"))
 
     # Collect all entries including children for counting
     all_entries = []
@@ -1197,6 +414,14 @@ def _print_report(rows):
         prod_tr = tc.get("tool-result", 0)
         prod_rsn = tc.get("reasoning", 0)
 
+        # Collapsed duplicates (--dedup) are represented by their canonical twin
+        collapsed = r["meta"].get("dedup", {})
+        if collapsed:
+            prod_user += collapsed.get("user", 0)
+            prod_asst += collapsed.get("assistant", 0)
+            prod_rsn += collapsed.get("reasoning", 0)
+            print(f"  Deduplicated: {sum(collapsed.values())} entries {collapsed}")
+
         losses = []
         if oc["user"] and prod_user < oc["user"]:
             losses.append(f"user: {prod_user}/{oc['user']}")
@@ -1254,6 +479,34 @@ def main():
         action="store_true",
         help="Print full CDDL error output on failures",
     )
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="Collapse Codex event_msg entries that duplicate a response_item entry",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=1,
+        help="Parse large JSONL sessions in N processes (default: 1)",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Write a .idx offset sidecar next to each JSONL/OpenCode session while parsing it",
+    )
+    parser.add_argument(
+        "--blob-dir",
+        type=Path,
+        default=None,
+        help="Externalize large input/output/encrypted payloads into this content-addressed blob store",
+    )
+    parser.add_argument(
+        "--blob-threshold",
+        type=int,
+        default=DEFAULT_BLOB_THRESHOLD,
+        help=f"Externalize payloads larger than this many bytes (default: {DEFAULT_BLOB_THRESHOLD})",
+    )
     parser.add_argument(
         "--report",
         action="store_true",
@@ -1268,10 +521,30 @@ def main():
     parser.add_argument(
         "--cbor",
         action="store_true",
-        help="Also write CBOR-serialized records (.spec.cbor) alongside JSON (requires --dump-dir)",
+        help="Also write deterministic CBOR records (.spec.cbor), streamed per entry (requires --dump-dir)",
+    )
+    parser.add_argument(
+        "--results",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Write this run's results (per-file lines, report rows, metrics) as JSON, for --merge",
     )
+    parser.add_argument(
+        "--merge",
+        type=Path,
+        nargs="+",
+        default=None,
+        metavar="RESULTS",
+        help="Print the combined report of the --results files of shards 0..N-1 (no sessions are read)",
+    )
+    vac_shard.add_arguments(parser)
+    vac_profile.add_argument(parser)
+    vac_metrics.add_arguments(parser)
     args = parser.parse_args()
 
+    if args.merge:
+        sys.exit(_merge(args))
     if args.cbor and not args.dump_dir:
         print("--cbor requires --dump-dir", file=sys.stderr)
         sys.exit(1)
@@ -1282,90 +555,251 @@ def main():
         print(f"Schema not found: {args.schema}", file=sys.stderr)
         sys.exit(1)
 
+    doc = {
+        "vac-results": RESULTS_VERSION,
+        "script": "validate-sessions",
+        "shard": list(args.shard) if args.shard else None,
+        "shard-key": args.shard_key,
+        "options": {
+            "samples": args.samples,
+            "dedup": args.dedup,
+            "report": args.report,
+            "verbose": args.verbose,
+            "blob-dir": str(args.blob_dir) if args.blob_dir else None,
+        },
+        "detect": [],
+        "agents": {},
+        "files": [],
+        "blobs": {"externalized": 0, "bytes": 0, "written": 0},
+        "metrics": None,
+    }
+
     # Group sessions by agent
     agent_samples = {}
     for s in sorted(args.sessions_dir.iterdir()):
         if not s.name.endswith((".jsonl", ".json")):
             continue
-        agent = s.name.split("-")[0]
+        agent, confidence, detected = resolve_agent(s)
+        if agent is None:
+            agent = s.name.split("-")[0]
+        elif detected:
+            doc["detect"].append(f"[DETECT] {s.name}: {agent} (confidence {confidence:.2f})")
+            print(doc["detect"][-1])
         if agent not in agent_samples:
             agent_samples[agent] = []
         if args.samples == 0 or len(agent_samples[agent]) < args.samples:
             agent_samples[agent].append(s)
 
+    # Number files in unsharded order (what --merge restores), then keep this shard's
+    order = {}
+    for agent, samples in sorted(agent_samples.items()):
+        doc["agents"][agent] = {"samples": len(samples), "parser": agent in PARSERS}
+        for s in samples:
+            order[s] = len(order)
+    if args.shard:
+        agent_samples = {
+            agent: [s for s in samples if in_shard(args.shard, s, args.sessions_dir, agent, args.shard_key)]
+            for agent, samples in agent_samples.items()
+        }
+
     if args.dump_dir:
         args.dump_dir.mkdir(parents=True, exist_ok=True)
+    profiler = vac_profile.enable(args.profile) if args.profile else None
+    metrics = None
+    if args.metrics or args.progress or args.results:
+        all_samples = [s for samples in agent_samples.values() for s in samples]
+        metrics = vac_metrics.enable(
+            "validate-sessions",
+            total_files=len(all_samples),
+            total_bytes=sum(s.stat().st_size for s in all_samples),
+            progress_interval=args.progress,
+        )
 
-    totals = {"pass": 0, "fail": 0, "skip": 0, "errors": []}
-    report_rows = []  # for --report
+    blob_totals = doc["blobs"]
 
     for agent, samples in sorted(agent_samples.items()):
+        if not samples:
+            continue
         parse_fn = PARSERS.get(agent)
         if not parse_fn:
             print(f"\n[SKIP] {agent}: no parser")
-            totals["skip"] += len(samples)
+            for sample in samples:
+                doc["files"].append(
+                    {
+                        "order": order[sample],
+                        "agent": agent,
+                        "file": sample.name,
+                        "status": "skip",
+                        "lines": [],
+                        "report": None,
+                    }
+                )
+                vac_metrics.file_done(agent, "skip", sample.stat().st_size)
             continue
 
         print(f"\n=== {agent.upper()} ({len(samples)} samples) ===")
         for sample in samples:
+            result = {
+                "order": order[sample],
+                "agent": agent,
+                "file": sample.name,
+                "status": "fail",
+                "lines": [],
+                "report": None,
+            }
+            doc["files"].append(result)
+            lines = result["lines"]
             try:
-                entries, meta = parse_fn(sample)
+                with stage("parse", sample.name):
+                    if args.index and agent in INDEXED_AGENTS:
+                        entries, meta, index = parse_indexed(agent, sample, dedup=args.dedup)
+                        write_index(index, sample)
+                    elif args.dedup and agent == "codex":
+                        entries, meta = parse_fn(sample, dedup=True, workers=args.parse_workers)
+                    else:
+                        entries, meta = parse_fn(sample, workers=args.parse_workers)
                 if not entries:
-                    print(f"  [SKIP] {sample.name}: no entries parsed")
-                    totals["skip"] += 1
+                    lines.append(f"  [SKIP] {sample.name}: no entries parsed")
+                    result["status"] = "skip"
+                    vac_metrics.file_done(agent, "skip", sample.stat().st_size)
                     continue
 
-                record = wrap_record(entries, meta)
-                record_json = json.dumps(record, indent=2)
+                # Before the blob store takes large tool inputs (Write contents) out
+                with stage("attribution", sample.name):
+                    attribution = build_attribution(entries, meta)
 
-                with tempfile.NamedTemporaryFile(mode="w", suffix=".json", delete=False) as f:
-                    f.write(record_json)
-                    tmp = f.name
+                if args.blob_dir:
+                    with stage("blobs", sample.name):
+                        stats = externalize_blobs(entries, args.blob_dir, args.blob_threshold)
+                    for k, v in stats.items():
+                        blob_totals[k] += v
 
-                ok, output = validate(args.schema, tmp)
-                os.unlink(tmp)
+                with stage("wrap_record", sample.name):
+                    record = wrap_record(entries, meta, attribution)
 
+                # Serialize once: the dump file (a temp file without --dump-dir) is
+                # also the cddl input, and its byte count is the report's prod_size
                 if args.dump_dir:
-                    out_name = sample.stem + ".spec.json"
-                    (args.dump_dir / out_name).write_text(record_json)
-                    if args.cbor:
-                        import cbor2
-
-                        cbor_name = sample.stem + ".spec.cbor"
-                        (args.dump_dir / cbor_name).write_bytes(cbor2.dumps(record))
+                    json_path = args.dump_dir / (sample.stem + ".spec.json")
+                else:
+                    fd, tmp_name = tempfile.mkstemp(suffix=".json")
+                    os.close(fd)
+                    json_path = Path(tmp_name)
+                try:
+                    with open(json_path, "wb") as f, stage("serialize", sample.name):
+                        prod_size = write_record_json(record, f)
+                    with stage("cddl", sample.name):
+                        ok, output = validate(args.schema, json_path)
+                finally:
+                    if not args.dump_dir:
+                        os.unlink(json_path)
+
+                if args.dump_dir and args.cbor:
+                    with stage("cbor", sample.name), open(args.dump_dir / (sample.stem + ".spec.cbor"), "wb") as f:
+                        write_record_cbor(record, f)
 
                 if ok:
-                    print(f"  [PASS] {sample.name} ({len(entries)} entries)")
-                    totals["pass"] += 1
+                    collapsed = sum(meta.get("dedup", {}).values())
+                    note = f", {collapsed} duplicates collapsed" if collapsed else ""
+                    if attribution:
+                        note += f", {len(attribution['files'])} file(s) attributed"
+                    lines.append(f"  [PASS] {sample.name} ({len(entries)} entries{note})")
+                    result["status"] = "pass"
                 else:
                     err = [ln for ln in output.split("\n") if "FAIL" in ln or "error" in ln.lower()]
-                    print(f"  [FAIL] {sample.name}")
+                    lines.append(f"  [FAIL] {sample.name}")
                     if args.verbose:
-                        print(f"         {output[:500]}")
+                        lines.append(f"         {output[:500]}")
                     else:
-                        print(f"         {err[0][:120] if err else output[:120]}")
-                    totals["fail"] += 1
-                    totals["errors"].append({"agent": agent, "file": sample.name})
+                        lines.append(f"         {err[0][:120] if err else output[:120]}")
 
                 if args.report:
-                    report_rows.append(_build_report_row(sample, agent, entries, meta, record_json))
+                    with stage("report", sample.name):
+                        result["report"] = _build_report_row(sample, agent, entries, meta, prod_size)
+                vac_metrics.file_done(agent, "pass" if ok else "fail", sample.stat().st_size, len(entries))
 
             except Exception as e:
-                print(f"  [ERROR] {sample.name}: {e}")
-                totals["fail"] += 1
-                totals["errors"].append({"agent": agent, "file": sample.name, "error": str(e)})
+                lines.append(f"  [ERROR] {sample.name}: {e}")
+                result["status"] = "fail"
+                vac_metrics.file_done(agent, "fail", sample.stat().st_size)
+            finally:
+                for line in lines:
+                    print(line)
+
+    failed = _print_results(doc)
+
+    if profiler:
+        profiler.summary()
+    if metrics and args.metrics:
+        metrics.write(args.metrics)
+        print(f"Metrics written: {args.metrics}")
+    if args.results:
+        doc["metrics"] = metrics.to_dict()
+        write_results(doc, args.results)
+        print(f"Results written: {args.results}")
+
+    sys.exit(1 if failed else 0)
+
+
+def _print_results(doc, replay=False):
+    """Print the summary of a run's results (with replay, first the per-file
+    lines as the run printed them). Returns the number of failed files."""
+    if replay:
+        for line in doc["detect"]:
+            print(line)
+        by_agent = {}
+        for f in doc["files"]:
+            by_agent.setdefault(f["agent"], []).append(f)
+        for agent, info in sorted(doc["agents"].items()):
+            if not info["parser"]:
+                print(f"\n[SKIP] {agent}: no parser")
+                continue
+            print(f"\n=== {agent.upper()} ({info['samples']} samples) ===")
+            for f in by_agent.get(agent, ()):
+                for line in f["lines"]:
+                    print(line)
+
+    files = sorted(doc["files"], key=lambda f: f["order"])
+    counts = {"pass": 0, "fail": 0, "skip": 0}
+    for f in files:
+        counts[f["status"]] += 1
+    blob_totals = doc["blobs"]
 
     print(f"\n{'=' * 60}")
-    print(f"RESULTS: {totals['pass']} pass, {totals['fail']} fail, {totals['skip']} skip")
-    if totals["errors"]:
+    print(f"RESULTS: {counts['pass']} pass, {counts['fail']} fail, {counts['skip']} skip")
+    if doc["options"]["blob-dir"]:
+        print(
+            f"BLOBS: {blob_totals['externalized']} payloads externalized "
+            f"({blob_totals['bytes'] / 1024 / 1024:.2f} MB), {blob_totals['written']} new blobs in "
+            f"{doc['options']['blob-dir']}"
+        )
+    if counts["fail"]:
         print("\nFailures:")
-        for e in totals["errors"]:
-            print(f"  [{e['agent']}] {e['file']}")
+        for f in files:
+            if f["status"] == "fail":
+                print(f"  [{f['agent']}] {f['file']}")
 
-    if args.report and report_rows:
+    report_rows = [f["report"] for f in files if f["report"]]
+    if doc["options"]["report"] and report_rows:
         _print_report(report_rows)
-
-    sys.exit(1 if totals["fail"] else 0)
+    return counts["fail"]
+
+
+def _merge(args):
+    """--merge: print the unsharded report of a set of shard results."""
+    try:
+        doc = merge_results([load_results(path) for path in args.merge])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Merge failed: {e}", file=sys.stderr)
+        return 1
+    failed = _print_results(doc, replay=True)
+    if args.metrics and doc["metrics"]:
+        vac_metrics.write(doc["metrics"], args.metrics)
+        print(f"Metrics written: {args.metrics}")
+    if args.results:
+        write_results(doc, args.results)
+        print(f"Results written: {args.results}")
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
@@ -7,222 +7,351 @@ For each agent format (claude, gemini, codex, opencode, cursor):
   2. Generate an ephemeral Ed25519 keypair (in-memory)
   3. Sign with COSE_Sign1 including CWT_Claims in the protected header
   4. CDDL-validate the signed CBOR against agent-conversation.cddl
-  5. Verify the signature with detached payload reattachment
+  5. Verify the signature with detached payload reattachment (the canonical
+     JSON encoded for signing is reused, not re-encoded)
   6. Report PASS/FAIL per agent
 
 Exits non-zero if any agent fails.
 
+With --bench, benchmarks signing and verification instead: every sample
+session plus one synthetic session (vac.synth, learned from the samples of
+--bench-agent) per --bench-sizes entry is wrapped into a record and run
+through canonicalization, each content hash, sign_payload and
+verify_payload --repeat times. Wall time is taken per stage (the
+"sign.cose_sign", "sign.detach", "verify.cose_verify", ... stages of
+vac.signing) from the fastest run; allocations (tracemalloc peak above
+stage entry) from one more, traced run, so tracing never slows the timed
+ones. --bench-out writes the results as a JSON baseline; --baseline
+compares against one and exits 1 if a stage is slower, or its peak larger,
+by more than --tolerance.
+
 Usage:
   python3 scripts/validate-signing.py [OPTIONS]
+  python3 scripts/validate-signing.py --bench --bench-sizes 16K,1M,16M,256M --bench-out bench.json
+  python3 scripts/validate-signing.py --bench --baseline bench.json
 
 Options:
   --schema PATH        Path to CDDL schema file (default: agent-conversation.cddl)
   --sessions-dir PATH  Directory containing session files (default: examples/sessions/)
   --verbose            Print detailed output per step
+  --profile [PATH]     Per-stage wall/CPU time and memory peak as JSON lines
+                       (default: stderr) plus a summary table
+  --metrics PATH       Write run metrics (per-agent results, stage latency
+                       histograms, signatures/s and signed bytes/s) as a
+                       Prometheus textfile (*.prom) or JSON document at exit
+  --progress SECONDS   Print progress and ETA to stderr every SECONDS
+  --bench              Benchmark signing and verification (see above)
+  --bench-sizes LIST   Synthetic session sizes, K/M/G suffixes (default: 64K,1M,16M,128M)
+  --bench-agent NAME   Format of the synthetic sessions (default: claude)
+  --repeat N           Timed runs per record; the fastest counts (default: 3)
+  --hash-alg NAME      content-hash-alg signed into the trace metadata (default: sha-256)
+  --bench-out PATH     Write the results as a JSON baseline
+  --baseline PATH      Compare with a baseline written by --bench-out
+  --tolerance FRAC     Allowed slowdown or peak growth per stage (default: 0.25)
 
 Requires: pycose, cbor2, cddl gem
 """
 
 import argparse
 import datetime
-import hashlib
-import importlib.util
+import gc
 import json
 import os
-import subprocess
 import sys
 import tempfile
 from pathlib import Path
 
-import cbor2
-from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
-from cryptography.hazmat.primitives import serialization
-from pycose.algorithms import EdDSA
-from pycose.headers import Algorithm, ContentType
-from pycose.keys import OKPKey
-from pycose.messages import Sign1Message
+from vac import (
+    CONTENT_HASH_ALGS,
+    DEFAULT_CONTENT_HASH_ALG,
+    PARSERS,
+    canonical_json,
+    content_hash,
+    generate_keypair,
+    load_signing_key,
+    resolve_agent,
+    sign_payload,
+    synth,
+    validate_cbor,
+    verify_payload,
+    wrap_record,
+)
+from vac import metrics as vac_metrics
+from vac import profiling as vac_profile
+from vac.profiling import stage
 
 REPO_ROOT = Path(__file__).resolve().parent.parent
 SCHEMA = REPO_ROOT / "agent-conversation.cddl"
 DEFAULT_SESSIONS = REPO_ROOT / "examples" / "sessions"
 
-# COSE / CWT label constants (mirrors sign-record.py)
-TRACE_METADATA_LABEL = 100
-CWT_CLAIMS_LABEL = 15
-CWT_ISS_LABEL = 1
-CWT_SUB_LABEL = 2
+BENCH_VERSION = 1
+DEFAULT_BENCH_SIZES = "64K,1M,16M,128M"
+# Stages faster than this in the baseline are timer noise, and peaks below
+# this are allocator noise; --baseline does not compare them
+_BENCH_MIN_MS = 1.0
+_BENCH_MIN_PEAK_KB = 1024.0
+# Stages shown in the table (all of them go to --bench-out)
+_BENCH_COLUMNS = (
+    ("canonicalize", "canon"),
+    ("hash/sha-256", "sha256"),
+    ("hash/sha-256-tree", "tree"),
+    ("sign.cose_sign", "cose_sign"),
+    ("sign.detach", "detach"),
+    ("verify.cose_verify", "cose_verify"),
+    ("sign", "sign"),
+    ("verify", "verify"),
+)
+_SIZE_SUFFIXES = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
 
 
 # ---------------------------------------------------------------------------
-# Import PARSERS and wrap_record from validate-sessions.py
+# Main pipeline
 # ---------------------------------------------------------------------------
 
 
-def _import_validate_sessions():
-    """Import validate-sessions.py as a module via importlib."""
-    module_path = REPO_ROOT / "scripts" / "validate-sessions.py"
-    spec = importlib.util.spec_from_file_location("validate_sessions", module_path)
-    mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(mod)
-    return mod
-
-
-_vs = _import_validate_sessions()
-PARSERS = _vs.PARSERS
-wrap_record = _vs.wrap_record
+def _pick_one_session(sessions_dir, agent):
+    """Pick the first session file (alphabetically) for the given agent."""
+    candidates = sorted(
+        p for p in sessions_dir.iterdir() if p.name.startswith(agent + "-") and p.name.endswith((".jsonl", ".json"))
+    )
+    return candidates[0] if candidates else None
 
 
 # ---------------------------------------------------------------------------
-# Signing helpers (self-contained, mirrors sign-record.py logic)
+# Benchmark (--bench)
 # ---------------------------------------------------------------------------
 
 
-def _canonical_json(obj):
-    """Serialize to canonical JSON: compact, sorted keys, UTF-8."""
-    return json.dumps(obj, separators=(",", ":"), sort_keys=True, ensure_ascii=False).encode("utf-8")
-
-
-def _sha256_hex(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
-
-
-def _extract_trace_metadata(record, json_bytes):
-    """Build trace-metadata map from a verifiable-agent-record."""
-    session = record.get("session", {})
-    agent_meta = session.get("agent-meta", {})
-
-    meta = {
-        "session-id": session.get("session-id", record.get("id", "unknown")),
-        "agent-vendor": agent_meta.get("model-provider", "unknown"),
-        "trace-format": "ietf-vac-v3.0",
-        "content-hash": _sha256_hex(json_bytes),
-        "content-hash-alg": "sha-256",
+def _parse_sizes(text):
+    """argparse type for --bench-sizes: "16K,1M" -> [("16K", 16384), ("1M", 1048576)]."""
+    sizes = []
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        number = item.upper().removesuffix("B")
+        try:
+            if number and number[-1] in _SIZE_SUFFIXES:
+                size = int(float(number[:-1]) * _SIZE_SUFFIXES[number[-1]])
+            else:
+                size = int(number)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"bad size {item!r} (expected e.g. 64K, 16M, 1G)") from None
+        sizes.append((item, size))
+    return sizes
+
+
+def _bench_records(args):
+    """Yield (name, source, agent, session bytes, entries, record): the samples, then one synthetic
+    session per --bench-sizes entry. Synthetic sessions are written to a temporary file, parsed and
+    deleted before the next is generated, so only one record is held at a time."""
+    samples = []
+    for path in sorted(args.sessions_dir.iterdir()):
+        if not (path.is_file() and path.name.endswith((".jsonl", ".json"))):
+            continue
+        agent = resolve_agent(path)[0]
+        if agent not in PARSERS:
+            continue
+        samples.append((path, agent))
+        entries, meta = PARSERS[agent](path)
+        if entries:
+            yield path.name, "sample", agent, path.stat().st_size, len(entries), wrap_record(entries, meta)
+
+    if not args.bench_sizes:
+        return
+    agent = args.bench_agent
+    model = synth.learn(agent, [path for path, a in samples if a == agent])
+    with tempfile.TemporaryDirectory(prefix="vac-bench-") as tmp:
+        for label, size in args.bench_sizes:
+            path = Path(tmp) / f"synth-{agent}-{label}.jsonl"
+            with open(path, "wb") as f:
+                synth.generate(model, f, seed=0, size=size)
+            entries, meta = PARSERS[agent](path)
+            session_bytes = path.stat().st_size
+            path.unlink()
+            yield path.name, "synthetic", agent, session_bytes, len(entries), wrap_record(entries, meta)
+            del entries, meta
+
+
+def _bench_pass(record, key, pub_pem, hash_alg):
+    """One canonicalize / hash / sign / verify run. Returns (canonical bytes, signature bytes)."""
+    with stage("canonicalize"):
+        json_bytes = canonical_json(record)
+    for alg in CONTENT_HASH_ALGS:
+        with stage(f"hash/{alg}"):
+            content_hash(json_bytes, alg)
+    with stage("sign"):
+        sig_bytes, _ = sign_payload(record, json_bytes, key, hash_alg=hash_alg)
+    with stage("verify"):
+        ok, err, _ = verify_payload(sig_bytes, json_bytes, pub_pem)
+    if not ok:
+        raise RuntimeError(f"verification failed: {err}")
+    return len(json_bytes), len(sig_bytes)
+
+
+def _bench_record(record, key, pub_pem, args, timings):
+    """Time and trace one record. timings is the list the stage observer appends to."""
+    runs = []
+    for _ in range(args.repeat):
+        gc.collect()
+        timings.clear()
+        record_bytes, sig_bytes = _bench_pass(record, key, pub_pem, args.hash_alg)
+        run = {}
+        for name, wall in timings:
+            run[name] = run.get(name, 0.0) + wall
+        runs.append(run)
+    timings.clear()
+
+    # Allocations: one traced run, kept out of the timings
+    gc.collect()
+    vac_profile.enable(None)
+    try:
+        _bench_pass(record, key, pub_pem, args.hash_alg)
+    finally:
+        profiler = vac_profile.disable()
+    timings.clear()
+    peaks = {}
+    for rec in profiler.records:
+        peaks[rec["stage"]] = max(peaks.get(rec["stage"], 0.0), rec["peak_kb"])
+
+    stages = {}
+    for name in runs[0]:
+        walls = [run[name] for run in runs]
+        best = min(walls)
+        stages[name] = {
+            "best_ms": round(best * 1000, 3),
+            "mean_ms": round(sum(walls) / len(walls) * 1000, 3),
+            "mb_s": round(record_bytes / best / 1e6, 1) if best > 0 else None,
+            "peak_kb": peaks.get(name),
+        }
+    return record_bytes, sig_bytes, stages
+
+
+def _bench_environment():
+    import platform
+    from importlib import metadata
+
+    versions = {}
+    for dist in ("pycose", "cbor2", "cryptography"):
+        try:
+            versions[dist] = metadata.version(dist)
+        except metadata.PackageNotFoundError:
+            versions[dist] = None
+    return {
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "versions": versions,
     }
 
-    ts_start = session.get("session-start")
-    if ts_start is not None:
-        meta["timestamp-start"] = ts_start
-    else:
-        # Fallback to signing time — trace-metadata requires a valid abstract-timestamp
-        # (RFC 3339 or epoch number), and some agents (e.g. Cursor) lack timestamps entirely.
-        now_utc = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-        meta["timestamp-start"] = record.get("created", now_utc)
-
-    ts_end = session.get("session-end")
-    if ts_end is not None:
-        meta["timestamp-end"] = ts_end
-
-    return meta
-
-
-def _extract_cwt_claims(record):
-    """Build CWT_Claims map for the protected header."""
-    session = record.get("session", {})
-    agent_meta = session.get("agent-meta", {})
-    iss = agent_meta.get("model-provider", "unknown")
-    sub = session.get("session-id", record.get("id", "unknown"))
-    return {CWT_ISS_LABEL: iss, CWT_SUB_LABEL: sub}
-
-
-def _generate_ephemeral_keypair():
-    """Generate an ephemeral Ed25519 keypair, return (private_pem, public_pem)."""
-    private_key = Ed25519PrivateKey.generate()
-    priv_pem = private_key.private_bytes(
-        serialization.Encoding.PEM,
-        serialization.PrivateFormat.PKCS8,
-        serialization.NoEncryption(),
-    ).decode("utf-8")
-    pub_pem = (
-        private_key.public_key()
-        .public_bytes(
-            serialization.Encoding.PEM,
-            serialization.PublicFormat.SubjectPublicKeyInfo,
-        )
-        .decode("utf-8")
-    )
-    return priv_pem, pub_pem
 
-
-def _sign_record(record, priv_pem):
-    """Sign a record with COSE_Sign1 (detached payload). Returns detached CBOR bytes."""
-    json_bytes = _canonical_json(record)
-    trace_meta = _extract_trace_metadata(record, json_bytes)
-    cwt_claims = _extract_cwt_claims(record)
-    cose_key = OKPKey.from_pem_private_key(priv_pem)
-
-    msg = Sign1Message(
-        phdr={Algorithm: EdDSA, ContentType: "application/json", CWT_CLAIMS_LABEL: cwt_claims},
-        uhdr={TRACE_METADATA_LABEL: trace_meta},
-        payload=json_bytes,
+def _bench_compare(doc, baseline, tolerance):
+    """Print the stages of doc that regressed against baseline. Returns the number of regressions."""
+    if baseline.get("vac-signing-bench") != BENCH_VERSION:
+        raise ValueError(f"not a version {BENCH_VERSION} signing benchmark")
+    old_records = {rec["name"]: rec for rec in baseline["records"]}
+    regressions = compared = 0
+    print(
+        f"\nBaseline: {baseline['created']} ({baseline['environment']['python']}, {baseline['environment']['platform']})"
     )
-    msg.key = cose_key
-
-    encoded = msg.encode()
-
-    # Replace payload with null for detached mode
-    raw = cbor2.loads(encoded)
-    detached_cose = cbor2.CBORTag(18, [raw.value[0], raw.value[1], None, raw.value[3]])
-    return cbor2.dumps(detached_cose)
-
+    for rec in doc["records"]:
+        old = old_records.get(rec["name"])
+        if old is None:
+            print(f"  {rec['name']}: not in baseline")
+            continue
+        if old["record_bytes"] != rec["record_bytes"]:
+            print(f"  {rec['name']}: record size changed ({old['record_bytes']} -> {rec['record_bytes']} bytes)")
+        for name, new in rec["stages"].items():
+            prev = old["stages"].get(name)
+            if prev is None:
+                continue
+            checks = [("time", prev["best_ms"], new["best_ms"], _BENCH_MIN_MS, "ms")]
+            if prev["peak_kb"] is not None and new["peak_kb"] is not None:
+                checks.append(("peak", prev["peak_kb"], new["peak_kb"], _BENCH_MIN_PEAK_KB, "KB"))
+            for what, before, after, floor, unit in checks:
+                if before < floor:
+                    continue
+                compared += 1
+                if after > before * (1 + tolerance):
+                    regressions += 1
+                    print(
+                        f"  REGRESSION {rec['name']} {name} {what}: {before:.1f} -> {after:.1f} {unit} "
+                        f"(+{(after / before - 1) * 100:.0f}%)"
+                    )
+    print(f"{regressions} regressions in {compared} comparisons (tolerance {tolerance:.0%})")
+    return regressions
+
+
+def bench(args):
+    """Run the signing benchmark. Returns the exit status."""
+    baseline = None
+    if args.baseline:
+        try:
+            baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Baseline {args.baseline}: {e}", file=sys.stderr)
+            return 1
+    timings = []
+    vac_profile.observe(lambda name, file, wall: timings.append((name, wall)))
+
+    priv_pem, pub_pem = generate_keypair()
+    key = load_signing_key(priv_pem)
+    doc = {
+        "vac-signing-bench": BENCH_VERSION,
+        "created": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+        "environment": _bench_environment(),
+        "repeat": args.repeat,
+        "hash-alg": args.hash_alg,
+        "records": [],
+    }
 
-def _cddl_validate(schema_path, cbor_bytes):
-    """Validate CBOR bytes against the CDDL schema. Returns (ok, output)."""
-    with tempfile.NamedTemporaryFile(suffix=".cbor", delete=False) as f:
-        f.write(cbor_bytes)
-        tmp = f.name
-    try:
-        result = subprocess.run(
-            ["cddl", str(schema_path), "validate", tmp],
-            capture_output=True,
-            text=True,
-            timeout=60,
+    print(f"Signing benchmark: best of {args.repeat} runs, ms per stage; peak = traced run, MB")
+    print(
+        f"  {'record':<36}{'MB':>8}"
+        + "".join(f"{label:>12}" for _, label in _BENCH_COLUMNS)
+        + f"{'sign MB/s':>11}{'verify MB/s':>12}{'peak':>8}"
+    )
+    for name, source, agent, session_bytes, entries, record in _bench_records(args):
+        record_bytes, sig_bytes, stages = _bench_record(record, key, pub_pem, args, timings)
+        del record
+        doc["records"].append(
+            {
+                "name": name,
+                "source": source,
+                "agent": agent,
+                "session_bytes": session_bytes,
+                "entries": entries,
+                "record_bytes": record_bytes,
+                "sig_bytes": sig_bytes,
+                "stages": stages,
+            }
+        )
+        peak = max(s["peak_kb"] or 0.0 for s in stages.values()) / 1024
+        print(
+            f"  {name:<36}{record_bytes / 1e6:>8.2f}"
+            + "".join(
+                f"{stages[stage_name]['best_ms']:>12.2f}" if stage_name in stages else f"{'-':>12}"
+                for stage_name, _ in _BENCH_COLUMNS
+            )
+            + f"{stages['sign']['mb_s'] or 0:>11.1f}{stages['verify']['mb_s'] or 0:>12.1f}{peak:>8.1f}",
+            flush=True,
         )
-        return result.returncode == 0, (result.stdout + result.stderr).strip()
-    finally:
-        os.unlink(tmp)
-
-
-def _verify_signature(sig_bytes, record, pub_pem):
-    """Verify a COSE_Sign1 signature against a record. Returns (ok, error_msg)."""
-    json_bytes = _canonical_json(record)
-    cose_key = OKPKey.from_pem_public_key(pub_pem)
-
-    decoded = Sign1Message.decode(sig_bytes)
-    decoded.key = cose_key
-    decoded.payload = json_bytes
-
-    try:
-        valid = decoded.verify_signature()
-    except Exception as e:
-        return False, f"Signature verification error: {e}"
-
-    if not valid:
-        return False, "Signature is invalid"
-
-    # Verify content hash
-    trace_meta = decoded.uhdr.get(TRACE_METADATA_LABEL, {})
-    expected_hash = trace_meta.get("content-hash")
-    if expected_hash:
-        actual_hash = _sha256_hex(json_bytes)
-        if actual_hash != expected_hash:
-            return False, f"Content hash mismatch: expected {expected_hash}, got {actual_hash}"
 
-    return True, None
+    if args.bench_out:
+        args.bench_out.write_text(json.dumps(doc, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written: {args.bench_out}")
+    if baseline is not None:
+        try:
+            return 1 if _bench_compare(doc, baseline, args.tolerance) else 0
+        except (KeyError, ValueError) as e:
+            print(f"Baseline {args.baseline}: {e}", file=sys.stderr)
+            return 1
+    return 0
 
 
 # ---------------------------------------------------------------------------
-# Main pipeline
+# CLI
 # ---------------------------------------------------------------------------
 
 
-def _pick_one_session(sessions_dir, agent):
-    """Pick the first session file (alphabetically) for the given agent."""
-    candidates = sorted(
-        p for p in sessions_dir.iterdir() if p.name.startswith(agent + "-") and p.name.endswith((".jsonl", ".json"))
-    )
-    return candidates[0] if candidates else None
-
-
 def main():
     parser = argparse.ArgumentParser(
         description=__doc__,
@@ -241,11 +370,46 @@ def main():
         help=f"Directory containing session files (default: {DEFAULT_SESSIONS.relative_to(REPO_ROOT)})",
     )
     parser.add_argument("--verbose", action="store_true", help="Print detailed output per step")
+    vac_profile.add_argument(parser)
+    vac_metrics.add_arguments(parser)
+
+    bench_group = parser.add_argument_group("benchmark")
+    bench_group.add_argument("--bench", action="store_true", help="Benchmark signing and verification")
+    bench_group.add_argument(
+        "--bench-sizes",
+        type=_parse_sizes,
+        default=_parse_sizes(DEFAULT_BENCH_SIZES),
+        metavar="LIST",
+        help=f"Synthetic session sizes, K/M/G suffixes; empty for samples only (default: {DEFAULT_BENCH_SIZES})",
+    )
+    bench_group.add_argument(
+        "--bench-agent",
+        choices=sorted(PARSERS),
+        default="claude",
+        help="Format of the synthetic sessions (default: claude)",
+    )
+    bench_group.add_argument("--repeat", type=int, default=3, help="Timed runs per record (default: 3)")
+    bench_group.add_argument(
+        "--hash-alg",
+        choices=list(CONTENT_HASH_ALGS),
+        default=DEFAULT_CONTENT_HASH_ALG,
+        help=f"content-hash-alg signed into the trace metadata (default: {DEFAULT_CONTENT_HASH_ALG})",
+    )
+    bench_group.add_argument("--bench-out", type=Path, help="Write the results as a JSON baseline")
+    bench_group.add_argument("--baseline", type=Path, help="Compare with a baseline written by --bench-out")
+    bench_group.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown or peak growth per stage before --baseline fails (default: 0.25)",
+    )
     args = parser.parse_args()
 
     if not args.sessions_dir.exists():
         print(f"Sessions dir not found: {args.sessions_dir}", file=sys.stderr)
         sys.exit(1)
+    if args.bench:
+        sys.exit(bench(args))
     if not args.schema.exists():
         print(f"Schema not found: {args.schema}", file=sys.stderr)
         sys.exit(1)
@@ -255,8 +419,14 @@ def main():
     print(f"Sessions: {args.sessions_dir}")
     print()
 
+    profiler = vac_profile.enable(args.profile) if args.profile else None
+    metrics = None
+    if args.metrics or args.progress:
+        metrics = vac_metrics.enable("validate-signing", total_files=len(PARSERS), progress_interval=args.progress)
+
     # Generate one ephemeral keypair for the entire run
-    priv_pem, pub_pem = _generate_ephemeral_keypair()
+    with stage("keygen"):
+        priv_pem, pub_pem = generate_keypair()
 
     results = {}
     for agent in sorted(PARSERS.keys()):
@@ -268,25 +438,33 @@ def main():
 
         print(f"  [{agent}] {session_path.name}")
 
+        entries = []
         try:
             # 1. Parse + wrap
             parse_fn = PARSERS[agent]
-            entries, meta = parse_fn(session_path)
+            with stage("parse", session_path.name):
+                entries, meta = parse_fn(session_path)
             if not entries:
                 print("    SKIP: no entries parsed")
                 results[agent] = "skip"
                 continue
-            record = wrap_record(entries, meta)
+            with stage("wrap_record", session_path.name):
+                record = wrap_record(entries, meta)
             if args.verbose:
                 print(f"    Parsed: {len(entries)} entries")
 
             # 2. Sign
-            sig_bytes = _sign_record(record, priv_pem)
+            with stage("sign", session_path.name):
+                with stage("canonicalize"):
+                    json_bytes = canonical_json(record)
+                vac_metrics.signed(len(json_bytes))
+                sig_bytes, _ = sign_payload(record, json_bytes, priv_pem)
             if args.verbose:
                 print(f"    Signed: {len(sig_bytes)} bytes CBOR")
 
             # 3. CDDL-validate the signed CBOR
-            ok, cddl_output = _cddl_validate(args.schema, sig_bytes)
+            with stage("cddl", session_path.name):
+                ok, cddl_output = validate_cbor(args.schema, sig_bytes)
             if not ok:
                 print("    FAIL: CDDL validation of signed record")
                 if args.verbose:
@@ -297,7 +475,8 @@ def main():
                 print("    CDDL: PASS")
 
             # 4. Verify signature
-            ok, err = _verify_signature(sig_bytes, record, pub_pem)
+            with stage("verify", session_path.name):
+                ok, err, _ = verify_payload(sig_bytes, json_bytes, pub_pem)
             if not ok:
                 print(f"    FAIL: {err}")
                 results[agent] = "fail"
@@ -311,6 +490,8 @@ def main():
         except Exception as e:
             print(f"    ERROR: {e}")
             results[agent] = "fail"
+        finally:
+            vac_metrics.file_done(agent, results.get(agent, "fail"), session_path.stat().st_size, len(entries))
 
     # Summary
     passes = sum(1 for v in results.values() if v == "pass")
@@ -325,6 +506,12 @@ def main():
             if status == "fail":
                 print(f"  {agent}")
 
+    if profiler:
+        profiler.summary()
+    if metrics and args.metrics:
+        metrics.write(args.metrics)
+        print(f"Metrics written: {args.metrics}")
+
     sys.exit(1 if fails else 0)
 
 
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Check the file attribution of records against a working tree.
+
+Every `range` of a record's `file-attribution` (or of a bare
+file-attribution-record) is re-hashed from the file it names under --root
+and compared with its `content-hash`. Ranges are grouped by path, each
+file is memory-mapped and hashed once, and line-start indexes and range
+hashes are shared across all records of a run (see
+vac.attribution.verify_attribution), so a monorepo audit reads each file
+once however many records and ranges point into it.
+
+Usage:
+  # Records produced for this checkout
+  python3 scripts/verify-attribution.py --root ~/src/project /tmp/vac-produced/*.spec.json
+
+  # Failures as JSON lines, for tooling
+  python3 scripts/verify-attribution.py --root . --json record.json > failures.jsonl
+
+Options:
+  --root PATH   Working tree the attributed paths are relative to (default: .)
+  --jobs N      Files hashed in parallel (default: all CPUs)
+  --json        Print each failing range as a JSON line instead of a report
+
+A range fails when its file is missing, its path is absolute or resolves
+outside --root (the file is not read), it lies beyond the end of the file,
+its hash differs, or its content-hash-alg is unknown. Ranges without a
+content-hash are counted as unhashed. Exit status is 1 if any range fails.
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from vac import LineIndexCache, verify_attribution
+
+_STATUSES = ("ok", "mismatch", "missing", "out-of-range", "outside-root", "unsupported-alg", "unhashed")
+
+
+def _load_attribution(path):
+    """The file-attribution-record of a record (JSON or CBOR) or a bare one; None if it has none."""
+    data = path.read_bytes()
+    if path.suffix == ".cbor":
+        import cbor2
+
+        doc = cbor2.loads(data)
+    else:
+        doc = json.loads(data)
+    return doc.get("file-attribution", doc if "files" in doc else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("records", nargs="+", type=Path, help="Record files (JSON or CBOR)")
+    parser.add_argument("--root", type=Path, default=Path("."), help="Working tree root (default: .)")
+    parser.add_argument("--jobs", type=int, default=None, help="Files hashed in parallel (default: all CPUs)")
+    parser.add_argument("--json", action="store_true", help="Print failing ranges as JSON lines")
+    args = parser.parse_args()
+
+    if not args.root.is_dir():
+        print(f"Root not found: {args.root}", file=sys.stderr)
+        sys.exit(1)
+
+    cache = LineIndexCache()
+    totals, contributors = Counter(), {}
+    failed = 0
+    t0 = time.perf_counter()
+    for path in args.records:
+        try:
+            attribution = _load_attribution(path)
+        except (OSError, ValueError) as e:
+            print(f"  [FAIL] {path.name}: {type(e).__name__}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        if not attribution:
+            print(f"  [SKIP] {path.name}: no file-attribution", file=sys.stderr)
+            continue
+        report = verify_attribution(attribution, args.root, cache, args.jobs)
+        totals.update(report["counts"])
+        for label, counts in report["contributors"].items():
+            contributors.setdefault(label, Counter()).update(counts)
+        failed += bool(report["failures"])
+        if args.json:
+            for failure in report["failures"]:
+                print(json.dumps(dict(failure, record=str(path)), ensure_ascii=False))
+            continue
+        counts = report["counts"]
+        verdict = "FAIL" if report["failures"] else "PASS"
+        print(
+            f"  [{verdict}] {path.name}: {report['ranges']} ranges, {counts['ok']} ok, "
+            f"{len(report['failures'])} failed, {counts['unhashed']} unhashed"
+        )
+        for failure in report["failures"]:
+            print(
+                f"      {failure['status']:<15} {failure['path']}:{failure['start-line']}-{failure['end-line']} "
+                f"({failure['contributor']})"
+            )
+
+    elapsed = time.perf_counter() - t0
+    if not args.json and contributors:
+        print(f"\n  {'contributor':<40} " + " ".join(f"{s:>15}" for s in _STATUSES))
+        for label, counts in sorted(contributors.items()):
+            print(f"  {label:<40} " + " ".join(f"{counts[s]:>15}" for s in _STATUSES))
+    print(
+        f"{len(args.records)} records, {sum(totals.values())} ranges in {len(cache)} distinct files "
+        f"checked in {elapsed:.2f} s ({failed} failed)",
+        file=sys.stderr,
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()